@@ -14,10 +14,13 @@
  * 
  * Protocol (From Python):
  * - "THREAT:<score>:<type>\n"  where score is 0-100 and type is DROWSY/YAWN/ALCOHOL/MULTI/CRITICAL
+ * - or a 5-byte binary frame: [0xA5][seq][score][type code][CRC-8 of seq,score,type]
+ *   type codes: 0=UNKNOWN 1=DROWSY 2=YAWN 3=ALCOHOL 4=MULTI 5=CRITICAL
+ *   (0xA5 never occurs in the ASCII commands, so both can share the line)
  * - Response: "ALCOHOL:<level>\n" continuously every 500ms
  * 
  * Author: Embedded Systems Engineering
- * Version: 3.0 (Production-Grade, Non-Blocking)
+ * Version: 3.1 (Production-Grade, Non-Blocking, Binary Threat Frames)
  */
 
 // ============================================================================
@@ -48,6 +51,9 @@
 #define SERIAL_BAUD_RATE 9600
 #define SERIAL_READ_INTERVAL 10          // Check serial every 10ms
 #define ALCOHOL_REPORT_INTERVAL 500      // Send alcohol level every 500ms
+#define COMMAND_BUFFER_SIZE 32           // Longest ASCII command line
+#define THREAT_FRAME_SYNC 0xA5           // First byte of a binary threat frame
+#define THREAT_FRAME_LENGTH 5            // sync, seq, score, type, crc8
 
 // Buzzer Patterns (in milliseconds)
 #define BUZZ_SHORT 100                   // Short beep
@@ -79,6 +85,20 @@ volatile int lastThreatScore = 0;
 volatile char lastTriggerType[16] = "";
 volatile unsigned long lastThreatTime = 0;
 
+// Serial Parser State
+char commandBuffer[COMMAND_BUFFER_SIZE];
+int commandLength = 0;
+byte threatFrame[THREAT_FRAME_LENGTH];
+int threatFrameLength = 0;               // 0 = not inside a binary frame
+byte lastFrameSeq = 0;
+boolean frameSeqValid = false;
+unsigned long framesReceived = 0;
+unsigned long framesCorrupt = 0;
+unsigned long framesMissed = 0;          // Sequence gaps (lost or coalesced upstream)
+
+const char* const TRIGGER_TYPE_NAMES[] = {"UNKNOWN", "DROWSY", "YAWN", "ALCOHOL", "MULTI", "CRITICAL"};
+#define TRIGGER_TYPE_COUNT 6
+
 // Alert State
 volatile boolean relayActive = false;
 volatile boolean buzzerActive = false;
@@ -276,24 +296,93 @@ int calculate_median(volatile int* data, int count) {
 // ============================================================================
 
 void process_serial_input() {
-  // Non-blocking serial read
+  // Non-blocking, byte-at-a-time parser: binary threat frames and ASCII lines
   while (Serial.available() > 0) {
-    String command = Serial.readStringUntil('\n');
+    byte b = Serial.read();
+    
+    // Inside a binary frame: collect the remaining bytes
+    if (threatFrameLength > 0) {
+      threatFrame[threatFrameLength++] = b;
+      if (threatFrameLength == THREAT_FRAME_LENGTH) {
+        handle_threat_frame();
+      }
+      continue;
+    }
     
-    // Parse threat score command: "THREAT:<score>:<type>"
-    if (command.startsWith("THREAT:")) {
-      parse_threat_score(command);
+    if (b == THREAT_FRAME_SYNC) {
+      threatFrame[0] = b;
+      threatFrameLength = 1;
+    }
+    else if (b == '\n') {
+      commandBuffer[commandLength] = '\0';
+      handle_command(commandBuffer);
+      commandLength = 0;
     }
-    // Parse calibration request
-    else if (command.startsWith("CALIB_REQUEST")) {
-      Serial.print(F("Baseline: "));
-      Serial.println(baselineAlcoholLevel);
+    else if (b != '\r' && commandLength < COMMAND_BUFFER_SIZE - 1) {
+      commandBuffer[commandLength++] = (char)b;
+    }
+  }
+}
+
+void handle_command(const char* command) {
+  // Parse threat score command: "THREAT:<score>:<type>"
+  if (strncmp(command, "THREAT:", 7) == 0) {
+    parse_threat_score(String(command));
+  }
+  // Parse calibration request
+  else if (strncmp(command, "CALIB_REQUEST", 13) == 0) {
+    Serial.print(F("Baseline: "));
+    Serial.println(baselineAlcoholLevel);
+  }
+  // Parse status request
+  else if (strncmp(command, "STATUS", 6) == 0) {
+    send_debug_status();
+  }
+}
+
+// CRC-8, polynomial 0x07, init 0x00 (matches crc8() in eye_detection.py)
+byte crc8(const byte* data, int length) {
+  byte crc = 0;
+  for (int i = 0; i < length; i++) {
+    crc ^= data[i];
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (byte)((crc << 1) ^ 0x07) : (byte)(crc << 1);
     }
-    // Parse status request
-    else if (command.startsWith("STATUS")) {
-      send_debug_status();
+  }
+  return crc;
+}
+
+void handle_threat_frame() {
+  // Frame: [0xA5][seq][score][type][crc8(seq, score, type)]
+  if (crc8(threatFrame + 1, 3) != threatFrame[4]) {
+    framesCorrupt++;
+    
+    // Resynchronise on the next sync byte inside the rejected frame, if any
+    int next = 1;
+    while (next < THREAT_FRAME_LENGTH && threatFrame[next] != THREAT_FRAME_SYNC) next++;
+    threatFrameLength = THREAT_FRAME_LENGTH - next;
+    for (int i = 0; i < threatFrameLength; i++) {
+      threatFrame[i] = threatFrame[next + i];
     }
+    return;
+  }
+  threatFrameLength = 0;
+  
+  byte seq = threatFrame[1];
+  if (frameSeqValid && seq != (byte)(lastFrameSeq + 1)) {
+    framesMissed += (byte)(seq - lastFrameSeq - 1);
   }
+  lastFrameSeq = seq;
+  frameSeqValid = true;
+  framesReceived++;
+  
+  byte typeCode = threatFrame[3];
+  if (typeCode >= TRIGGER_TYPE_COUNT) typeCode = 0;
+  
+  // No echo here: at 9600 baud a debug line per frame would back up the TX buffer
+  lastThreatScore = constrain(threatFrame[2], 0, 100);
+  strncpy((char*)lastTriggerType, TRIGGER_TYPE_NAMES[typeCode], sizeof(lastTriggerType) - 1);
+  lastThreatTime = millis();
 }
 
 void parse_threat_score(String command) {
@@ -348,6 +437,14 @@ void send_debug_status() {
   Serial.print(F("Relay: "));
   Serial.println(relayActive ? F("ON") : F("OFF"));
   
+  Serial.print(F("Threat Frames: "));
+  Serial.print(framesReceived);
+  Serial.print(F(" ok, "));
+  Serial.print(framesCorrupt);
+  Serial.print(F(" corrupt, "));
+  Serial.print(framesMissed);
+  Serial.println(F(" missed"));
+  
   Serial.println(F("========================"));
 }
 
@@ -0,0 +1,538 @@
+"""
+Headless Pipeline Benchmark
+===========================
+Drives the detection pipeline of eye_detection.py over a recorded clip or an
+image directory as fast as possible - no display, camera, Arduino or database -
+and reports throughput, per-frame latency percentiles and a per-stage breakdown.
+
+Usage:
+    python benchmark.py pipeline clip.mp4
+    python benchmark.py pipeline frames_dir/ --frames 1000 --loop --json bench.json
+    python benchmark.py select-scale reference_clip.mp4 --recall 0.95
+    python benchmark.py mar clip.mp4 --downsample 1 2 3
+    python benchmark.py filters --samples 100000
+    python benchmark.py backends clip.mp4 --frames 300
+    python benchmark.py geometry --samples 100000
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+import cv2
+
+from eye_detection import (Config, DETECTOR_BACKENDS, DrowsinessDetectionApp, calculate_ear,
+                           calculate_ear_batch, calculate_mar, calculate_mar_batch, open_frame_source,
+                           select_detection_scale)
+from signal_filters import create_filter
+
+
+PERCENTILES = (50, 95, 99)
+
+
+def summarize(samples):
+    """
+    Summarize a list of durations (seconds) in milliseconds.
+
+    Returns:
+        dict: count, mean and p50/p95/p99 in ms
+    """
+    if not samples:
+        return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0}
+    values = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(values, PERCENTILES)
+    return {
+        'count': int(values.size),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+    }
+
+
+def print_table(title, rows, total_ms=None):
+    """Print a latency table; rows are (name, summary dict)."""
+    print(f"\n{title}")
+    header = f"  {'stage':<16}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+    if total_ms:
+        header += f"{'share':>9}"
+    print(header)
+    print("  " + "-" * (len(header) - 2))
+    for name, stats in rows:
+        line = (f"  {name:<16}{stats['count']:>8}{stats['mean_ms']:>10.3f}"
+                f"{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+        if total_ms:
+            share = 100.0 * stats['mean_ms'] * stats['count'] / total_ms
+            line += f"{share:>8.1f}%"
+        print(line)
+
+
+def run_pipeline(args):
+    """Benchmark process_frame + threat scoring over a frame source."""
+    Config.EYE_DEBUG_INTERVAL = 0  # Keep stdout out of the measurement
+    if args.no_tracking:
+        Config.FACE_TRACKING = False
+    if args.scale is not None:
+        Config.FACE_DETECTION_SCALE = args.scale
+
+    app = DrowsinessDetectionApp()
+    if not app.initialize_detection():
+        return 1
+
+    source = open_frame_source(args.source, loop=args.loop)
+    if not source.isOpened():
+        print(f"[BENCH ERROR] Could not open source: {args.source}")
+        return 1
+
+    timer = app.stage_timer
+    frame_latencies = []
+    decode_times = []
+    faces_detected = 0
+    frame_shape = None
+    processed = 0
+
+    print(f"[BENCH] Source: {args.source}")
+    print(f"[BENCH] Warm-up: {args.warmup} frames, measuring up to {args.frames} frames")
+
+    bench_start = time.perf_counter()
+    pipeline_time = 0.0
+    total = args.warmup + args.frames
+    for index in range(total):
+        decode_start = time.perf_counter()
+        ret, frame = source.read()
+        decode_end = time.perf_counter()
+        if not ret or frame is None:
+            break
+
+        measuring = index >= args.warmup
+        if index == args.warmup:
+            timer.reset()
+            scheduler_start = app.scheduler.get_stats()
+            if app.face_tracker:
+                app.face_tracker.reset_stats()
+            bench_start = decode_start
+        timer.enabled = measuring
+
+        frame_start = time.perf_counter()
+        timestamp = index / Config.TARGET_FPS  # Nominal capture clock for the time-based windows
+        if args.adaptive:
+            results, _ = app.analyse_frame(frame, timestamp)
+        else:
+            results, _ = app.process_frame(frame)
+        app.score_frame(results, 0, timestamp)
+        timer.lap('scoring')
+        frame_end = time.perf_counter()
+
+        if measuring:
+            frame_shape = frame.shape
+            decode_times.append(decode_end - decode_start)
+            frame_latencies.append(frame_end - frame_start)
+            pipeline_time += frame_end - frame_start
+            faces_detected += int(results['face_detected'])
+            processed += 1
+
+    wall_time = time.perf_counter() - bench_start
+    source.release()
+
+    if processed == 0:
+        print("[BENCH ERROR] No frames were measured (source too short for warm-up?)")
+        return 1
+
+    pipeline_fps = processed / pipeline_time if pipeline_time > 0 else 0.0
+    end_to_end_fps = processed / wall_time if wall_time > 0 else 0.0
+    frame_stats = summarize(frame_latencies)
+    stage_stats = [(name, summarize(samples)) for name, samples in timer.samples.items()]
+
+    print(f"[BENCH] Frames measured: {processed} ({frame_shape[1]}x{frame_shape[0]})")
+    print(f"[BENCH] Faces detected: {faces_detected}/{processed} "
+          f"({100.0 * faces_detected / processed:.1f}%)")
+    print(f"[BENCH] Throughput: {pipeline_fps:.1f} FPS pipeline | "
+          f"{end_to_end_fps:.1f} FPS including decode")
+    tracker_stats = app.face_tracker.get_stats() if app.face_tracker else None
+    if tracker_stats:
+        print(f"[BENCH] Face localisation: {tracker_stats['detect_frames']} detect / "
+              f"{tracker_stats['track_frames']} track frames, {tracker_stats['track_losses']} track losses")
+
+    scheduler_stats = None
+    if args.adaptive:
+        stats = app.scheduler.get_stats()
+        analysed = stats['analysed'] - scheduler_start['analysed']
+        scheduler_stats = {'analysed': analysed, 'analysis_ratio': analysed / processed,
+                           'wakeups': stats['wakeups'] - scheduler_start['wakeups']}
+        print(f"[BENCH] Adaptive rate: {analysed}/{processed} frames analysed "
+              f"({100.0 * scheduler_stats['analysis_ratio']:.1f}%), {scheduler_stats['wakeups']} wake-ups")
+
+    print_table("Per-frame latency (ms)", [('frame', frame_stats), ('decode', summarize(decode_times))])
+    print_table("Per-stage latency (ms)", stage_stats, total_ms=pipeline_time * 1000.0)
+
+    if args.json:
+        report = {
+            'source': args.source,
+            'frames': processed,
+            'resolution': [int(frame_shape[1]), int(frame_shape[0])],
+            'faces_detected': faces_detected,
+            'pipeline_fps': pipeline_fps,
+            'end_to_end_fps': end_to_end_fps,
+            'frame': frame_stats,
+            'decode': summarize(decode_times),
+            'stages': dict(stage_stats),
+            'face_tracker': tracker_stats,
+            'adaptive': scheduler_stats,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[BENCH] Report written to {args.json}")
+
+    return 0
+
+
+def run_select_scale(args):
+    """Pick the smallest detection scale meeting the recall target on a reference clip."""
+    Config.EYE_DEBUG_INTERVAL = 0
+    Config.FACE_DETECTION_SCALE = 1.0
+
+    app = DrowsinessDetectionApp()
+    if not app.initialize_detection():
+        return 1
+
+    source = open_frame_source(args.source)
+    gray_frames = []
+    while len(gray_frames) < args.frames:
+        ret, frame = source.read()
+        if not ret or frame is None:
+            break
+        gray_frames.append(cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2GRAY))
+    source.release()
+
+    if not gray_frames:
+        print(f"[BENCH ERROR] No frames read from {args.source}")
+        return 1
+
+    scale, report = select_detection_scale(
+        app.face_cascade, gray_frames, candidates=tuple(args.candidates), recall_target=args.recall
+    )
+
+    print(f"\n[BENCH] Reference: {args.source} ({len(gray_frames)} frames, "
+          f"recall target {args.recall*100:.0f}%)")
+    print(f"  {'scale':>8}{'recall':>10}{'ms/frame':>12}{'speed-up':>10}")
+    full_ms = next((e['detect_ms'] for e in report if e['scale'] == 1.0), None)
+    for entry in report:
+        speedup = f"{full_ms / entry['detect_ms']:.1f}x" if full_ms and entry['detect_ms'] else "-"
+        print(f"  {entry['scale']:>8g}{entry['recall']*100:>9.1f}%{entry['detect_ms']:>12.2f}{speedup:>10}")
+    print(f"\n[BENCH] Selected FACE_DETECTION_SCALE = {scale:g}")
+    return 0
+
+
+def run_mar(args):
+    """Compare MAR estimators side by side against the original float64 Laplacian."""
+    Config.EYE_DEBUG_INTERVAL = 0
+
+    app = DrowsinessDetectionApp()
+    if not app.initialize_detection():
+        return 1
+    detector = app.eye_detector
+
+    # Collect mouth ROIs first so every estimator sees exactly the same pixels
+    source = open_frame_source(args.source)
+    mouths = []
+    while len(mouths) < args.frames:
+        ret, frame = source.read()
+        if not ret or frame is None:
+            break
+        gray = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2GRAY)
+        face_roi = app.face_tracker.locate(gray)
+        if face_roi is None:
+            continue
+        x1, y1, x2, y2 = detector.region_rect(face_roi, detector.MOUTH_REGION)
+        mouth = gray[max(0, y1):y2, max(0, x1):x2].copy()
+        if mouth.size:
+            mouths.append(mouth)
+    source.release()
+
+    if not mouths:
+        print(f"[BENCH ERROR] No faces found in {args.source}")
+        return 1
+
+    def to_mar(variance):
+        return max(0.05, min(0.5, variance / 10000.0))
+
+    def measure(estimator, downsample, gain):
+        energies = []
+        times = []
+        for mouth in mouths:
+            start = time.perf_counter()
+            energies.append(detector.mouth_energy(mouth, estimator, downsample, gain))
+            times.append(time.perf_counter() - start)
+        return np.asarray(energies), times
+
+    measure('fast', 1, 1.0)  # Warm up OpenCV's filter paths before timing
+    reference, reference_times = measure('laplacian', 1, 1.0)
+    reference_mar = np.array([to_mar(v) for v in reference])
+    reference_yawn = reference_mar > Config.MAR_THRESHOLD
+
+    print(f"\n[BENCH] MAR estimators on {len(mouths)} mouth ROIs from {args.source} "
+          f"(median ROI {int(np.median([m.shape[1] for m in mouths]))}x"
+          f"{int(np.median([m.shape[0] for m in mouths]))})")
+    print(f"  {'estimator':<18}{'gain':>8}{'mean ms':>10}{'p95 ms':>10}{'speed-up':>10}"
+          f"{'MAE':>9}{'max err':>9}{'yawn agree':>12}")
+
+    ref_ms = summarize(reference_times)['mean_ms']
+    rows = [('laplacian', 1, 1.0)] + [('fast', factor, None) for factor in args.downsample]
+    report = []
+    for estimator, factor, gain in rows:
+        if estimator == 'fast' and factor > 1:
+            # Fit the gain that maps downsampled energy back onto the reference scale
+            raw, _ = measure('fast', factor, 1.0)
+            valid = (raw > 0) & (reference > 0)
+            gain = float(np.median(reference[valid] / raw[valid])) if valid.any() else 1.0
+            if args.gain is not None:
+                gain = args.gain
+        if estimator == 'laplacian':
+            energies, times = reference, reference_times
+        else:
+            energies, times = measure(estimator, factor, gain if gain is not None else 1.0)
+        mar = np.array([to_mar(v) for v in energies])
+        errors = np.abs(mar - reference_mar)
+        agree = float(np.mean((mar > Config.MAR_THRESHOLD) == reference_yawn))
+        stats = summarize(times)
+        name = estimator if factor == 1 else f"{estimator} /{factor}"
+        print(f"  {name:<18}{gain if gain is not None else 1.0:>8.3f}{stats['mean_ms']:>10.4f}"
+              f"{stats['p95_ms']:>10.4f}{ref_ms / stats['mean_ms']:>9.1f}x"
+              f"{errors.mean():>9.4f}{errors.max():>9.4f}{agree*100:>11.1f}%")
+        report.append({'estimator': estimator, 'downsample': factor, 'gain': gain,
+                       'latency': stats, 'mae': float(errors.mean()), 'max_error': float(errors.max()),
+                       'yawn_agreement': agree})
+
+    print(f"\n[BENCH] Current config: MAR_ESTIMATOR={Config.MAR_ESTIMATOR!r}, "
+          f"MAR_DOWNSAMPLE={Config.MAR_DOWNSAMPLE}, MAR_DOWNSAMPLE_GAIN={Config.MAR_DOWNSAMPLE_GAIN}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'source': args.source, 'rois': len(mouths), 'estimators': report}, f, indent=2)
+        print(f"[BENCH] Report written to {args.json}")
+    return 0
+
+
+def run_filters(args):
+    """Micro-benchmark every streaming filter's update() against the old deque + np.mean smoother."""
+    rng = np.random.default_rng(0)
+    # EAR-like signal: the detector's discrete levels with blinks mixed in
+    samples = rng.choice([0.02, 0.06, 0.10, 0.14, 0.20, 0.25], size=args.samples,
+                         p=[0.05, 0.05, 0.1, 0.2, 0.4, 0.2]).tolist()
+    timestamps = (np.arange(args.samples) / 30.0).tolist()
+
+    def legacy_smoother(window):
+        smoother = deque(maxlen=window)
+
+        def update(x, timestamp=None):
+            smoother.append(x)
+            return np.mean(smoother)
+        return update
+
+    candidates = [('deque+np.mean', legacy_smoother(args.window))]
+    for spec in (('none', {}), ('mean', {'window': args.window}), ('ema', {'alpha': 0.3}),
+                 ('median', {'window': args.window}), ('one_euro', {'min_cutoff': 1.0, 'beta': 0.5})):
+        candidates.append((spec[0], create_filter(spec).update))
+
+    print(f"\n[BENCH] {args.samples} updates per filter (window {args.window})")
+    print(f"  {'filter':<16}{'ns/update':>12}{'speed-up':>10}")
+    baseline = None
+    report = {}
+    for name, update in candidates:
+        start = time.perf_counter()
+        for x, t in zip(samples, timestamps):
+            update(x, t)
+        elapsed = time.perf_counter() - start
+        ns = elapsed / args.samples * 1e9
+        baseline = baseline or ns
+        report[name] = ns
+        print(f"  {name:<16}{ns:>12.0f}{baseline / ns:>9.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'samples': args.samples, 'window': args.window, 'ns_per_update': report}, f, indent=2)
+        print(f"[BENCH] Report written to {args.json}")
+    return 0
+
+
+def run_backends(args):
+    """Compare process_frame latency and face detection rate of the detector backends."""
+    Config.EYE_DEBUG_INTERVAL = 0
+
+    source = open_frame_source(args.source)
+    frames = []
+    while len(frames) < args.warmup + args.frames:
+        ret, frame = source.read()
+        if not ret or frame is None:
+            break
+        frames.append(frame.copy())
+    source.release()
+    if len(frames) <= args.warmup:
+        print(f"[BENCH ERROR] Not enough frames in {args.source} for {args.warmup} warm-up frames")
+        return 1
+
+    measured = len(frames) - args.warmup
+    print(f"\n[BENCH] Detector backends on {measured} frames from {args.source} "
+          f"(+{args.warmup} warm-up)")
+    rows = []
+    report = {}
+    for name in args.backends:
+        Config.DETECTOR_BACKEND = name
+        app = DrowsinessDetectionApp()
+        if not app.initialize_detection():
+            print(f"[BENCH] Skipping backend {name!r}")
+            continue
+
+        timer = app.stage_timer
+        latencies = []
+        faces = 0
+        ears = []
+        mars = []
+        for index, frame in enumerate(frames):
+            if index == args.warmup:
+                timer.reset()
+            timer.enabled = index >= args.warmup
+            start = time.perf_counter()
+            results, _ = app.process_frame(frame)
+            elapsed = time.perf_counter() - start
+            if index >= args.warmup:
+                latencies.append(elapsed)
+                if results['face_detected']:
+                    faces += 1
+                    ears.append(results['ear_avg'])
+                    mars.append(results['mar'])
+        app.detector_backend.close()
+
+        stats = summarize(latencies)
+        rows.append((name, stats))
+        report[name] = {
+            'frame': stats,
+            'stages': {stage: summarize(samples) for stage, samples in timer.samples.items()},
+            'face_rate': faces / measured,
+            'mean_ear': float(np.mean(ears)) if ears else None,
+            'mean_mar': float(np.mean(mars)) if mars else None,
+        }
+        print_table(f"{name}: per-stage latency (ms)", list(report[name]['stages'].items()))
+
+    if not rows:
+        print("[BENCH ERROR] No backend could be initialised")
+        return 1
+
+    print_table("Per-frame latency by backend (ms)", rows)
+    print(f"\n  {'backend':<16}{'faces':>9}{'FPS':>9}{'mean EAR':>10}{'mean MAR':>10}")
+    for name, stats in rows:
+        entry = report[name]
+        fps = 1000.0 / stats['mean_ms'] if stats['mean_ms'] else 0.0
+        mean_ear = f"{entry['mean_ear']:.3f}" if entry['mean_ear'] is not None else "-"
+        mean_mar = f"{entry['mean_mar']:.3f}" if entry['mean_mar'] is not None else "-"
+        print(f"  {name:<16}{entry['face_rate']*100:>8.1f}%{fps:>9.1f}{mean_ear:>10}{mean_mar:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'source': args.source, 'frames': measured, 'backends': report}, f, indent=2)
+        print(f"[BENCH] Report written to {args.json}")
+    return 0
+
+
+def run_geometry(args):
+    """Time per-eye/per-mouth calculate_ear/calculate_mar against the batched versions."""
+    rng = np.random.default_rng(0)
+    eyes = rng.uniform(0.0, 60.0, size=(args.samples, 6, 2))
+    mouths = rng.uniform(0.0, 60.0, size=(args.samples, 4, 2))
+    eye_tuples = [[tuple(point) for point in eye] for eye in eyes.tolist()]
+    mouth_dicts = [dict(zip(('top', 'bottom', 'left', 'right'), map(tuple, mouth))) for mouth in mouths.tolist()]
+
+    def timed(func):
+        start = time.perf_counter()
+        values = func()
+        return np.asarray(values), time.perf_counter() - start
+
+    ear_loop, ear_loop_time = timed(lambda: [calculate_ear(eye) for eye in eye_tuples])
+    ear_batch, ear_batch_time = timed(lambda: calculate_ear_batch(eyes))
+    mar_loop, mar_loop_time = timed(lambda: [calculate_mar(mouth) for mouth in mouth_dicts])
+    mar_batch, mar_batch_time = timed(lambda: calculate_mar_batch(mouths))
+
+    print(f"\n[BENCH] {args.samples} eyes / mouths")
+    print(f"  {'function':<22}{'loop ms':>10}{'batch ms':>10}{'speed-up':>10}{'max diff':>11}")
+    report = {}
+    for name, loop, batch, loop_time, batch_time in (
+            ('calculate_ear', ear_loop, ear_batch, ear_loop_time, ear_batch_time),
+            ('calculate_mar', mar_loop, mar_batch, mar_loop_time, mar_batch_time)):
+        diff = float(np.abs(loop - batch).max())
+        print(f"  {name:<22}{loop_time*1000:>10.2f}{batch_time*1000:>10.2f}"
+              f"{loop_time / batch_time:>9.1f}x{diff:>11.2e}")
+        report[name] = {'loop_ms': loop_time * 1000, 'batch_ms': batch_time * 1000, 'max_diff': diff}
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'samples': args.samples, 'functions': report}, f, indent=2)
+        print(f"[BENCH] Report written to {args.json}")
+    return 0
+
+
+def build_parser():
+    """Build the command-line parser."""
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the detection pipeline")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pipeline = commands.add_parser('pipeline', help="Throughput/latency of process_frame + scoring")
+    pipeline.add_argument('source', help="Video file or directory of images")
+    pipeline.add_argument('--frames', type=int, default=1000, help="Frames to measure (default: 1000)")
+    pipeline.add_argument('--warmup', type=int, default=30, help="Frames to skip before measuring")
+    pipeline.add_argument('--loop', action='store_true', help="Loop the source until --frames is reached")
+    pipeline.add_argument('--no-tracking', action='store_true',
+                          help="Full-frame face detection on every frame")
+    pipeline.add_argument('--scale', type=float, help="Override Config.FACE_DETECTION_SCALE")
+    pipeline.add_argument('--adaptive', action='store_true',
+                          help="Go through the adaptive scheduler (skipped frames reuse results)")
+    pipeline.add_argument('--json', help="Write the report as JSON to this path")
+    pipeline.set_defaults(func=run_pipeline)
+
+    select_scale = commands.add_parser('select-scale', help="Pick the detection scale for a reference clip")
+    select_scale.add_argument('source', help="Reference video file or directory of images")
+    select_scale.add_argument('--frames', type=int, default=300, help="Reference frames to use")
+    select_scale.add_argument('--recall', type=float, default=Config.FACE_SCALE_RECALL_TARGET,
+                              help="Recall target vs. full resolution (default: %(default)s)")
+    select_scale.add_argument('--candidates', type=float, nargs='+', default=[0.25, 0.5, 1.0],
+                              help="Scales to evaluate")
+    select_scale.set_defaults(func=run_select_scale)
+
+    mar = commands.add_parser('mar', help="Accuracy/latency of the MAR estimators")
+    mar.add_argument('source', help="Video file or directory of images")
+    mar.add_argument('--frames', type=int, default=1000, help="Mouth ROIs to collect")
+    mar.add_argument('--downsample', type=int, nargs='+', default=[1, 2],
+                     help="Downsample factors to evaluate for the fast estimator")
+    mar.add_argument('--gain', type=float, help="Use this gain instead of fitting one per factor")
+    mar.add_argument('--json', help="Write the report as JSON to this path")
+    mar.set_defaults(func=run_mar)
+
+    filters = commands.add_parser('filters', help="Per-update cost of the streaming signal filters")
+    filters.add_argument('--samples', type=int, default=100000, help="Updates per filter")
+    filters.add_argument('--window', type=int, default=Config.EAR_BUFFER_SIZE, help="Mean/median window")
+    filters.add_argument('--json', help="Write the report as JSON to this path")
+    filters.set_defaults(func=run_filters)
+
+    backends = commands.add_parser('backends', help="Latency of the Haar and FaceMesh detector backends")
+    backends.add_argument('source', help="Video file or directory of images")
+    backends.add_argument('--frames', type=int, default=300, help="Frames to measure per backend")
+    backends.add_argument('--warmup', type=int, default=30, help="Frames to skip before measuring")
+    backends.add_argument('--backends', nargs='+', default=list(DETECTOR_BACKENDS),
+                          choices=DETECTOR_BACKENDS, help="Backends to compare (default: all)")
+    backends.add_argument('--json', help="Write the report as JSON to this path")
+    backends.set_defaults(func=run_backends)
+
+    geometry = commands.add_parser('geometry', help="Per-eye EAR/MAR loops vs. the batched versions")
+    geometry.add_argument('--samples', type=int, default=100000, help="Eyes and mouths to evaluate")
+    geometry.add_argument('--json', help="Write the report as JSON to this path")
+    geometry.set_defaults(func=run_geometry)
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    sys.exit(args.func(args))
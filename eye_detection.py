@@ -23,7 +23,6 @@ import warnings
 warnings.filterwarnings('ignore', category=UserWarning)
 
 import cv2
-import mediapipe as mp
 import numpy as np
 import serial
 import serial.tools.list_ports
@@ -32,10 +31,26 @@ import queue
 import time
 import sqlite3
 import sys
-from collections import deque
-from datetime import datetime
+import os
+import itertools
+import bisect
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import traceback
-import winsound  # For laptop speaker alerts
+import io
+import shutil
+import subprocess
+import wave
+import argparse
+import hashlib
+import json
+import math
+import socketserver
+import struct
+
+from signal_filters import SignalFilterBank
+from recording import Recording, RecordingWriter
 
 # ============================================================================
 # CONFIGURATION PARAMETERS
@@ -49,22 +64,75 @@ class Config:
     FRAME_WIDTH = 640
     FRAME_HEIGHT = 480
     TARGET_FPS = 30
+    FRAME_BUFFER_SLOTS = 4  # Preallocated frame slots shared by capture and processing (>= 3)
+    CAMERA_STARTUP_TIMEOUT = 15  # Seconds to wait for the first frame
+    
+    # Detector backend
+    DETECTOR_BACKEND = 'haar'  # 'haar' (cascade + intensity heuristics) or 'facemesh' (MediaPipe landmarks, CPU)
+    FACEMESH_MIN_DETECTION_CONFIDENCE = 0.5
+    FACEMESH_MIN_TRACKING_CONFIDENCE = 0.5
+    FACEMESH_EAR_THRESHOLD = 0.18  # Landmark EAR: ~0.25-0.35 open, < 0.15 closed
+    FACEMESH_MAR_THRESHOLD = 0.5  # Landmark MAR (lip gap / mouth width): < 0.1 closed, > 0.6 yawning
+    
+    # Face Localisation (Haar cascade)
+    FACE_SCALE_FACTOR = 1.1
+    FACE_MIN_NEIGHBORS = 7
+    FACE_MIN_SIZE = 80  # pixels
+    FACE_TRACKING = True  # Search around the last face box between full-frame detections
+    FACE_REDETECT_INTERVAL = 15  # Full-frame re-detection every N frames while tracking
+    FACE_SEARCH_MARGIN = 0.5  # Track window expansion (fraction of face box size per side)
+    FACE_SIZE_TOLERANCE = 0.3  # Allowed face size change between tracked frames
+    FACE_TRACK_MIN_CONFIDENCE = 0.4  # Below this the next frame runs a full-frame detection
+    FACE_DETECTION_SCALE = 0.5  # Cascade input scale (1.0, 0.5, 0.25) or 'auto'
+    FACE_SCALE_REFERENCE_CLIP = None  # Clip used to pick the scale when set to 'auto'
+    FACE_SCALE_RECALL_TARGET = 0.95  # Minimum recall vs. full resolution for 'auto'
+    FACE_SCALE_REFERENCE_FRAMES = 150  # Frames read from the reference clip
     
     # Calibration Settings
     CALIBRATION_FRAMES = 100  # More frames for better baseline (was 50)
+    CALIBRATION_CONTINUOUS = True  # Keep adapting the baseline from neutral frames after calibration
+    CALIBRATION_EPOCH_FRAMES = 900  # Neutral frames per baseline update (~30 s at 30 FPS)
+    CALIBRATION_BLEND = 0.3  # Weight of each epoch's median in the baseline
+    CALIBRATION_CHECKPOINT_SECONDS = 300  # Baseline checkpoint to the calibration table
+    CALIBRATION_ADAPT_THRESHOLDS = True  # Scale EAR/MAR thresholds with the baseline's drift since calibration
+    CALIBRATION_THRESHOLD_SCALE_LIMITS = (0.7, 1.3)  # Bounds of that scaling
+    CALIBRATION_CACHE = True  # Start detecting at once from the stored baseline for this profile + lighting
+    DRIVER_PROFILE = 'default'  # Driver/vehicle cache key (python eye_detection.py --driver NAME)
+    CALIBRATION_CACHE_MAX_AGE_DAYS = 30  # Older cached baselines are ignored
+    CALIBRATION_LIGHTING_EDGES = (50, 100, 150, 200)  # Mean frame intensity bucket edges
+    CALIBRATION_CACHE_SETTLE_FRAMES = 15  # Analysed frames averaged before the lighting bucket is trusted
+    CALIBRATION_VERIFY_FRAMES = 30  # Neutral frames checked against a cached baseline
+    CALIBRATION_VERIFY_TOLERANCE = 0.25  # Relative disagreement that forces a full calibration
     
     # Serial Communication
     SERIAL_BAUD_RATE = 9600
-    SERIAL_TIMEOUT = 1.0
-    SERIAL_RETRY_INTERVAL = 5  # seconds
+    SERIAL_TIMEOUT = 1.0  # Write timeout (s)
+    SERIAL_RETRY_INTERVAL = 5  # Max seconds between reconnect attempts (backoff cap)
+    SERIAL_RECONNECT_INITIAL = 0.5  # First reconnect delay (s), doubled per failure
+    SERIAL_BOOT_DELAY = 2.0  # Arduino resets when the port opens; max wait for its banner before talking
+    SERIAL_POLL_INTERVAL = 0.02  # I/O thread idle wait (s) between reads; sends wake it at once
+    SERIAL_PROTOCOL = 'ascii'  # 'ascii' (THREAT:<score>:<type>) or 'binary' (5-byte frames, firmware v3.1+)
+    SERIAL_TX_WINDOW_MS = 100  # Send at most the latest threat score per window; CRITICAL bypasses
+    SERIAL_TX_QUEUE_SIZE = 64  # Outbound messages waiting for the I/O thread
+    SERIAL_RX_QUEUE_SIZE = 256  # Parsed inbound messages kept for read_data()
+    SERIAL_ALCOHOL_HISTORY = 16  # Timestamped alcohol readings kept for alcohol_level_at()
     
     # Eye Aspect Ratio Thresholds
     EAR_THRESHOLD = 0.12  # Below this = eyes closed (was 0.20, lowered for closed eyes)
     MAR_THRESHOLD = 0.15  # Above this = yawning
     
-    # Consecutive Frame Thresholds for alerts
-    EAR_CONSECUTIVE_FRAMES = 20  # ~0.67 seconds at 30 FPS (more sensitive)
-    MAR_CONSECUTIVE_FRAMES = 10  # ~0.33 seconds at 30 FPS (more sensitive)
+    # Alert windows in seconds of capture time (same latency at any frame rate)
+    EAR_CLOSED_SECONDS = 0.65  # Eyes closed this long = drowsy (20 frames at 30 FPS); half = partial
+    MAR_OPEN_SECONDS = 0.33  # Mouth open this long = yawn (10 frames at 30 FPS); half = partial
+    ALERT_MAX_FRAME_GAP = 0.5  # A single frame never counts for more than this (camera stalls)
+    
+    # Adaptive processing rate
+    ADAPTIVE_RATE = True  # Analyse only every ADAPTIVE_IDLE_STRIDE-th frame while the driver is calm
+    ADAPTIVE_IDLE_STRIDE = 3  # Worst-case extra detection latency while idle: stride - 1 frames
+    ADAPTIVE_IDLE_FRAMES = 60  # Calm analysed frames before throttling (~2 s at 30 FPS)
+    ADAPTIVE_EAR_WAKE_RATIO = 1.25  # Back to full rate once EAR < ear_threshold x this...
+    ADAPTIVE_MAR_WAKE_RATIO = 0.8  # ...or MAR > mar_threshold x this...
+    ADAPTIVE_ALCOHOL_WAKE_DELTA = 50  # ...or alcohol rises this much above its level when throttling began
     
     # Threat Score Thresholds
     THREAT_SCORE_CRITICAL = 75  # Relay activation threshold
@@ -74,121 +142,579 @@ class Config:
     ALCOHOL_BASELINE = 0  # Will be set by Arduino
     ALCOHOL_THRESHOLD_BASELINE = 400  # Arduino level for alcohol detection
     
+    # Mouth opening (MAR) estimator
+    MAR_ESTIMATOR = 'fast'  # 'fast' (int16 Laplacian, single pass) or 'laplacian' (original float64)
+    MAR_DOWNSAMPLE = 1  # Shrink the mouth ROI by this factor before filtering ('fast' only)
+    MAR_DOWNSAMPLE_GAIN = 0.25  # Rescales downsampled energy to the full-res MAR scale;
+                                # fit for your camera with `python benchmark.py mar <clip>`
+    
     # Smoothing
     EAR_BUFFER_SIZE = 7  # Moving average window (increased)
+    # Per-signal streaming filter: 'none', 'mean', 'ema', 'median' or 'one_euro' (see signal_filters.py)
+    SIGNAL_FILTERS = {
+        'ear': ('mean', {'window': EAR_BUFFER_SIZE}),
+        'mar': ('median', {'window': 5}),
+        'alcohol': ('ema', {'alpha': 0.2}),
+    }
+    
+    # Audio alerts
+    AUDIO_BACKEND = 'auto'  # 'auto', 'winsound', 'aplay' (Linux/ALSA), 'wav' or 'null'
+    AUDIO_SAMPLE_RATE = 22050
+    AUDIO_VOLUME = 0.6  # Peak amplitude 0-1
+    AUDIO_WAV_PATH = 'alerts.wav'  # Output of the 'wav' backend
+    
+    # Latency instrumentation (capture timestamp -> outputs)
+    LATENCY_TRACKING = True  # Per-stage latency histograms (press 'l' for the rolling window)
+    LATENCY_WINDOW_SECONDS = 60  # Rolling window shown at runtime; the whole run is printed at shutdown
+    LATENCY_MAX_SECONDS = 60  # Larger latencies count in the top bucket
+    LATENCY_DUMP_PATH = None  # Write the whole-run histograms as JSON at shutdown (e.g. 'latency.json')
+    
+    # Metrics endpoint (Prometheus text format, scraped over HTTP)
+    METRICS_ENABLED = False  # Serve /metrics (python eye_detection.py --metrics-port N)
+    METRICS_HOST = '127.0.0.1'  # Bind address; keep it local and scrape through the fleet agent
+    METRICS_PORT = 9108
+    METRICS_UNIX_SOCKET = None  # Serve on this Unix socket path instead of TCP
+    
+    # Profiling (python eye_detection.py --profile)
+    PROFILE_ENABLED = False  # Report frame loop stage times and a sampled all-thread profile at shutdown
+    PROFILE_SAMPLING = True  # Run the sampling profiler in profile mode (loop stage timers are always on)
+    PROFILE_SAMPLE_INTERVAL_MS = 5  # Stack sampling period (200 Hz)
+    PROFILE_OUTPUT = 'profile.collapsed'  # Sampled stacks, collapsed format (flamegraph.pl, speedscope)
+    PROFILE_STAGES_OUTPUT = 'profile_stages.collapsed'  # Stage totals in microseconds, collapsed format
+    PROFILE_TOP_FRAMES = 15  # Hottest frames listed at shutdown
+    
+    # Incident recording (python eye_detection.py --record DIR / --replay DIR)
+    RECORD_PATH = None  # Record analysed frames + serial lines into this directory (see recording.py)
+    RECORD_COLOR = 'auto'  # 'gray' (4x smaller; exact for 'haar'), 'bgr', or 'auto' (bgr for 'facemesh')
+    RECORD_CHUNK_FRAMES = 300  # Frames per memory-mapped chunk file (~10 s at 30 FPS)
+    
+    # Debug output
+    EYE_DEBUG_INTERVAL = 10  # Print eye intensities every N frames (0 = off)
     
     # Database
     TELEMETRY_DB = 'telemetry.db'
+    TELEMETRY_ASYNC = True  # Write rows from a background thread instead of the frame loop
+    TELEMETRY_QUEUE_SIZE = 10000  # Max rows waiting for the writer thread
+    TELEMETRY_BATCH_SIZE = 256  # Commit after this many rows...
+    TELEMETRY_FLUSH_INTERVAL_MS = 500  # ...or this long after the first queued row
+    TELEMETRY_OVERFLOW_POLICY = 'drop_oldest'  # 'drop_oldest', 'drop_newest' or 'block'
+    TELEMETRY_BLOCK_TIMEOUT = 0.05  # Max producer wait (s) with the 'block' policy
+    TELEMETRY_SYNCHRONOUS = 'NORMAL'  # SQLite synchronous level (WAL makes NORMAL crash-safe)
+    
+    # Per-frame signal log (opt-in)
+    SIGNAL_LOG_ENABLED = False  # Log EAR/MAR/alcohol/threat for every frame
+    SIGNAL_LOG_RAW_RETENTION_HOURS = 24  # Raw per-frame rows
+    SIGNAL_LOG_1S_RETENTION_DAYS = 14  # 1-second rollups
+    SIGNAL_LOG_1M_RETENTION_DAYS = 365  # 1-minute rollups
+    SIGNAL_LOG_PRUNE_INTERVAL = 60  # Seconds between retention passes
 
 
 # ============================================================================
 # AUDIO ALERT SYSTEM (LAPTOP SPEAKER)
 # ============================================================================
 
-class AudioAlerter:
-    """Manages audio alerts via laptop speaker."""
+# Alert patterns: (frequency Hz, tone ms, pause after ms) per beep
+ALERT_PATTERNS = {
+    'CRITICAL': ((1200, 150, 80),) * 6,  # Rapid high frequency beeping
+    'DROWSY': ((400, 200, 150),) * 3,  # Strong low beeps
+    'YAWN': ((600, 250, 100), (600, 250, 0)),  # Double beep
+    'MULTI': ((800, 200, 100), (800, 200, 100), (800, 200, 0)),  # Triple beep
+}
+ALERT_PATTERNS['ALCOHOL'] = ALERT_PATTERNS['MULTI']
+
+# Lower value = more urgent; an alert preempts anything less urgent that is playing
+ALERT_PRIORITIES = {'CRITICAL': 0, 'MULTI': 1, 'ALCOHOL': 1, 'DROWSY': 2, 'YAWN': 3}
+
+
+def render_tone_pattern(pattern, sample_rate=22050, volume=0.6, fade_ms=5):
+    """
+    Synthesise an alert pattern into 16-bit mono PCM, one segment per beep.
     
-    def __init__(self):
-        """Initialize audio alerter."""
-        self.last_alert_time = 0
-        self.alert_cooldown = 0.5  # Cooldown between alert threads to prevent spam
-        self.alert_thread = None
-        self.lock = threading.Lock()
+    Each segment is a sine tone (with short fades against clicks) followed by
+    its pause, so playing the segments back to back reproduces the pattern and
+    the player can stop between beeps.
     
-    def play_drowsy_alert(self):
-        """Play drowsy alert pattern - strong beeps."""
-        try:
-            print(f"[AUDIO] Playing DROWSY alert (3x 400Hz @ 200ms)")
-            for i in range(3):
-                winsound.Beep(400, 200)  # Lower frequency, longer duration
-                time.sleep(0.15)
-            print(f"[AUDIO] DROWSY alert complete")
-        except Exception as e:
-            print(f"[AUDIO ERROR] Failed to play DROWSY alert: {e}")
+    Args:
+        pattern: ((frequency_hz, tone_ms, pause_ms), ...)
+        sample_rate (int): Samples per second
+        volume (float): Peak amplitude 0-1
+        fade_ms (int): Fade-in/out length per tone
     
-    def play_yawn_alert(self):
-        """Play yawn alert - double beep."""
-        try:
-            print(f"[AUDIO] Playing YAWN alert (2x 600Hz @ 250ms)")
-            winsound.Beep(600, 250)
-            time.sleep(0.1)
-            winsound.Beep(600, 250)
-            print(f"[AUDIO] YAWN alert complete")
-        except Exception as e:
-            print(f"[AUDIO ERROR] Failed to play YAWN alert: {e}")
+    Returns:
+        list: int16 numpy arrays, one per beep
+    """
+    segments = []
+    for frequency, tone_ms, pause_ms in pattern:
+        tone_samples = int(sample_rate * tone_ms / 1000)
+        t = np.arange(tone_samples) / sample_rate
+        tone = np.sin(2 * np.pi * frequency * t) * volume
+        fade = min(int(sample_rate * fade_ms / 1000), tone_samples // 2)
+        if fade:
+            ramp = np.linspace(0.0, 1.0, fade)
+            tone[:fade] *= ramp
+            tone[-fade:] *= ramp[::-1]
+        pause = np.zeros(int(sample_rate * pause_ms / 1000))
+        segments.append((np.concatenate([tone, pause]) * 32767).astype(np.int16))
+    return segments
+
+
+def pcm_to_wav(pcm, sample_rate):
+    """Wrap int16 mono PCM in an in-memory WAV file."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+class NullAudioBackend:
+    """Discards audio (tests, headless runs); records what would have played."""
     
-    def play_critical_alert(self):
-        """Play critical alert - rapid high frequency beeping."""
-        try:
-            print(f"[AUDIO] Playing CRITICAL alert (6x 1200Hz @ 150ms)")
-            for _ in range(6):
-                winsound.Beep(1200, 150)
-                time.sleep(0.08)
-            print(f"[AUDIO] CRITICAL alert complete")
-        except Exception as e:
-            print(f"[AUDIO ERROR] Failed to play CRITICAL alert: {e}")
+    name = 'null'
     
-    def play_multi_alert(self):
-        """Play multi-threat alert."""
-        try:
-            print(f"[AUDIO] Playing MULTI alert (3x 800Hz @ 200ms)")
-            winsound.Beep(800, 200)
-            time.sleep(0.1)
-            winsound.Beep(800, 200)
-            time.sleep(0.1)
-            winsound.Beep(800, 200)
-            print(f"[AUDIO] MULTI alert complete")
-        except Exception as e:
-            print(f"[AUDIO ERROR] Failed to play MULTI alert: {e}")
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.played = 0
+    
+    def prepare(self, pcm):
+        """Convert a PCM segment into whatever play() needs (done once per segment)."""
+        return pcm
+    
+    def play(self, segment):
+        """Play one prepared segment, blocking until it has finished."""
+        self.played += 1
+    
+    def close(self):
+        """Release backend resources."""
+
+
+class WinsoundAudioBackend(NullAudioBackend):
+    """Windows speaker output via winsound.PlaySound from memory."""
+    
+    name = 'winsound'
+    
+    def __init__(self, sample_rate):
+        super().__init__(sample_rate)
+        import winsound  # Windows only; imported lazily so Linux can run the module
+        self.winsound = winsound
+    
+    def prepare(self, pcm):
+        return pcm_to_wav(pcm, self.sample_rate)
+    
+    def play(self, segment):
+        self.winsound.PlaySound(segment, self.winsound.SND_MEMORY)
+        self.played += 1
+
+
+class AplayAudioBackend(NullAudioBackend):
+    """Linux/ALSA output by piping raw PCM into `aplay`."""
+    
+    name = 'aplay'
+    
+    def __init__(self, sample_rate):
+        super().__init__(sample_rate)
+        self.command = shutil.which('aplay')
+        if self.command is None:
+            raise RuntimeError("aplay not found (install alsa-utils)")
+    
+    def prepare(self, pcm):
+        return pcm.tobytes()
+    
+    def play(self, segment):
+        subprocess.run(
+            [self.command, '-q', '-t', 'raw', '-f', 'S16_LE', '-c', '1', '-r', str(self.sample_rate)],
+            input=segment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+        )
+        self.played += 1
+
+
+class WavFileAudioBackend(NullAudioBackend):
+    """Appends every played segment to a WAV file (boxes without a speaker, debugging)."""
+    
+    name = 'wav'
+    
+    def __init__(self, sample_rate, path='alerts.wav', realtime=True):
+        """
+        Args:
+            sample_rate (int): Samples per second
+            path (str): Output WAV path (overwritten)
+            realtime (bool): Take as long as real playback would (keeps preemption timing)
+        """
+        super().__init__(sample_rate)
+        self.path = path
+        self.realtime = realtime
+        self.wav = wave.open(path, 'wb')
+        self.wav.setnchannels(1)
+        self.wav.setsampwidth(2)
+        self.wav.setframerate(sample_rate)
+    
+    def prepare(self, pcm):
+        return pcm.tobytes()
+    
+    def play(self, segment):
+        self.wav.writeframes(segment)
+        self.played += 1
+        if self.realtime:
+            time.sleep(len(segment) / 2 / self.sample_rate)
+    
+    def close(self):
+        self.wav.close()
+
+
+AUDIO_BACKENDS = {
+    'null': NullAudioBackend,
+    'winsound': WinsoundAudioBackend,
+    'aplay': AplayAudioBackend,
+    'wav': WavFileAudioBackend,
+}
+
+
+def create_audio_backend(name='auto', sample_rate=22050):
+    """
+    Create an audio backend by name.
+    
+    'auto' picks winsound on Windows, aplay where it is installed, else null.
+    
+    Returns:
+        NullAudioBackend: Backend instance
+    """
+    if name == 'auto':
+        if sys.platform == 'win32':
+            name = 'winsound'
+        elif shutil.which('aplay'):
+            name = 'aplay'
+        else:
+            print("[AUDIO] ⚠ No audio output found; alerts will be silent")
+            name = 'null'
+    if name not in AUDIO_BACKENDS:
+        raise ValueError(f"Unknown audio backend: {name!r}")
+    if name == 'wav':
+        return WavFileAudioBackend(sample_rate, Config.AUDIO_WAV_PATH)
+    return AUDIO_BACKENDS[name](sample_rate)
+
+
+class AudioAlerter(threading.Thread):
+    """
+    Long-lived audio worker fed by a priority queue.
+    
+    trigger_alert() only does a few comparisons and a queue put on the frame
+    thread. The worker plays pre-rendered patterns beep by beep and abandons
+    a pattern between beeps when a more urgent alert (e.g. CRITICAL over
+    DROWSY) is waiting.
+    """
+    
+    _STOP_PRIORITY = -1
+    
+    def __init__(self, backend=None, cooldown=0.5, latency=None):
+        """
+        Initialize audio alerter.
+        
+        Args:
+            backend: Audio backend instance (default: create_audio_backend(Config.AUDIO_BACKEND))
+            cooldown (float): Minimum seconds between accepted alerts
+            latency (LatencyMonitor): Records capture-to-playback latency ('audio' stage)
+        """
+        super().__init__(daemon=True, name="AudioAlerter")
+        self.latency = latency
+        self.backend = backend or create_audio_backend(Config.AUDIO_BACKEND, Config.AUDIO_SAMPLE_RATE)
+        self.last_alert_time = 0
+        self.last_alert_priority = None  # Priority of the last accepted alert
+        self.alert_cooldown = cooldown  # Cooldown between alerts to prevent spam
+        self.queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._playing_priority = None
+        self._pending_priority = None
+        self._state_lock = threading.Lock()  # Guards the priorities shared with the worker
+        
+        # Render every pattern once; the worker only replays cached buffers
+        self.patterns = {
+            threat_type: [self.backend.prepare(pcm) for pcm in
+                          render_tone_pattern(pattern, self.backend.sample_rate, Config.AUDIO_VOLUME)]
+            for threat_type, pattern in ALERT_PATTERNS.items()
+        }
+        
+        # Counters
+        self.alerts_played = 0
+        self.alerts_preempted = 0
     
-    def trigger_alert(self, threat_type, force=False):
-        """Trigger appropriate alert based on threat type (non-blocking via background thread)."""
-        current_time = time.time()
+    def trigger_alert(self, threat_type, force=False, origin=None):
+        """
+        Queue the alert for a threat type unless an equal or more urgent one is active.
+        
+        The cooldown only holds back alerts that are no more urgent than the
+        last accepted one, so e.g. CRITICAL always gets through right after
+        DROWSY.
         
-        # Check cooldown to prevent alert spam
-        if not force and (current_time - self.last_alert_time) < self.alert_cooldown:
+        Args:
+            threat_type (str): Key of ALERT_PATTERNS
+            force (bool): Ignore the cooldown
+            origin (float): Capture timestamp (time.monotonic()) of the frame that raised it
+        """
+        priority = ALERT_PRIORITIES.get(threat_type)
+        if priority is None:
             return
         
-        # Don't start new alert if one is already playing
-        with self.lock:
-            if self.alert_thread and self.alert_thread.is_alive():
+        with self._state_lock:
+            current_time = time.time()
+            
+            # Check cooldown to prevent alert spam (lower number = more urgent)
+            in_cooldown = (current_time - self.last_alert_time) < self.alert_cooldown
+            if not force and in_cooldown and (self.last_alert_priority is None
+                                              or priority >= self.last_alert_priority):
+                return
+            
+            # Don't queue an alert that would not interrupt what is playing or waiting
+            playing = self._playing_priority
+            pending = self._pending_priority
+            if (playing is not None and priority >= playing) or (pending is not None and priority >= pending):
                 return
             
             self.last_alert_time = current_time
-            # Start alert in background thread to prevent blocking camera
-            self.alert_thread = threading.Thread(target=self._play_alert_background, args=(threat_type,), daemon=True)
-            self.alert_thread.start()
+            self.last_alert_priority = priority
+            self._pending_priority = priority
+            self.queue.put((priority, next(self._sequence), threat_type, origin))
     
-    def _play_alert_background(self, threat_type):
-        """Play alert in background thread."""
-        try:
-            if threat_type == "CRITICAL":
-                self.play_critical_alert()
-            elif threat_type == "DROWSY":
-                self.play_drowsy_alert()
-            elif threat_type == "YAWN":
-                self.play_yawn_alert()
-            elif threat_type == "MULTI":
-                self.play_multi_alert()
-            elif threat_type == "ALCOHOL":
-                self.play_multi_alert()
-        except Exception as e:
-            print(f"[AUDIO ERROR] Background alert failed: {e}")
+    def _peek_priority(self):
+        """Priority of the most urgent queued alert, or None."""
+        with self.queue.mutex:
+            return self.queue.queue[0][0] if self.queue.queue else None
+    
+    def run(self):
+        """Play queued alerts until close()."""
+        while True:
+            priority, _, threat_type, origin = self.queue.get()
+            if priority == self._STOP_PRIORITY:
+                return
+            with self._state_lock:
+                self._pending_priority = self._peek_priority()
+                self._playing_priority = priority
+            try:
+                self._play(priority, threat_type, origin)
+            except Exception as e:
+                print(f"[AUDIO ERROR] Failed to play {threat_type} alert: {e}")
+            finally:
+                with self._state_lock:
+                    self._playing_priority = None
+    
+    def _play(self, priority, threat_type, origin=None):
+        """Play one pattern beep by beep, stopping early for a more urgent alert."""
+        if self.latency:
+            self.latency.since('audio', origin)
+        print(f"[AUDIO] Playing {threat_type} alert ({self.backend.name})")
+        for segment in self.patterns[threat_type]:
+            waiting = self._peek_priority()
+            if waiting is not None and waiting < priority:
+                self.alerts_preempted += 1
+                print(f"[AUDIO] {threat_type} alert preempted")
+                return
+            self.backend.play(segment)
+        self.alerts_played += 1
+    
+    def close(self, timeout=2.0):
+        """Stop the worker (after the current beep) and release the backend."""
+        if self.is_alive():
+            self.queue.put((self._STOP_PRIORITY, next(self._sequence), None, None))
+            self.join(timeout=timeout)
+        self.backend.close()
 
 
 # ============================================================================
 # IMPROVED EYE DETECTION
 # ============================================================================
 
+class RoiStats:
+    """
+    Summed-area table of a grayscale region for O(1) rectangle statistics.
+    
+    compute() builds the table once per frame (cv2.integral, or cv2.integral2
+    when variances are needed); every mean()/variance() afterwards is four
+    lookups regardless of the rectangle size. The table is built over the
+    face box only, since every region read by the detector lies inside it.
+    """
+    
+    def __init__(self, squared=False):
+        """
+        Args:
+            squared (bool): Also build the squared-sum table for variance()
+        """
+        self.squared = squared
+        self.sum = None
+        self.sqsum = None
+        self.origin = (0, 0)
+        self.bounds = (0, 0, 0, 0)
+    
+    def compute(self, gray_frame, box=None):
+        """
+        Build the summed-area table(s) for the frame, or for box (x, y, w, h) of it.
+        
+        Args:
+            gray_frame: Grayscale frame (uint8)
+            box: Optional (x, y, w, h) limiting the table to that region
+        """
+        frame_h, frame_w = gray_frame.shape[:2]
+        if box is None:
+            x1, y1, x2, y2 = 0, 0, frame_w, frame_h
+        else:
+            x, y, w, h = box
+            x1, y1 = max(0, x), max(0, y)
+            x2, y2 = min(frame_w, x + w), min(frame_h, y + h)
+        region = gray_frame[y1:y2, x1:x2]
+        self.origin = (x1, y1)
+        self.bounds = (x1, y1, max(x1, x2), max(y1, y2))
+        
+        # CV_32S sums cannot overflow below ~8.4 MP of 8-bit pixels; squares need CV_64F
+        if self.squared:
+            self.sum, self.sqsum = cv2.integral2(region, sum=self._reuse(self.sum, region),
+                                                 sqsum=self._reuse(self.sqsum, region),
+                                                 sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F)
+        else:
+            self.sum = cv2.integral(region, sum=self._reuse(self.sum, region), sdepth=cv2.CV_32S)
+    
+    @staticmethod
+    def _reuse(table, region):
+        """Return the previous table if it has the right shape (avoids reallocation)."""
+        if table is not None and table.shape == (region.shape[0] + 1, region.shape[1] + 1):
+            return table
+        return None
+    
+    def _corners(self, x1, y1, x2, y2):
+        """Clip a frame-coordinate rectangle to the table and convert to table indices."""
+        bx1, by1, bx2, by2 = self.bounds
+        x1, x2 = min(max(x1, bx1), bx2), min(max(x2, bx1), bx2)
+        y1, y2 = min(max(y1, by1), by2), min(max(y2, by1), by2)
+        ox, oy = self.origin
+        return x1 - ox, y1 - oy, x2 - ox, y2 - oy
+    
+    @staticmethod
+    def _rect_sum(table, x1, y1, x2, y2):
+        """Sum of the rectangle [x1, x2) x [y1, y2) from a summed-area table."""
+        item = table.item
+        return item(y2, x2) - item(y1, x2) - item(y2, x1) + item(y1, x1)
+    
+    def mean(self, x1, y1, x2, y2):
+        """
+        Mean intensity of the rectangle [x1, x2) x [y1, y2) in frame coordinates.
+        
+        Returns:
+            float or None: Mean, or None if the clipped rectangle is empty
+        """
+        x1, y1, x2, y2 = self._corners(x1, y1, x2, y2)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return self._rect_sum(self.sum, x1, y1, x2, y2) / ((x2 - x1) * (y2 - y1))
+    
+    def variance(self, x1, y1, x2, y2):
+        """
+        Intensity variance of the rectangle (requires squared=True).
+        
+        Returns:
+            float or None: Variance, or None if the clipped rectangle is empty
+        """
+        if self.sqsum is None:
+            raise ValueError("RoiStats was built without squared sums")
+        x1, y1, x2, y2 = self._corners(x1, y1, x2, y2)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        area = (x2 - x1) * (y2 - y1)
+        mean = self._rect_sum(self.sum, x1, y1, x2, y2) / area
+        return max(0.0, self._rect_sum(self.sqsum, x1, y1, x2, y2) / area - mean * mean)
+
+
+def build_intensity_ear_table(steps, default):
+    """
+    Precompute the 8-bit intensity -> EAR step function as a 256-entry table.
+    
+    Args:
+        steps: Ascending ((upper_intensity_exclusive, ear), ...) pairs
+        default: EAR for intensities above the last step
+    
+    Returns:
+        list: EAR value for every integer intensity 0..255
+    """
+    table = []
+    for intensity in range(256):
+        table.append(next((ear for limit, ear in steps if intensity < limit), default))
+    return table
+
+
 class ImprovedEyeDetector:
     """More robust eye detection using contour analysis and blink detection."""
     
-    def __init__(self):
-        """Initialize eye detector."""
-        cascade_path = cv2.data.haarcascades + 'haarcascade_eye.xml'
-        self.eye_cascade = cv2.CascadeClassifier(cascade_path)
+    # Region geometry as fractions of the face box: (x1, y1, x2, y2)
+    LEFT_EYE_REGION = (0.08, 0.32, 0.42, 0.46)
+    RIGHT_EYE_REGION = (0.58, 0.32, 0.92, 0.46)
+    MOUTH_REGION = (0.2, 0.6, 0.8, 1.0)
+    
+    # Camera picks up 30-75 intensity range in eye area:
+    # very dark = closed, dark = partially closed, medium = starting to close,
+    # brighter = open (crosses 0.12 threshold), bright = definitely open
+    EAR_INTENSITY_STEPS = ((35, 0.02), (45, 0.06), (55, 0.10), (65, 0.14), (75, 0.20))
+    EAR_INTENSITY_MAX = 0.25  # Very bright = fully open
+    EAR_EMPTY_ROI = 0.15
+    EAR_TABLE = build_intensity_ear_table(EAR_INTENSITY_STEPS, EAR_INTENSITY_MAX)
+    
+    MAR_ESTIMATORS = ('fast', 'laplacian')
+    
+    def __init__(self, mar_estimator=None, mar_downsample=None, mar_downsample_gain=None):
+        """
+        Initialize eye detector.
+        
+        Args:
+            mar_estimator (str): 'fast' or 'laplacian' (default: Config.MAR_ESTIMATOR)
+            mar_downsample (int): Mouth ROI shrink factor (default: Config.MAR_DOWNSAMPLE)
+            mar_downsample_gain (float): Energy gain when downsampling (default: Config.MAR_DOWNSAMPLE_GAIN)
+        """
+        self.roi_stats = RoiStats()
+        self._frame_count = 0
+        
+        self.mar_estimator = mar_estimator or Config.MAR_ESTIMATOR
+        if self.mar_estimator not in self.MAR_ESTIMATORS:
+            raise ValueError(f"Unknown MAR estimator: {self.mar_estimator!r}")
+        self.mar_downsample = max(1, int(mar_downsample or Config.MAR_DOWNSAMPLE))
+        self.mar_downsample_gain = (Config.MAR_DOWNSAMPLE_GAIN if mar_downsample_gain is None
+                                    else mar_downsample_gain)
+        self._mouth_small = None
+        self._mouth_laplacian = None
+    
+    @staticmethod
+    def region_rect(face_roi, region):
+        """
+        Frame-coordinate rectangle of a face-relative region.
+        
+        Args:
+            face_roi: Face box (x, y, w, h)
+            region: (x1, y1, x2, y2) fractions of the face box
+        
+        Returns:
+            tuple: (x1, y1, x2, y2) in pixels
+        """
+        x, y, w, h = face_roi
+        fx1, fy1, fx2, fy2 = region
+        return int(x + w * fx1), int(y + h * fy1), int(x + w * fx2), int(y + h * fy2)
+    
+    def compute_roi_stats(self, gray_frame, face_roi):
+        """
+        Build the per-frame summed-area table over the face box.
+        
+        Args:
+            gray_frame: Grayscale frame
+            face_roi: Region of interest (x, y, w, h)
+        
+        Returns:
+            RoiStats: Table to pass to detect_eye_closure_by_darkness()
+        """
+        self.roi_stats.compute(gray_frame, face_roi)
+        return self.roi_stats
+    
+    def intensity_to_ear(self, mean_intensity):
+        """Map a mean eye-region intensity to an EAR value (None = empty ROI)."""
+        if mean_intensity is None:
+            return self.EAR_EMPTY_ROI
+        return self.EAR_TABLE[min(255, int(mean_intensity))]
     
-    def detect_eye_closure_by_darkness(self, gray_frame, face_roi):
+    def detect_eye_closure_by_darkness(self, gray_frame, face_roi, roi_stats=None):
         """
         Detect eye closure using brightness levels in eye regions.
         Calibration phase establishes baseline, then changes are detected.
@@ -196,61 +722,69 @@ class ImprovedEyeDetector:
         Args:
             gray_frame: Grayscale frame
             face_roi: Region of interest (x, y, w, h)
+            roi_stats: RoiStats already computed for this frame and face (optional)
         
         Returns:
             tuple: (ear_left, ear_right, eyes_detected)
         """
-        x, y, w, h = face_roi
+        if roi_stats is None:
+            roi_stats = self.compute_roi_stats(gray_frame, face_roi)
         
         # Eye regions - focused on eyeball area
-        eye_top = int(y + h * 0.32)
-        eye_bottom = int(y + h * 0.46)
+        l_mean = roi_stats.mean(*self.region_rect(face_roi, self.LEFT_EYE_REGION))
+        r_mean = roi_stats.mean(*self.region_rect(face_roi, self.RIGHT_EYE_REGION))
         
-        left_eye_x1 = int(x + w * 0.08)
-        left_eye_x2 = int(x + w * 0.42)
+        ear_left = self.intensity_to_ear(l_mean)
+        ear_right = self.intensity_to_ear(r_mean)
         
-        right_eye_x1 = int(x + w * 0.58)
-        right_eye_x2 = int(x + w * 0.92)
+        # DEBUG: Print every EYE_DEBUG_INTERVAL frames
+        self._frame_count += 1
+        if Config.EYE_DEBUG_INTERVAL and self._frame_count % Config.EYE_DEBUG_INTERVAL == 0:
+            print(f"[DEBUG EYE] L_int={l_mean or 0:.0f} EAR={ear_left:.4f} | "
+                  f"R_int={r_mean or 0:.0f} EAR={ear_right:.4f} (threshold=0.12)")
         
-        # Extract eye regions
-        left_eye_roi = gray_frame[eye_top:eye_bottom, left_eye_x1:left_eye_x2]
-        right_eye_roi = gray_frame[eye_top:eye_bottom, right_eye_x1:right_eye_x2]
+        return ear_left, ear_right, True
+    
+    def mouth_energy(self, mouth_region, estimator=None, downsample=None, gain=None):
+        """
+        Laplacian energy (variance of the Laplacian) of the mouth region.
         
-        # Simple intensity-based approach with proper scaling
-        # Camera picks up 30-75 intensity range in eye area
-        def intensity_to_ear(roi):
-            if roi.size == 0:
-                return 0.15
-            
-            mean_intensity = np.mean(roi)
-            
-            # Scale camera intensity to EAR values
-            if mean_intensity < 35:
-                return 0.02  # Very dark = eyes closed
-            elif mean_intensity < 45:
-                return 0.06  # Dark = partially closed
-            elif mean_intensity < 55:
-                return 0.10  # Medium = starting to close
-            elif mean_intensity < 65:
-                return 0.14  # Brighter = eyes open (crosses 0.12 threshold)
-            elif mean_intensity < 75:
-                return 0.20  # Bright = definitely open
-            else:
-                return 0.25  # Very bright = fully open
+        'laplacian' is the original float64 filter plus a separate variance pass.
+        'fast' filters at int16 depth (exact for 8-bit input: |Laplacian| <= 1020)
+        into a reused buffer and takes the variance in the same pass as the mean
+        (cv2.meanStdDev), optionally on a downsampled ROI rescaled by gain.
         
-        ear_left = intensity_to_ear(left_eye_roi)
-        ear_right = intensity_to_ear(right_eye_roi)
+        Args:
+            mouth_region: Grayscale mouth ROI (non-empty)
+            estimator: Override self.mar_estimator
+            downsample: Override self.mar_downsample
+            gain: Override self.mar_downsample_gain
         
-        # DEBUG: Print every 10 frames
-        if not hasattr(self, '_frame_count'):
-            self._frame_count = 0
-        self._frame_count += 1
-        if self._frame_count % 10 == 0:
-            l_mean = np.mean(left_eye_roi) if left_eye_roi.size > 0 else 0
-            r_mean = np.mean(right_eye_roi) if right_eye_roi.size > 0 else 0
-            print(f"[DEBUG EYE] L_int={l_mean:.0f} EAR={ear_left:.4f} | R_int={r_mean:.0f} EAR={ear_right:.4f} (threshold=0.12)")
+        Returns:
+            float: Laplacian variance on the full-resolution scale
+        """
+        estimator = estimator or self.mar_estimator
+        if estimator == 'laplacian':
+            return cv2.Laplacian(mouth_region, cv2.CV_64F).var()
         
-        return ear_left, ear_right, True
+        factor = self.mar_downsample if downsample is None else max(1, int(downsample))
+        if factor > 1 and min(mouth_region.shape[:2]) >= 3 * factor:
+            size = (mouth_region.shape[1] // factor, mouth_region.shape[0] // factor)
+            small = self._mouth_small
+            if small is None or small.shape[::-1] != size:
+                small = None
+            mouth_region = self._mouth_small = cv2.resize(mouth_region, size, dst=small,
+                                                          interpolation=cv2.INTER_AREA)
+            gain = self.mar_downsample_gain if gain is None else gain
+        else:
+            gain = 1.0
+        
+        laplacian = self._mouth_laplacian
+        if laplacian is None or laplacian.shape != mouth_region.shape:
+            laplacian = None
+        laplacian = self._mouth_laplacian = cv2.Laplacian(mouth_region, cv2.CV_16S, dst=laplacian)
+        _, stddev = cv2.meanStdDev(laplacian)
+        return float(stddev[0, 0]) ** 2 * gain
     
     def estimate_mar(self, gray_frame, face_roi):
         """
@@ -263,14 +797,14 @@ class ImprovedEyeDetector:
         Returns:
             float: Estimated MAR
         """
-        x, y, w, h = face_roi
-        mouth_region = gray_frame[int(y+h*0.6):y+h, x+int(w*0.2):x+int(w*0.8)]
+        mx1, my1, mx2, my2 = self.region_rect(face_roi, self.MOUTH_REGION)
+        mouth_region = gray_frame[max(0, my1):my2, max(0, mx1):mx2]
         
         # Detect high variance in mouth region during speech/yawn
         if mouth_region.size == 0:
             return 0.05
         
-        variance = cv2.Laplacian(mouth_region, cv2.CV_64F).var()
+        variance = self.mouth_energy(mouth_region)
         # Normalize variance to MAR scale
         mar = min(0.5, variance / 10000.0)
         
@@ -278,6 +812,267 @@ class ImprovedEyeDetector:
 
 
 
+# ============================================================================
+# FACE LOCALISATION (DETECT-THEN-TRACK)
+# ============================================================================
+
+def box_iou(box_a, box_b):
+    """
+    Intersection-over-union of two (x, y, w, h) boxes.
+    
+    Returns:
+        float: IoU in [0, 1]
+    """
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+class FaceTracker:
+    """
+    Detect-then-track face localisation around the Haar cascade.
+    
+    After a full-frame hit, the cascade only searches an expanded window around
+    the last face box, restricted to similar face sizes. Full-frame detection
+    runs every `redetect_interval` frames, when the track is lost, or when the
+    tracking confidence falls below `min_confidence`.
+    
+    The cascade can run on a downscaled copy of the gray frame
+    (`detection_scale` < 1); boxes are mapped back to full resolution so the
+    eye/mouth measurements keep their full-resolution detail.
+    """
+    
+    CASCADE_WINDOW = 24  # Native window of haarcascade_frontalface_default.xml
+    
+    def __init__(self, face_cascade, redetect_interval=15, search_margin=0.5,
+                 size_tolerance=0.3, min_confidence=0.4, detection_scale=1.0):
+        """
+        Initialize face tracker.
+        
+        Args:
+            face_cascade: Loaded cv2.CascadeClassifier
+            redetect_interval (int): Frames between full-frame detections (0 = never track)
+            search_margin (float): Window expansion per side as a fraction of the box size
+            size_tolerance (float): Allowed relative face size change while tracking
+            min_confidence (float): Minimum tracking confidence to keep tracking
+            detection_scale (float): Resize factor for the cascade input (1.0, 0.5, 0.25)
+        """
+        self.face_cascade = face_cascade
+        self.redetect_interval = redetect_interval
+        self.search_margin = search_margin
+        self.size_tolerance = size_tolerance
+        self.min_confidence = min_confidence
+        self.detection_scale = detection_scale
+        
+        self.last_box = None  # Full resolution
+        self._last_small_box = None  # Detection resolution
+        self._small = None  # Reused downscaled frame
+        self._frame_size = (0, 0)
+        self.confidence = 0.0
+        self.frames_since_detect = 0
+        
+        # Counters
+        self.detect_frames = 0
+        self.track_frames = 0
+        self.track_losses = 0
+    
+    def locate(self, gray):
+        """
+        Locate the driver's face in a grayscale frame.
+        
+        Args:
+            gray: Grayscale frame (full resolution)
+        
+        Returns:
+            tuple: (x, y, w, h) full-resolution face box, or None if no face was found
+        """
+        small = self._downscale(gray)
+        
+        if (self._last_small_box is not None
+                and self.frames_since_detect < self.redetect_interval
+                and self.confidence >= self.min_confidence):
+            box = self._track(small)
+            if box is not None:
+                self.track_frames += 1
+                self.frames_since_detect += 1
+                return self._to_full(box)
+            self.track_losses += 1
+        
+        box = self._detect(small)
+        return self._to_full(box) if box is not None else None
+    
+    def _downscale(self, gray):
+        """Return the cascade input at detection scale."""
+        self._frame_size = (gray.shape[1], gray.shape[0])
+        if self.detection_scale >= 1.0:
+            return gray
+        
+        size = (max(1, int(gray.shape[1] * self.detection_scale)),
+                max(1, int(gray.shape[0] * self.detection_scale)))
+        if self._small is None or self._small.shape[::-1] != size:
+            self._small = np.empty((size[1], size[0]), dtype=gray.dtype)
+        cv2.resize(gray, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        return self._small
+    
+    def _min_face_size(self):
+        """Minimum face side at detection scale (never below the cascade window)."""
+        return max(self.CASCADE_WINDOW, int(Config.FACE_MIN_SIZE * self.detection_scale))
+    
+    def _to_full(self, box):
+        """Map a detection-scale box back to full resolution."""
+        if self.detection_scale >= 1.0:
+            self.last_box = box
+            return box
+        
+        inv = 1.0 / self.detection_scale
+        frame_w, frame_h = self._frame_size
+        x = min(int(round(box[0] * inv)), frame_w - 1)
+        y = min(int(round(box[1] * inv)), frame_h - 1)
+        w = min(int(round(box[2] * inv)), frame_w - x)
+        h = min(int(round(box[3] * inv)), frame_h - y)
+        self.last_box = (x, y, w, h)
+        return self.last_box
+    
+    def _detect(self, small):
+        """Full-frame detection; keeps the largest face."""
+        min_side = self._min_face_size()
+        faces = self.face_cascade.detectMultiScale(
+            small,
+            scaleFactor=Config.FACE_SCALE_FACTOR,
+            minNeighbors=Config.FACE_MIN_NEIGHBORS,
+            minSize=(min_side, min_side)
+        )
+        self.detect_frames += 1
+        self.frames_since_detect = 0
+        
+        if len(faces) == 0:
+            self.reset()
+            return None
+        
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        self._last_small_box = (int(x), int(y), int(w), int(h))
+        self.confidence = 1.0
+        return self._last_small_box
+    
+    def _track(self, small):
+        """Search the window around the last box; returns the box or None."""
+        frame_h, frame_w = small.shape[:2]
+        x, y, w, h = self._last_small_box
+        
+        margin_x = int(w * self.search_margin)
+        margin_y = int(h * self.search_margin)
+        x1 = max(0, x - margin_x)
+        y1 = max(0, y - margin_y)
+        x2 = min(frame_w, x + w + margin_x)
+        y2 = min(frame_h, y + h + margin_y)
+        
+        min_side = max(self._min_face_size(), int(min(w, h) * (1.0 - self.size_tolerance)))
+        max_side = int(max(w, h) * (1.0 + self.size_tolerance))
+        if x2 - x1 < min_side or y2 - y1 < min_side:
+            return None
+        
+        faces = self.face_cascade.detectMultiScale(
+            small[y1:y2, x1:x2],
+            scaleFactor=Config.FACE_SCALE_FACTOR,
+            minNeighbors=Config.FACE_MIN_NEIGHBORS,
+            minSize=(min_side, min_side),
+            maxSize=(max_side, max_side)
+        )
+        if len(faces) == 0:
+            return None
+        
+        candidates = [(int(fx) + x1, int(fy) + y1, int(fw), int(fh)) for fx, fy, fw, fh in faces]
+        box = max(candidates, key=lambda b: box_iou(b, self._last_small_box))
+        
+        # Confidence follows how consistent the box is with the previous one
+        self.confidence = 0.5 * self.confidence + 0.5 * box_iou(box, self._last_small_box)
+        self._last_small_box = box
+        return box
+    
+    def reset(self):
+        """Drop the current track so the next frame runs a full-frame detection."""
+        self.last_box = None
+        self._last_small_box = None
+        self.confidence = 0.0
+    
+    def reset_stats(self):
+        """Zero the detect/track counters."""
+        self.detect_frames = 0
+        self.track_frames = 0
+        self.track_losses = 0
+    
+    def get_stats(self):
+        """
+        Get detect vs. track counters.
+        
+        Returns:
+            dict: detect_frames, track_frames, track_losses, track_ratio, confidence
+        """
+        total = self.detect_frames + self.track_frames
+        return {
+            'detect_frames': self.detect_frames,
+            'track_frames': self.track_frames,
+            'track_losses': self.track_losses,
+            'track_ratio': self.track_frames / total if total else 0.0,
+            'confidence': self.confidence,
+        }
+
+
+def select_detection_scale(face_cascade, gray_frames, candidates=(0.25, 0.5, 1.0),
+                           recall_target=0.95, min_iou=0.5):
+    """
+    Pick the smallest detection scale that still meets a recall target.
+    
+    Full-resolution, full-frame detections on the reference frames are the
+    ground truth; a frame counts as recalled at a given scale if its mapped-back
+    box overlaps the reference box by at least `min_iou`.
+    
+    Args:
+        face_cascade: Loaded cv2.CascadeClassifier
+        gray_frames (list): Grayscale reference frames
+        candidates (tuple): Scales to evaluate
+        recall_target (float): Required recall (0-1)
+        min_iou (float): Minimum IoU to count a detection as matching
+    
+    Returns:
+        tuple: (selected scale, list of per-scale dicts with scale/recall/detect_ms)
+    """
+    reference_tracker = FaceTracker(face_cascade, redetect_interval=0, detection_scale=1.0)
+    references = [reference_tracker.locate(gray) for gray in gray_frames]
+    reference_count = sum(1 for box in references if box is not None)
+    
+    report = []
+    selected = max(candidates)
+    for scale in sorted(candidates):
+        tracker = FaceTracker(face_cascade, redetect_interval=0, detection_scale=scale)
+        hits = 0
+        start = time.perf_counter()
+        for gray, reference in zip(gray_frames, references):
+            box = tracker.locate(gray)
+            if reference is not None and box is not None and box_iou(box, reference) >= min_iou:
+                hits += 1
+        elapsed = time.perf_counter() - start
+        
+        recall = hits / reference_count if reference_count else 0.0
+        report.append({
+            'scale': scale,
+            'recall': recall,
+            'detect_ms': 1000.0 * elapsed / max(1, len(gray_frames)),
+        })
+    
+    for entry in report:
+        if entry['recall'] >= recall_target:
+            selected = entry['scale']
+            break
+    
+    return selected, report
+
+
 # ============================================================================
 # GEOMETRY UTILITIES
 # ============================================================================
@@ -390,96 +1185,1709 @@ def get_landmark_coordinates(face_landmarks, indices, frame_width, frame_height)
     return coordinates
 
 
-
-# ============================================================================
+def landmarks_to_array(face_landmarks, frame_width, frame_height, out=None):
+    """
+    Copy MediaPipe face landmarks into an (N, 2) float32 array of pixel coordinates.
+    
+    Args:
+        face_landmarks: MediaPipe face landmarks object
+        frame_width (int): Video frame width
+        frame_height (int): Video frame height
+        out (np.ndarray): Optional (N, 2) float32 array to fill instead of allocating
+    
+    Returns:
+        np.ndarray: (N, 2) array of (x, y), N = 468 (478 with iris refinement)
+    """
+    landmarks = face_landmarks.landmark
+    count = len(landmarks)
+    if out is None or out.shape != (count, 2):
+        out = np.empty((count, 2), dtype=np.float32)
+    out.reshape(-1)[:] = np.fromiter(
+        itertools.chain.from_iterable((landmark.x, landmark.y) for landmark in landmarks),
+        dtype=np.float32, count=2 * count
+    )
+    out *= (frame_width, frame_height)
+    return out
+
+
+def calculate_ear_batch(eyes):
+    """
+    Vectorised calculate_ear over many eyes (frames, both eyes, several faces).
+    
+    Args:
+        eyes (array-like): (..., 6, 2) eye points, p1..p6 in calculate_ear order
+    
+    Returns:
+        np.ndarray: (...) EAR values; 0.3 where the eye width is below 0.01 (as calculate_ear)
+    """
+    eyes = np.asarray(eyes, dtype=np.float64)
+    if eyes.shape[-2:] != (6, 2):
+        raise ValueError(f"expected (..., 6, 2) eye points, got {eyes.shape}")
+    vertical = eyes[..., (1, 2), :] - eyes[..., (5, 4), :]
+    horizontal = eyes[..., 0, :] - eyes[..., 3, :]
+    vertical = np.hypot(vertical[..., 0], vertical[..., 1]).sum(axis=-1)
+    horizontal = np.hypot(horizontal[..., 0], horizontal[..., 1])
+    degenerate = horizontal < 0.01
+    return np.where(degenerate, 0.3, vertical / (2.0 * np.where(degenerate, 1.0, horizontal)))
+
+
+def calculate_mar_batch(mouths):
+    """
+    Vectorised calculate_mar over many mouths.
+    
+    Args:
+        mouths (array-like): (..., 4, 2) mouth points ordered top, bottom, left, right
+    
+    Returns:
+        np.ndarray: (...) MAR values; 0.0 where the mouth width is below 0.01 (as calculate_mar)
+    """
+    mouths = np.asarray(mouths, dtype=np.float64)
+    if mouths.shape[-2:] != (4, 2):
+        raise ValueError(f"expected (..., 4, 2) mouth points, got {mouths.shape}")
+    vertical = mouths[..., 0, :] - mouths[..., 1, :]
+    horizontal = mouths[..., 2, :] - mouths[..., 3, :]
+    vertical = np.hypot(vertical[..., 0], vertical[..., 1])
+    horizontal = np.hypot(horizontal[..., 0], horizontal[..., 1])
+    degenerate = horizontal < 0.01
+    return np.where(degenerate, 0.0, vertical / np.where(degenerate, 1.0, horizontal))
+
+
+def landmark_ears(landmarks, eye_indices):
+    """
+    EARs gathered from landmark arrays.
+    
+    Args:
+        landmarks (np.ndarray): (..., N, 2) landmarks - one face, a recorded stream or several faces
+        eye_indices (array-like): (E, 6) landmark indices, p1..p6 per eye
+    
+    Returns:
+        np.ndarray: (..., E) EAR values
+    """
+    return calculate_ear_batch(landmarks[..., np.asarray(eye_indices, dtype=np.intp), :])
+
+
+def landmark_mar(landmarks, mouth_indices):
+    """
+    MARs gathered from landmark arrays.
+    
+    Args:
+        landmarks (np.ndarray): (..., N, 2) landmarks - one face, a recorded stream or several faces
+        mouth_indices (array-like): Landmark indices of the top, bottom, left and right lip points
+    
+    Returns:
+        np.ndarray: (...) MAR values
+    """
+    return calculate_mar_batch(landmarks[..., np.asarray(mouth_indices, dtype=np.intp), :])
+
+
+# ============================================================================
+# DETECTOR BACKENDS
+# ============================================================================
+
+# One detector backend result; landmarks is None for backends without landmarks
+FaceDetection = namedtuple('FaceDetection', ['face_roi', 'ear_left', 'ear_right', 'mar',
+                                             'confidence', 'landmarks'])
+
+
+class HaarDetectorBackend:
+    """Haar cascade face box (detect-then-track) + intensity/texture eye and mouth heuristics."""
+    
+    name = 'haar'
+    
+    def __init__(self, face_tracker, eye_detector):
+        """
+        Args:
+            face_tracker (FaceTracker): Face localisation
+            eye_detector (ImprovedEyeDetector): EAR/MAR estimation inside the face box
+        """
+        self.face_tracker = face_tracker
+        self.eye_detector = eye_detector
+        self.thresholds = {}  # Config.EAR_THRESHOLD / MAR_THRESHOLD are tuned for this backend
+    
+    def detect(self, frame, gray, timer):
+        """
+        Analyse one mirrored frame.
+        
+        Args:
+            frame: BGR frame (unused, the heuristics work on gray)
+            gray: Grayscale frame
+            timer (StageTimer): Per-stage timing
+        
+        Returns:
+            FaceDetection or None if no face was found
+        """
+        face_roi = self.face_tracker.locate(gray)
+        timer.lap('face_detect')
+        if face_roi is None:
+            return None
+        
+        roi_stats = self.eye_detector.compute_roi_stats(gray, face_roi)
+        ear_left, ear_right, _ = self.eye_detector.detect_eye_closure_by_darkness(gray, face_roi, roi_stats)
+        timer.lap('eye_closure')
+        mar = self.eye_detector.estimate_mar(gray, face_roi)
+        timer.lap('mar')
+        return FaceDetection(face_roi, ear_left, ear_right, mar, self.face_tracker.confidence, None)
+    
+    def close(self):
+        """Nothing to release."""
+
+
+class FaceMeshDetectorBackend:
+    """MediaPipe FaceMesh (CPU) landmarks with EAR/MAR from vectorised index gathers."""
+    
+    name = 'facemesh'
+    
+    # MediaPipe FaceMesh indices, p1..p6 in calculate_ear order (corner, top, top, corner, bottom, bottom)
+    LEFT_EYE = (362, 385, 387, 263, 373, 380)
+    RIGHT_EYE = (33, 160, 158, 133, 153, 144)
+    EYE_INDICES = np.array((LEFT_EYE, RIGHT_EYE), dtype=np.intp)  # (2, 6)
+    MOUTH = np.array((13, 14, 78, 308), dtype=np.intp)  # Inner lip top, bottom, left corner, right corner
+    NUM_LANDMARKS = 468
+    
+    def __init__(self, min_detection_confidence=None, min_tracking_confidence=None):
+        """
+        Args:
+            min_detection_confidence (float): Default Config.FACEMESH_MIN_DETECTION_CONFIDENCE
+            min_tracking_confidence (float): Default Config.FACEMESH_MIN_TRACKING_CONFIDENCE
+        
+        Raises:
+            ImportError: mediapipe is not installed
+        """
+        try:
+            import mediapipe as mp
+        except ImportError as e:
+            raise ImportError("the 'facemesh' backend needs mediapipe (pip install mediapipe)") from e
+        
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=False,
+            max_num_faces=1,
+            refine_landmarks=False,
+            min_detection_confidence=(Config.FACEMESH_MIN_DETECTION_CONFIDENCE
+                                      if min_detection_confidence is None else min_detection_confidence),
+            min_tracking_confidence=(Config.FACEMESH_MIN_TRACKING_CONFIDENCE
+                                     if min_tracking_confidence is None else min_tracking_confidence)
+        )
+        self.thresholds = {'ear_threshold': Config.FACEMESH_EAR_THRESHOLD,
+                           'mar_threshold': Config.FACEMESH_MAR_THRESHOLD}
+        self.landmarks = np.zeros((self.NUM_LANDMARKS, 2), dtype=np.float32)
+        self._rgb = None
+    
+    def detect(self, frame, gray, timer):
+        """
+        Analyse one mirrored frame.
+        
+        Args:
+            frame: BGR frame
+            gray: Grayscale frame (unused, FaceMesh takes RGB)
+            timer (StageTimer): Per-stage timing
+        
+        Returns:
+            FaceDetection or None if no face was found. Its landmarks array is
+            reused by the next call.
+        """
+        if self._rgb is None or self._rgb.shape != frame.shape:
+            self._rgb = np.empty_like(frame)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        output = self.face_mesh.process(rgb)
+        if not output.multi_face_landmarks:
+            timer.lap('face_detect')
+            return None
+        
+        h, w = frame.shape[:2]
+        points = landmarks_to_array(output.multi_face_landmarks[0], w, h, out=self.landmarks)
+        self.landmarks = points
+        x1, y1 = points.min(axis=0)
+        x2, y2 = points.max(axis=0)
+        face_roi = (int(x1), int(y1), int(x2 - x1), int(y2 - y1))
+        timer.lap('face_detect')
+        
+        ear_left, ear_right = landmark_ears(points, self.EYE_INDICES)
+        timer.lap('eye_closure')
+        mar = float(landmark_mar(points, self.MOUTH))
+        timer.lap('mar')
+        # FaceMesh reports no per-frame score; a returned face passed min_tracking_confidence
+        return FaceDetection(face_roi, float(ear_left), float(ear_right), mar, 1.0, points)
+    
+    def close(self):
+        """Release the MediaPipe graph."""
+        self.face_mesh.close()
+
+
+DETECTOR_BACKENDS = ('haar', 'facemesh')
+
+
+
+# ============================================================================
 # TELEMETRY DATABASE
 # ============================================================================
 
-class TelemetryDB:
-    """SQLite database manager for alert telemetry."""
+class TelemetryWriter(threading.Thread):
+    """
+    Background thread that batches telemetry rows into SQLite transactions.
+    
+    Producers call submit() with an SQL statement and its parameters; the
+    writer drains the bounded queue and commits every `batch_size` rows or
+    `flush_interval` seconds, grouping consecutive rows of the same statement
+    into a single executemany().
+    """
+    
+    OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+    _STOP = object()
+    
+    def __init__(self, db_path, max_queue=10000, batch_size=256, flush_interval=0.5,
+                 overflow_policy='drop_oldest', block_timeout=0.05, synchronous='NORMAL', latency=None):
+        """
+        Initialize telemetry writer.
+        
+        Args:
+            db_path (str): SQLite database path
+            max_queue (int): Maximum number of rows waiting to be written
+            batch_size (int): Rows per transaction
+            flush_interval (float): Max seconds a queued row waits for its transaction
+            overflow_policy (str): 'drop_oldest', 'drop_newest' or 'block' when the queue is full
+            block_timeout (float): Max seconds submit() waits with the 'block' policy
+            synchronous (str): SQLite synchronous pragma (OFF, NORMAL, FULL)
+            latency (LatencyMonitor): Records capture-to-commit latency of timed rows ('db' stage)
+        """
+        super().__init__(daemon=True, name="TelemetryWriter")
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.db_path = db_path
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.synchronous = synchronous
+        self.latency = latency
+        
+        # Counters
+        self.rows_queued = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.batches_written = 0
+    
+    def submit(self, sql, params, origin=None):
+        """
+        Queue one row for writing (never blocks longer than block_timeout).
+        
+        Args:
+            sql (str): Statement
+            params (tuple): Statement parameters
+            origin (float): Capture timestamp to measure the commit latency from (None = untimed)
+        
+        Returns:
+            bool: True if the row was queued
+        """
+        item = (sql, params, origin)
+        try:
+            if self.overflow_policy == 'block':
+                self.queue.put(item, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(item)
+            self.rows_queued += 1
+            return True
+        except queue.Full:
+            pass
+        
+        if self.overflow_policy == 'drop_oldest':
+            try:
+                self.queue.get_nowait()
+                self.rows_dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+                self.rows_queued += 1
+                return True
+            except queue.Full:
+                pass
+        
+        self.rows_dropped += 1
+        return False
+    
+    def run(self):
+        """Drain the queue in batched transactions until shutdown()."""
+        try:
+            connection = sqlite3.connect(self.db_path)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(f'PRAGMA synchronous={self.synchronous}')
+        except Exception as e:
+            print(f"[DB ERROR] Telemetry writer failed to open database: {e}")
+            return
+        
+        stopping = False
+        while not stopping:
+            try:
+                item = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            
+            if stopping:
+                # Rows queued after the stop marker still get written
+                while True:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not self._STOP:
+                        batch.append(item)
+            
+            if batch:
+                self._write_batch(connection, batch)
+        
+        connection.close()
+    
+    def _write_batch(self, connection, batch):
+        """Write one batch in a single transaction."""
+        try:
+            with connection:
+                for sql, group in itertools.groupby(batch, key=lambda item: item[0]):
+                    connection.executemany(sql, [params for _, params, _ in group])
+            self.rows_written += len(batch)
+            self.batches_written += 1
+            if self.latency:
+                for _, _, origin in batch:
+                    self.latency.since('db', origin)
+        except Exception as e:
+            print(f"[DB ERROR] Failed to write telemetry batch of {len(batch)} rows: {e}")
+            self.rows_dropped += len(batch)
+    
+    def shutdown(self, timeout=5.0):
+        """Flush all queued rows and stop the writer thread."""
+        if not self.is_alive():
+            return
+        try:
+            self.queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            print("[DB ERROR] Telemetry queue stuck full at shutdown")
+            return
+        self.join(timeout=timeout)
+    
+    def get_stats(self):
+        """
+        Get writer counters.
+        
+        Returns:
+            dict: queued, written, dropped, pending, batches
+        """
+        return {
+            'queued': self.rows_queued,
+            'written': self.rows_written,
+            'dropped': self.rows_dropped,
+            'pending': self.queue.qsize(),
+            'batches': self.batches_written,
+        }
+
+
+class TelemetryDB:
+    """SQLite database manager for alert telemetry."""
+    
+    ALERT_INSERT = '''
+        INSERT INTO alerts 
+        (timestamp, threat_score, trigger_reason, ear, mar, alcohol_level, duration_seconds)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''
+    CALIBRATION_INSERT = '''
+        INSERT INTO calibration
+        (timestamp, baseline_ear, baseline_mar, samples_collected, profile, detector, lighting_bucket)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''
+    # Calibration cache key columns, added to databases created before the cache existed
+    CALIBRATION_KEY_COLUMNS = (('profile', 'TEXT'), ('detector', 'TEXT'), ('lighting_bucket', 'INTEGER'))
+    # Time index covers the report columns so range reports never touch the table
+    INDEX_STATEMENTS = (
+        '''CREATE INDEX IF NOT EXISTS idx_alerts_time
+           ON alerts(timestamp, trigger_reason, threat_score, duration_seconds)''',
+        '''CREATE INDEX IF NOT EXISTS idx_alerts_reason_time
+           ON alerts(trigger_reason, timestamp)''',
+        '''CREATE INDEX IF NOT EXISTS idx_calibration_time
+           ON calibration(timestamp)''',
+        '''CREATE INDEX IF NOT EXISTS idx_calibration_key
+           ON calibration(profile, detector, lighting_bucket, timestamp)''',
+    )
+    
+    def __init__(self, db_path, async_writes=None, latency=None):
+        """
+        Initialize or connect to telemetry database.
+        
+        Args:
+            db_path (str): SQLite database path
+            async_writes (bool): Use a background TelemetryWriter (default: Config.TELEMETRY_ASYNC)
+            latency (LatencyMonitor): Records capture-to-commit latency of alerts ('db' stage)
+        """
+        self.db_path = db_path
+        self.latency = latency
+        self.connection = None
+        self.cursor = None
+        self.writer = None
+        self._initialize_db()
+        
+        if async_writes is None:
+            async_writes = Config.TELEMETRY_ASYNC
+        if async_writes and self.connection:
+            self.writer = TelemetryWriter(
+                db_path,
+                max_queue=Config.TELEMETRY_QUEUE_SIZE,
+                batch_size=Config.TELEMETRY_BATCH_SIZE,
+                flush_interval=Config.TELEMETRY_FLUSH_INTERVAL_MS / 1000.0,
+                overflow_policy=Config.TELEMETRY_OVERFLOW_POLICY,
+                block_timeout=Config.TELEMETRY_BLOCK_TIMEOUT,
+                synchronous=Config.TELEMETRY_SYNCHRONOUS,
+                latency=latency
+            )
+            self.writer.start()
+    
+    def _initialize_db(self):
+        """Create database and tables if they don't exist."""
+        try:
+            # Opened on a startup thread and used from the main loop afterwards (never concurrently)
+            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.cursor = self.connection.cursor()
+            self.cursor.execute('PRAGMA journal_mode=WAL')
+            self.cursor.execute(f'PRAGMA synchronous={Config.TELEMETRY_SYNCHRONOUS}')
+            
+            # Create alerts table
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    threat_score REAL NOT NULL,
+                    trigger_reason TEXT NOT NULL,
+                    ear REAL,
+                    mar REAL,
+                    alcohol_level INTEGER,
+                    duration_seconds REAL
+                )
+            ''')
+            
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS calibration (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    baseline_ear REAL NOT NULL,
+                    baseline_mar REAL NOT NULL,
+                    samples_collected INTEGER,
+                    profile TEXT,
+                    detector TEXT,
+                    lighting_bucket INTEGER
+                )
+            ''')
+            existing = {row[1] for row in self.cursor.execute('PRAGMA table_info(calibration)')}
+            for column, column_type in self.CALIBRATION_KEY_COLUMNS:
+                if column not in existing:
+                    self.cursor.execute(f'ALTER TABLE calibration ADD COLUMN {column} {column_type}')
+            
+            # Per-frame signal log: plain rowid key, so frames sharing a millisecond
+            # (bursty delivery, a wall-clock step back) are all kept
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS signal_log (
+                    ts_ms INTEGER NOT NULL,
+                    ear_left REAL,
+                    ear_right REAL,
+                    ear_avg REAL,
+                    mar REAL,
+                    alcohol_level INTEGER,
+                    threat_score REAL,
+                    face_detected INTEGER NOT NULL
+                )
+            ''')
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_signal_log_ts ON signal_log(ts_ms)')
+            
+            # Rollups keyed by bucket start (epoch seconds); EAR/MAR over face frames only
+            for table in SignalLogger.ROLLUP_TABLES:
+                self.cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        bucket INTEGER PRIMARY KEY,
+                        samples INTEGER NOT NULL,
+                        face_frames INTEGER NOT NULL,
+                        ear_min REAL, ear_sum REAL, ear_max REAL,
+                        mar_min REAL, mar_sum REAL, mar_max REAL,
+                        alcohol_min INTEGER, alcohol_sum INTEGER, alcohol_max INTEGER,
+                        threat_min REAL, threat_sum REAL, threat_max REAL
+                    )
+                ''')
+                self.cursor.execute(f'''
+                    CREATE VIEW IF NOT EXISTS {table}_stats AS
+                    SELECT bucket, samples, face_frames,
+                           ear_min, ear_sum / NULLIF(face_frames, 0) AS ear_mean, ear_max,
+                           mar_min, mar_sum / NULLIF(face_frames, 0) AS mar_mean, mar_max,
+                           alcohol_min, CAST(alcohol_sum AS REAL) / samples AS alcohol_mean, alcohol_max,
+                           threat_min, threat_sum / samples AS threat_mean, threat_max
+                    FROM {table}
+                ''')
+            
+            for statement in self.INDEX_STATEMENTS:
+                self.cursor.execute(statement)
+            
+            self.connection.commit()
+            print("[DB] Database initialized successfully")
+        except Exception as e:
+            print(f"[DB ERROR] Failed to initialize database: {e}")
+    
+    def _write(self, sql, params, origin=None):
+        """Queue a row for the writer thread, or write it synchronously."""
+        if self.writer:
+            self.writer.submit(sql, params, origin)
+            return
+        self.cursor.execute(sql, params)
+        self.connection.commit()
+        if self.latency:
+            self.latency.since('db', origin)
+    
+    def write(self, sql, params=()):
+        """Queue an arbitrary statement (used by SignalLogger)."""
+        try:
+            self._write(sql, params)
+        except Exception as e:
+            print(f"[DB ERROR] Failed to write telemetry: {e}")
+    
+    def log_alert(self, threat_score, trigger_reason, ear=None, mar=None, 
+                  alcohol_level=None, duration=None, origin=None):
+        """
+        Log an alert event to the database.
+        
+        Args:
+            threat_score (float): Threat score (0-100)
+            trigger_reason (str): Reason for alert (Drowsiness, Yawn, Alcohol, Multi)
+            ear (float): Current EAR value
+            mar (float): Current MAR value
+            alcohol_level (int): Current alcohol sensor reading
+            duration (float): Duration of trigger in seconds
+            origin (float): Capture timestamp (time.monotonic()) of the frame that raised it
+        """
+        try:
+            timestamp = datetime.now().isoformat()
+            self._write(self.ALERT_INSERT,
+                        (timestamp, threat_score, trigger_reason, ear, mar, alcohol_level, duration),
+                        origin)
+        except Exception as e:
+            print(f"[DB ERROR] Failed to log alert: {e}")
+    
+    def log_calibration(self, baseline_ear, baseline_mar, samples, profile=None, detector=None,
+                        lighting_bucket=None):
+        """Log calibration baseline values (with the calibration cache key, if known)."""
+        try:
+            timestamp = datetime.now().isoformat()
+            self._write(self.CALIBRATION_INSERT, (timestamp, baseline_ear, baseline_mar, samples,
+                                                  profile, detector, lighting_bucket))
+        except Exception as e:
+            print(f"[DB ERROR] Failed to log calibration: {e}")
+    
+    def load_calibration(self, profile, detector, lighting_bucket, max_age_days=None):
+        """
+        Latest stored baseline for a calibration cache key.
+        
+        Args:
+            profile (str): Driver/vehicle profile
+            detector (str): Detector backend the baseline was measured with
+            lighting_bucket (int): Lighting bucket (see CalibrationEngine.observe_brightness)
+            max_age_days (float): Ignore baselines older than this (None = any age)
+        
+        Returns:
+            dict: baseline_ear, baseline_mar, samples, timestamp; None if nothing is cached
+        """
+        if not self.connection:
+            return None
+        sql = '''
+            SELECT baseline_ear, baseline_mar, samples_collected, timestamp
+            FROM calibration
+            WHERE profile = ? AND detector = ? AND lighting_bucket = ?
+        '''
+        params = [profile, detector, lighting_bucket]
+        if max_age_days:
+            sql += ' AND timestamp >= ?'
+            params.append((datetime.now() - timedelta(days=max_age_days)).isoformat())
+        sql += ' ORDER BY timestamp DESC LIMIT 1'
+        try:
+            row = self.connection.execute(sql, params).fetchone()
+        except Exception as e:
+            print(f"[DB ERROR] Failed to load calibration: {e}")
+            return None
+        if row is None:
+            return None
+        return {'baseline_ear': row[0], 'baseline_mar': row[1], 'samples': row[2], 'timestamp': row[3]}
+    
+    def get_stats(self):
+        """
+        Get telemetry writer counters.
+        
+        Returns:
+            dict: queued, written, dropped, pending, batches (empty if writes are synchronous)
+        """
+        return self.writer.get_stats() if self.writer else {}
+    
+    def close(self):
+        """Flush pending rows and close database connection."""
+        if self.writer:
+            self.writer.shutdown()
+        if self.connection:
+            self.connection.close()
+
+
+class SignalLogger:
+    """
+    Opt-in per-frame signal log with incrementally maintained rollups.
+    
+    Every frame becomes one row in `signal_log`. Min/sum/max aggregates are
+    kept in memory for the current second; when the second closes it is
+    written to `signal_rollup_1s` and merged into `signal_rollup_1m` with an
+    upsert, so rollups never rescan raw rows. Raw and rollup rows age out
+    according to the SIGNAL_LOG_*_RETENTION settings.
+    """
+    
+    ROLLUP_TABLES = ('signal_rollup_1s', 'signal_rollup_1m')
+    RAW_INSERT = '''
+        INSERT INTO signal_log
+        (ts_ms, ear_left, ear_right, ear_avg, mar, alcohol_level, threat_score, face_detected)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    ROLLUP_UPSERT = '''
+        INSERT INTO {table} (bucket, samples, face_frames,
+                             ear_min, ear_sum, ear_max, mar_min, mar_sum, mar_max,
+                             alcohol_min, alcohol_sum, alcohol_max, threat_min, threat_sum, threat_max)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(bucket) DO UPDATE SET
+            samples = samples + excluded.samples,
+            face_frames = face_frames + excluded.face_frames,
+            ear_min = coalesce(min(ear_min, excluded.ear_min), ear_min, excluded.ear_min),
+            ear_sum = coalesce(ear_sum, 0) + coalesce(excluded.ear_sum, 0),
+            ear_max = coalesce(max(ear_max, excluded.ear_max), ear_max, excluded.ear_max),
+            mar_min = coalesce(min(mar_min, excluded.mar_min), mar_min, excluded.mar_min),
+            mar_sum = coalesce(mar_sum, 0) + coalesce(excluded.mar_sum, 0),
+            mar_max = coalesce(max(mar_max, excluded.mar_max), mar_max, excluded.mar_max),
+            alcohol_min = min(alcohol_min, excluded.alcohol_min),
+            alcohol_sum = alcohol_sum + excluded.alcohol_sum,
+            alcohol_max = max(alcohol_max, excluded.alcohol_max),
+            threat_min = min(threat_min, excluded.threat_min),
+            threat_sum = threat_sum + excluded.threat_sum,
+            threat_max = max(threat_max, excluded.threat_max)
+    '''
+    
+    def __init__(self, telemetry_db):
+        """
+        Initialize signal logger.
+        
+        Args:
+            telemetry_db (TelemetryDB): Database the rows are written through
+        """
+        self.telemetry_db = telemetry_db
+        self.rollup_1s_sql = self.ROLLUP_UPSERT.format(table='signal_rollup_1s')
+        self.rollup_1m_sql = self.ROLLUP_UPSERT.format(table='signal_rollup_1m')
+        self.retention = (
+            ('signal_log', 'ts_ms', 1000, Config.SIGNAL_LOG_RAW_RETENTION_HOURS * 3600),
+            ('signal_rollup_1s', 'bucket', 1, Config.SIGNAL_LOG_1S_RETENTION_DAYS * 86400),
+            ('signal_rollup_1m', 'bucket', 1, Config.SIGNAL_LOG_1M_RETENTION_DAYS * 86400),
+        )
+        self.current_second = None
+        self.aggregate = None
+        self.last_prune = 0.0
+        self.rows_logged = 0
+    
+    def log(self, results, alcohol_level, threat_score, timestamp=None):
+        """
+        Log one frame.
+        
+        Args:
+            results (dict): Output of process_frame()
+            alcohol_level (int): Current alcohol sensor reading
+            threat_score (float): Threat score for this frame
+            timestamp (float): Capture time of the frame in epoch seconds (default: now)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        ts_ms = int(timestamp * 1000)
+        face = results['face_detected']
+        alcohol_level = int(alcohol_level or 0)
+        threat_score = float(threat_score)
+        
+        self.telemetry_db.write(self.RAW_INSERT, (
+            ts_ms,
+            results['ear_left'] if face else None,
+            results['ear_right'] if face else None,
+            results['ear_avg'] if face else None,
+            results['mar'] if face else None,
+            alcohol_level,
+            threat_score,
+            int(face)
+        ))
+        self.rows_logged += 1
+        
+        second = ts_ms // 1000
+        if second != self.current_second:
+            self.flush()
+            self.current_second = second
+        self._accumulate(face, results['ear_avg'], results['mar'], alcohol_level, threat_score)
+        
+        if timestamp - self.last_prune >= Config.SIGNAL_LOG_PRUNE_INTERVAL:
+            self.last_prune = timestamp
+            self._prune(timestamp)
+    
+    def _accumulate(self, face, ear, mar, alcohol_level, threat_score):
+        """Fold one sample into the current-second aggregate."""
+        agg = self.aggregate
+        if agg is None:
+            agg = self.aggregate = [0, 0, None, 0.0, None, None, 0.0, None,
+                                    alcohol_level, 0, alcohol_level,
+                                    threat_score, 0.0, threat_score]
+        agg[0] += 1
+        if face:
+            agg[1] += 1
+            agg[2] = ear if agg[2] is None else min(agg[2], ear)
+            agg[3] += ear
+            agg[4] = ear if agg[4] is None else max(agg[4], ear)
+            agg[5] = mar if agg[5] is None else min(agg[5], mar)
+            agg[6] += mar
+            agg[7] = mar if agg[7] is None else max(agg[7], mar)
+        agg[8] = min(agg[8], alcohol_level)
+        agg[9] += alcohol_level
+        agg[10] = max(agg[10], alcohol_level)
+        agg[11] = min(agg[11], threat_score)
+        agg[12] += threat_score
+        agg[13] = max(agg[13], threat_score)
+    
+    def flush(self):
+        """Write the current-second aggregate into both rollup tables."""
+        if self.aggregate is None:
+            return
+        agg = self.aggregate
+        if not agg[1]:
+            agg[3] = agg[6] = None  # No face frames: EAR/MAR sums stay NULL
+        self.telemetry_db.write(self.rollup_1s_sql, (self.current_second, *agg))
+        self.telemetry_db.write(self.rollup_1m_sql, (self.current_second - self.current_second % 60, *agg))
+        self.aggregate = None
+    
+    def _prune(self, now):
+        """Queue retention deletes for raw and rollup rows."""
+        for table, column, units_per_second, retention_seconds in self.retention:
+            cutoff = int((now - retention_seconds) * units_per_second)
+            self.telemetry_db.write(f"DELETE FROM {table} WHERE {column} < ?", (cutoff,))
+    
+    def close(self):
+        """Flush the partially filled second."""
+        self.flush()
+
+
+# ============================================================================
+# FRAME SOURCES
+# ============================================================================
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+class FileFrameSource:
+    """
+    Offline frame source reading a video file or a directory of images.
+
+    Mirrors the subset of the cv2.VideoCapture interface used by the capture
+    thread (isOpened/read/release) and never paces frames, so it can be read
+    as fast as the consumer allows.
+    """
+
+    def __init__(self, path, loop=False):
+        """
+        Initialize file frame source.
+
+        Args:
+            path (str): Video file or directory of images (sorted by name)
+            loop (bool): Restart from the first frame when the source ends
+        """
+        self.path = path
+        self.loop = loop
+        self.cap = None
+        self.image_paths = []
+        self.position = 0
+
+        if os.path.isdir(path):
+            self.image_paths = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            self.cap = cv2.VideoCapture(path)
+
+    def isOpened(self):
+        """Return True if the source has frames to read."""
+        if self.cap is not None:
+            return self.cap.isOpened()
+        return len(self.image_paths) > 0
+
+    def read(self, image=None):
+        """
+        Read the next frame.
+
+        Args:
+            image: Optional preallocated array to decode into
+
+        Returns:
+            tuple: (ret, frame) like cv2.VideoCapture.read()
+        """
+        if self.cap is not None:
+            ret, frame = self.cap.read(image)
+            if not ret and self.loop:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.cap.read(image)
+            return ret, frame
+
+        if self.position >= len(self.image_paths):
+            if not self.loop or not self.image_paths:
+                return False, None
+            self.position = 0
+
+        frame = cv2.imread(self.image_paths[self.position])
+        self.position += 1
+        if frame is not None and image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            frame = image
+        return frame is not None, frame
+
+    def release(self):
+        """Release the underlying video file."""
+        if self.cap is not None:
+            self.cap.release()
+
+
+def open_frame_source(source, loop=False):
+    """
+    Open a frame source from a camera index or a file path.
+
+    Args:
+        source (int or str): Camera index, video file or image directory
+        loop (bool): Loop file sources when they end
+
+    Returns:
+        Object with isOpened/read/release (cv2.VideoCapture or FileFrameSource)
+    """
+    if isinstance(source, int) or str(source).isdigit():
+        return cv2.VideoCapture(int(source))
+    return FileFrameSource(source, loop=loop)
+
+
+# ============================================================================
+# STAGE TIMING
+# ============================================================================
+
+class StageTimer:
+    """Records per-stage wall-clock durations of the frame pipeline."""
+
+    def __init__(self, enabled=False, monitor=None):
+        """
+        Initialize stage timer.
+
+        Args:
+            enabled (bool): Record samples; when False every call is a no-op
+            monitor (LatencyMonitor): Record into its histograms instead of keeping
+                every sample (bounded memory for long runs)
+        """
+        self.enabled = enabled
+        self.monitor = monitor
+        self.samples = {}
+        self._last = 0.0
+
+    def start(self):
+        """Mark the beginning of a frame."""
+        if self.enabled:
+            self._last = time.perf_counter()
+
+    def lap(self, stage):
+        """Record the time since the previous mark under the given stage name."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.monitor is not None:
+            self.monitor.record(stage, now - self._last)
+        else:
+            self.samples.setdefault(stage, []).append(now - self._last)
+        self._last = now
+
+    def reset(self):
+        """Discard all recorded samples."""
+        self.samples = {}
+
+
+# ============================================================================
+# LATENCY INSTRUMENTATION
+# ============================================================================
+
+class LatencyHistogram:
+    """
+    Log-linear latency histogram (HdrHistogram bucket layout).
+    
+    Values are counted in integer microseconds. Every power of two is split
+    into SUB_BUCKETS linear sub-buckets, so any recorded value is reported
+    within 1/SUB_BUCKETS (~3%) of its true value at every magnitude, using a
+    fixed array of counters. record() is O(1) and never allocates.
+    """
+    
+    SUB_BUCKET_BITS = 5
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    
+    def __init__(self, max_seconds=60.0):
+        """
+        Initialize histogram.
+    
+        Args:
+            max_seconds (float): Largest trackable latency; larger values count in the top bucket
+        """
+        self.max_value = max(int(max_seconds * 1e6), 2 * self.SUB_BUCKETS)
+        self.counts = [0] * (self.bucket_index(self.max_value) + 1)
+        self.reset()
+    
+    @classmethod
+    def bucket_index(cls, value):
+        """Bucket holding a value in microseconds."""
+        if value < cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - cls.SUB_BUCKET_BITS - 1
+        return (shift << cls.SUB_BUCKET_BITS) + (value >> shift)
+    
+    @classmethod
+    def bucket_range(cls, index):
+        """
+        Value range of a bucket.
+    
+        Returns:
+            tuple: (lowest, highest) microseconds counted in the bucket
+        """
+        if index < cls.SUB_BUCKETS:
+            return index, index
+        shift = (index >> cls.SUB_BUCKET_BITS) - 1
+        lowest = (index - (shift << cls.SUB_BUCKET_BITS)) << shift
+        return lowest, lowest + (1 << shift) - 1
+    
+    def reset(self):
+        """Forget all samples."""
+        counts = self.counts
+        for i in range(len(counts)):
+            counts[i] = 0
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+    
+    def record(self, seconds):
+        """Count one latency sample (in seconds)."""
+        value = int(seconds * 1e6)
+        if value < 0:
+            value = 0
+        elif value > self.max_value:
+            value = self.max_value
+        self.counts[self.bucket_index(value)] += 1
+        self.count += 1
+        self.total_us += value
+        if self.min_us is None or value < self.min_us:
+            self.min_us = value
+        if value > self.max_us:
+            self.max_us = value
+    
+    def merge(self, other):
+        """Add another histogram's samples (same max_seconds) to this one."""
+        counts = self.counts
+        for i, n in enumerate(other.counts):
+            if n:
+                counts[i] += n
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+    
+    def percentiles(self, percents):
+        """
+        Latency at each percentile, in seconds.
+    
+        Reports the highest value of the bucket the percentile falls in
+        (capped at the recorded maximum), so results never understate latency.
+    
+        Args:
+            percents (sequence): Ascending percentiles (0-100)
+    
+        Returns:
+            list: Seconds per percentile (None if the histogram is empty)
+        """
+        if self.count == 0:
+            return [None] * len(percents)
+        targets = [max(1, math.ceil(p / 100.0 * self.count)) for p in percents]
+        results = []
+        seen = 0
+        target_index = 0
+        for index, n in enumerate(self.counts):
+            if not n:
+                continue
+            seen += n
+            while target_index < len(targets) and seen >= targets[target_index]:
+                results.append(min(self.bucket_range(index)[1], self.max_us) / 1e6)
+                target_index += 1
+            if target_index == len(targets):
+                break
+        return results
+    
+    def summary(self):
+        """
+        Summary statistics.
+    
+        Returns:
+            dict: count, mean, min, p50, p90, p99, p999, max (seconds; None when empty)
+        """
+        p50, p90, p99, p999 = self.percentiles((50, 90, 99, 99.9))
+        empty = self.count == 0
+        return {
+            'count': self.count,
+            'mean': None if empty else self.total_us / self.count / 1e6,
+            'min': None if empty else self.min_us / 1e6,
+            'p50': p50,
+            'p90': p90,
+            'p99': p99,
+            'p999': p999,
+            'max': None if empty else self.max_us / 1e6,
+        }
+
+
+class LatencyRecorder:
+    """
+    Whole-run and rolling-window histograms for one pipeline stage.
+    
+    The window is kept as `slices` sub-histograms that are recycled as time
+    moves on, so the rolling view covers the last window_seconds to within
+    one slice. Safe to record from any thread.
+    """
+    
+    def __init__(self, window_seconds=60.0, slices=6, max_seconds=60.0):
+        """
+        Initialize recorder.
+    
+        Args:
+            window_seconds (float): Length of the rolling window
+            slices (int): Sub-histograms the window is divided into
+            max_seconds (float): Largest trackable latency
+        """
+        self.max_seconds = max_seconds
+        self.slice_seconds = window_seconds / slices
+        self.slices = [LatencyHistogram(max_seconds) for _ in range(slices)]
+        self.slice_ids = [-1] * slices
+        self.total = LatencyHistogram(max_seconds)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds, now=None):
+        """Count one sample (now: monotonic time of the measurement)."""
+        slice_id = int((time.monotonic() if now is None else now) / self.slice_seconds)
+        position = slice_id % len(self.slices)
+        with self._lock:
+            if self.slice_ids[position] != slice_id:
+                self.slices[position].reset()
+                self.slice_ids[position] = slice_id
+            self.slices[position].record(seconds)
+            self.total.record(seconds)
+    
+    def window(self, now=None):
+        """Merged histogram of the samples in the rolling window."""
+        oldest = int((time.monotonic() if now is None else now) / self.slice_seconds) - len(self.slices) + 1
+        merged = LatencyHistogram(self.max_seconds)
+        with self._lock:
+            for histogram, slice_id in zip(self.slices, self.slice_ids):
+                if slice_id >= oldest:
+                    merged.merge(histogram)
+        return merged
+    
+    def totals(self):
+        """
+        Whole-run sum and count, read together.
+        
+        Returns:
+            tuple: (total microseconds, samples)
+        """
+        with self._lock:
+            return self.total.total_us, self.total.count
+    
+    def whole_run(self):
+        """Copy of the whole-run histogram."""
+        merged = LatencyHistogram(self.max_seconds)
+        with self._lock:
+            merged.merge(self.total)
+        return merged
+
+
+class LatencyMonitor:
+    """
+    Per-stage latency histograms from camera capture to the outputs.
+    
+    Capture-relative stages are measured from the monotonic timestamp the
+    capture thread attaches to each frame; the other stages are durations.
+    Components record from their own threads (audio worker, serial I/O
+    thread, telemetry writer), so a stage shows when its output actually
+    happened rather than when it was queued.
+    """
+    
+    # Stage name -> description (report order)
+    STAGES = {
+        'queue': 'capture -> frame loop picks the frame up',
+        'process': 'process_frame() (analysed frames)',
+        'score': 'signal smoothing + threat scoring',
+        'dispatch': 'capture -> outputs queued by the frame loop',
+        'audio': 'capture -> alert playback starts',
+        'serial': 'capture -> threat score written to the serial port',
+        'actuation': 'capture -> relay-level score (>= THREAT_SCORE_CRITICAL) written',
+        'db': 'capture -> alert row committed',
+    }
+    PERCENTILES = ('p50', 'p90', 'p99', 'p999', 'max')
+    
+    def __init__(self, enabled=True, window_seconds=60.0, max_seconds=60.0):
+        """
+        Initialize latency monitor.
+    
+        Args:
+            enabled (bool): Record samples; when False every call is a no-op
+            window_seconds (float): Rolling window reported by snapshot()
+            max_seconds (float): Largest trackable latency
+        """
+        self.enabled = enabled
+        self.window_seconds = window_seconds
+        self.max_seconds = max_seconds
+        self.recorders = {}
+        self._lock = threading.Lock()
+    
+    def record(self, stage, seconds):
+        """Count one latency sample for a stage."""
+        if not self.enabled:
+            return
+        recorder = self.recorders.get(stage)
+        if recorder is None:
+            with self._lock:
+                recorder = self.recorders.setdefault(
+                    stage, LatencyRecorder(self.window_seconds, max_seconds=self.max_seconds))
+        recorder.record(seconds)
+    
+    def since(self, stage, origin):
+        """Record the time elapsed since a monotonic capture timestamp (None = skip)."""
+        if self.enabled and origin is not None:
+            now = time.monotonic()
+            self.record(stage, now - origin)
+    
+    def stage_names(self):
+        """Recorded stages in report order."""
+        known = [stage for stage in self.STAGES if stage in self.recorders]
+        return known + [stage for stage in list(self.recorders) if stage not in self.STAGES]
+    
+    def snapshot(self, whole_run=False):
+        """
+        Latency summary per stage (safe to call at any time, from any thread).
+    
+        Args:
+            whole_run (bool): Summarise the whole run instead of the rolling window
+    
+        Returns:
+            dict: Stage -> LatencyHistogram.summary() (seconds)
+        """
+        stats = {}
+        for stage in self.stage_names():
+            recorder = self.recorders[stage]
+            histogram = recorder.whole_run() if whole_run else recorder.window()
+            stats[stage] = histogram.summary()
+        return stats
+    
+    def report(self, whole_run=False, prefix="[LATENCY]"):
+        """Print the per-stage latency table (milliseconds)."""
+        stats = self.snapshot(whole_run)
+        if not stats:
+            return
+        scope = "whole run" if whole_run else f"last {self.window_seconds:.0f}s"
+        print(f"{prefix} Latency ({scope}, ms)")
+        print(f"{prefix} {'stage':<10}{'count':>8}" + "".join(f"{name:>9}" for name in self.PERCENTILES))
+        for stage, summary in stats.items():
+            values = "".join(f"{'-':>9}" if summary[name] is None else f"{summary[name] * 1000:9.2f}"
+                             for name in self.PERCENTILES)
+            print(f"{prefix} {stage:<10}{summary['count']:>8}{values}")
+    
+    def dump(self, path):
+        """
+        Write the whole-run histograms to a JSON file.
+    
+        Each stage holds its summary (seconds) and its non-empty buckets as
+        [lowest_us, highest_us, count] so the distribution can be re-plotted.
+        """
+        report = {}
+        for stage in self.stage_names():
+            histogram = self.recorders[stage].whole_run()
+            buckets = [list(LatencyHistogram.bucket_range(index)) + [n]
+                       for index, n in enumerate(histogram.counts) if n]
+            report[stage] = {
+                'description': self.STAGES.get(stage, ''),
+                'summary': histogram.summary(),
+                'buckets': buckets,
+            }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+# ============================================================================
+# PROFILING
+# ============================================================================
+
+class SamplingProfiler(threading.Thread):
+    """
+    Statistical profiler that samples the Python stack of every thread.
+    
+    Every `interval` seconds the sampler reads sys._current_frames() and
+    counts each thread's stack as one collapsed line
+    ("thread;outermost;...;innermost"), the input format of flamegraph.pl,
+    speedscope and inferno. Native calls that release the GIL (OpenCV,
+    serial, SQLite) are attributed to the Python line that made them. The
+    cost depends on the sampling rate, not on the code being profiled.
+    
+    A thread whose innermost frame is in IDLE_MODULES is blocked waiting
+    (queue get, event or condition wait, socket select) and is reported as
+    idle rather than busy.
+    """
+    
+    IDLE_MODULES = ('threading.py', 'queue.py', 'selectors.py', 'socketserver.py')
+    
+    def __init__(self, interval=0.005, max_depth=64):
+        """
+        Initialize profiler.
+    
+        Args:
+            interval (float): Seconds between samples
+            max_depth (int): Innermost frames kept per stack
+        """
+        super().__init__(daemon=True, name="SamplingProfiler")
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = {}  # collapsed stack -> samples
+        self.samples = 0
+        self.sampling_time = 0.0  # Seconds spent taking samples (profiler overhead)
+        self.duration = 0.0
+        self._labels = {}
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        """Sample at a fixed rate until stop()."""
+        own_ident = threading.get_ident()
+        started = time.monotonic()
+        next_sample = started
+        while not self._stop_event.wait(max(0.0, next_sample - time.monotonic())):
+            now = time.monotonic()
+            next_sample += self.interval
+            if next_sample < now:
+                next_sample = now + self.interval  # Fell behind (long GIL hold); don't burst
+            self._sample(own_ident)
+        self.duration = time.monotonic() - started
+    
+    def _label(self, code, lineno):
+        """Flame graph frame name: 'function (file:line)'."""
+        key = (code, lineno)
+        label = self._labels.get(key)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})".replace(';', ':')
+            self._labels[key] = label
+        return label
+    
+    def _sample(self, own_ident):
+        """Count the current stack of every other thread once."""
+        start = time.perf_counter()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = self.stacks
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(self._label(frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}").replace(';', ':'))
+            key = ';'.join(reversed(labels))
+            stacks[key] = stacks.get(key, 0) + 1
+        self.samples += 1
+        self.sampling_time += time.perf_counter() - start
+    
+    def stop(self, timeout=1.0):
+        """Stop sampling."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=timeout)
+    
+    def write_collapsed(self, path):
+        """Write the sampled stacks in collapsed format ("stack count" per line)."""
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+    
+    def is_idle(self, label):
+        """True if a frame label is a blocking wait in one of IDLE_MODULES."""
+        return label.rsplit(' (', 1)[-1].split(':', 1)[0] in self.IDLE_MODULES
+    
+    def thread_activity(self):
+        """
+        Share of samples each thread was busy (not blocked in an idle wait).
+    
+        Returns:
+            dict: Thread name -> (busy samples, total samples), busiest first
+        """
+        activity = {}
+        for stack, count in self.stacks.items():
+            parts = stack.split(';')
+            busy, total = activity.get(parts[0], (0, 0))
+            activity[parts[0]] = (busy + (0 if self.is_idle(parts[-1]) else count), total + count)
+        return dict(sorted(activity.items(), key=lambda item: -item[1][0]))
+    
+    def top_functions(self, limit=15):
+        """
+        Innermost frames with the most busy samples (self time).
+    
+        Returns:
+            list: (thread, frame label, samples), most sampled first
+        """
+        leaves = {}
+        for stack, count in self.stacks.items():
+            parts = stack.split(';')
+            if self.is_idle(parts[-1]):
+                continue
+            key = (parts[0], parts[-1])
+            leaves[key] = leaves.get(key, 0) + count
+        ranked = sorted(leaves.items(), key=lambda item: -item[1])[:limit]
+        return [(thread, label, count) for (thread, label), count in ranked]
+    
+    def report(self, limit=15, prefix="[PROFILE]"):
+        """Print how busy each thread was and the hottest frames (share of wall time)."""
+        if not self.samples:
+            return
+        overhead = self.sampling_time / max(self.duration, 1e-9) * 100
+        print(f"{prefix} {self.samples} samples every {self.interval*1000:.1f} ms "
+              f"(sampler overhead {overhead:.1f}% of one core)")
+        print(f"{prefix} {'thread':<24}{'busy':>8}")
+        for thread, (busy, total) in self.thread_activity().items():
+            print(f"{prefix} {thread:<24}{busy / total * 100:>7.1f}%")
+        print(f"{prefix} {'wall':>7}  {'thread':<20}hottest frames")
+        for thread, label, count in self.top_functions(limit):
+            print(f"{prefix} {count / self.samples * 100:>6.1f}%  {thread:<20}{label}")
+
+
+def report_stage_profile(loop_monitor, frame_monitor=None, prefix="[PROFILE]"):
+    """
+    Print where the frame loop's time went, stage by stage.
+    
+    Args:
+        loop_monitor (LatencyMonitor): Durations of the run() loop stages
+        frame_monitor (LatencyMonitor): Durations of the process_frame() sub-stages
+    """
+    stages = [(stage, loop_monitor.recorders[stage].whole_run()) for stage in loop_monitor.stage_names()]
+    loop_total = sum(histogram.total_us for _, histogram in stages)
+    if not loop_total:
+        return
+    if frame_monitor:
+        stages += [(f"  {stage}", frame_monitor.recorders[stage].whole_run())
+                   for stage in frame_monitor.stage_names()]
+    print(f"{prefix} Frame loop stages (whole run)")
+    print(f"{prefix} {'stage':<16}{'count':>8}{'total s':>10}{'share':>8}{'mean ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for stage, histogram in stages:
+        summary = histogram.summary()
+        print(f"{prefix} {stage:<16}{summary['count']:>8}{histogram.total_us / 1e6:>10.2f}"
+              f"{histogram.total_us / loop_total * 100:>7.1f}%{summary['mean'] * 1000:>9.2f}"
+              f"{summary['p99'] * 1000:>9.2f}{summary['max'] * 1000:>9.2f}")
+
+
+def write_stage_collapsed(path, loop_monitor, frame_monitor=None, parent='analyse'):
+    """
+    Write stage totals as collapsed stacks (microseconds) for a stage flame graph.
+    
+    Loop stages become "run;<stage>"; process_frame sub-stages nest under
+    "run;<parent>", whose own line keeps only the time not covered by them.
+    """
+    totals = {stage: loop_monitor.recorders[stage].whole_run().total_us
+              for stage in loop_monitor.stage_names()}
+    children = {}
+    if frame_monitor:
+        children = {stage: frame_monitor.recorders[stage].whole_run().total_us
+                    for stage in frame_monitor.stage_names()}
+    with open(path, 'w') as f:
+        for stage, total in totals.items():
+            if stage == parent and children:
+                total = max(0, total - sum(children.values()))
+                for child, child_total in children.items():
+                    f.write(f"run;{parent};{child} {child_total}\n")
+            f.write(f"run;{stage} {total}\n")
+
+
+# ============================================================================
+# ADAPTIVE PROCESSING RATE
+# ============================================================================
+
+class AdaptiveScheduler:
+    """
+    Decides which frames get the full analysis pipeline.
     
-    def __init__(self, db_path):
-        """Initialize or connect to telemetry database."""
-        self.db_path = db_path
-        self.connection = None
-        self.cursor = None
-        self._initialize_db()
+    While the driver is calm (face visible, threat 0, counters idle, EAR and MAR
+    clear of their thresholds) for idle_frames analysed frames, only every
+    idle_stride-th frame is analysed; the others reuse the last results. Any
+    analysed frame that is not calm, or an alcohol rise seen on any frame,
+    returns to full rate at once, so an event is picked up at most
+    idle_stride - 1 frames late.
+    """
     
-    def _initialize_db(self):
-        """Create database and tables if they don't exist."""
-        try:
-            self.connection = sqlite3.connect(self.db_path)
-            self.cursor = self.connection.cursor()
-            
-            # Create alerts table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS alerts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    threat_score REAL NOT NULL,
-                    trigger_reason TEXT NOT NULL,
-                    ear REAL,
-                    mar REAL,
-                    alcohol_level INTEGER,
-                    duration_seconds REAL
-                )
-            ''')
-            
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS calibration (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    baseline_ear REAL NOT NULL,
-                    baseline_mar REAL NOT NULL,
-                    samples_collected INTEGER
-                )
-            ''')
-            
-            self.connection.commit()
-            print("[DB] Database initialized successfully")
-        except Exception as e:
-            print(f"[DB ERROR] Failed to initialize database: {e}")
+    def __init__(self, enabled=True, idle_stride=3, idle_frames=60, ear_wake_ratio=1.25,
+                 mar_wake_ratio=0.8, alcohol_wake_delta=50):
+        """
+        Initialize scheduler.
+        
+        Args:
+            enabled (bool): When False every frame is analysed
+            idle_stride (int): Analyse every N-th frame while idle
+            idle_frames (int): Calm analysed frames before going idle
+            ear_wake_ratio (float): Wake when EAR < ear_threshold x ratio
+            mar_wake_ratio (float): Wake when MAR > mar_threshold x ratio
+            alcohol_wake_delta (float): Wake when alcohol rises this much above its idle level
+        """
+        self.enabled = enabled
+        self.idle_stride = max(1, int(idle_stride))
+        self.idle_frames = idle_frames
+        self.ear_wake_ratio = ear_wake_ratio
+        self.mar_wake_ratio = mar_wake_ratio
+        self.alcohol_wake_delta = alcohol_wake_delta
+        
+        self.idle = False
+        self.calm_frames = 0
+        self.alcohol_reference = None
+        self._phase = 0
+        
+        self.frames = 0
+        self.analysed = 0
+        self.wakeups = 0
+        self.analysis_fps = 0.0
+        self._window_start = None
+        self._window_analysed = 0
     
-    def log_alert(self, threat_score, trigger_reason, ear=None, mar=None, 
-                  alcohol_level=None, duration=None):
+    def should_analyse(self, timestamp=None):
         """
-        Log an alert event to the database.
+        Call once per frame before analysis.
         
         Args:
-            threat_score (float): Threat score (0-100)
-            trigger_reason (str): Reason for alert (Drowsiness, Yawn, Alcohol, Multi)
-            ear (float): Current EAR value
-            mar (float): Current MAR value
-            alcohol_level (int): Current alcohol sensor reading
-            duration (float): Duration of trigger in seconds
+            timestamp (float): Capture time in seconds, time.monotonic() clock (for the analysis rate)
+        
+        Returns:
+            bool: True to run the full pipeline on this frame
         """
-        try:
-            timestamp = datetime.now().isoformat()
-            self.cursor.execute('''
-                INSERT INTO alerts 
-                (timestamp, threat_score, trigger_reason, ear, mar, alcohol_level, duration_seconds)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (timestamp, threat_score, trigger_reason, ear, mar, alcohol_level, duration))
-            self.connection.commit()
-        except Exception as e:
-            print(f"[DB ERROR] Failed to log alert: {e}")
+        self.frames += 1
+        analyse = True
+        if self.idle:
+            self._phase += 1
+            analyse = self._phase >= self.idle_stride
+            if analyse:
+                self._phase = 0
+        if analyse:
+            self.analysed += 1
+            self._window_analysed += 1
+        
+        now = time.monotonic() if timestamp is None else timestamp
+        if self._window_start is None:
+            self._window_start = now
+        elif now - self._window_start >= 1.0:
+            self.analysis_fps = self._window_analysed / (now - self._window_start)
+            self._window_start = now
+            self._window_analysed = 0
+        return analyse
     
-    def log_calibration(self, baseline_ear, baseline_mar, samples):
-        """Log calibration baseline values."""
-        try:
-            timestamp = datetime.now().isoformat()
-            self.cursor.execute('''
-                INSERT INTO calibration (timestamp, baseline_ear, baseline_mar, samples_collected)
-                VALUES (?, ?, ?, ?)
-            ''', (timestamp, baseline_ear, baseline_mar, samples))
-            self.connection.commit()
-        except Exception as e:
-            print(f"[DB ERROR] Failed to log calibration: {e}")
+    def observe(self, results, threat_score, engine):
+        """
+        Update the idle state from an analysed frame.
+        
+        Args:
+            results (dict): Output of process_frame()
+            threat_score (float): Score of this frame
+            engine (ThreatScoringEngine): Scorer (thresholds and counters)
+        """
+        calm = (results['face_detected'] and threat_score <= 0
+                and engine.drowsy_seconds == 0 and engine.yawn_seconds == 0
+                and results['ear_avg'] >= engine.ear_threshold * self.ear_wake_ratio
+                and results['mar'] <= engine.mar_threshold * self.mar_wake_ratio)
+        if not calm:
+            self.wake()
+            return
+        self.calm_frames += 1
+        if self.enabled and not self.idle and self.calm_frames >= self.idle_frames:
+            self.idle = True
+            self._phase = 0
     
-    def close(self):
-        """Close database connection."""
-        if self.connection:
-            self.connection.close()
+    def observe_alcohol(self, alcohol_level):
+        """Track the alcohol level on every frame; a rise while idle wakes the scheduler."""
+        if not self.idle or self.alcohol_reference is None:
+            self.alcohol_reference = alcohol_level
+        elif alcohol_level - self.alcohol_reference >= self.alcohol_wake_delta:
+            self.wake()
+            self.alcohol_reference = alcohol_level
+    
+    def wake(self):
+        """Return to full-rate analysis."""
+        if self.idle:
+            self.wakeups += 1
+        self.idle = False
+        self.calm_frames = 0
+    
+    def get_stats(self):
+        """
+        Returns:
+            dict: frames, analysed, analysis_ratio (effective fraction analysed),
+                  analysis_fps (last second), idle, wakeups
+        """
+        return {
+            'frames': self.frames,
+            'analysed': self.analysed,
+            'analysis_ratio': self.analysed / self.frames if self.frames else 1.0,
+            'analysis_fps': self.analysis_fps,
+            'idle': self.idle,
+            'wakeups': self.wakeups,
+        }
+
+
+# ============================================================================
+# FRAME RING BUFFER
+# ============================================================================
+
+BorrowedFrame = namedtuple('BorrowedFrame', ['index', 'seq', 'timestamp', 'frame'])
+
+
+class FrameRingBuffer:
+    """
+    Fixed ring of preallocated frame slots shared by the capture thread and
+    the processing loop, with latest-frame-wins semantics.
+    
+    The capture side decodes straight into a free slot and commits it with a
+    sequence number; the processing side borrows the newest committed slot
+    without copying and releases it when done. A committed frame that is
+    superseded before it was read counts as a drop.
+    """
+    
+    def __init__(self, num_slots=4):
+        """
+        Initialize ring buffer (slots are allocated on the first frame).
+        
+        Args:
+            num_slots (int): Number of frame slots (at least 3: writing, latest, borrowed)
+        """
+        if num_slots < 3:
+            raise ValueError("FrameRingBuffer needs at least 3 slots")
+        self.num_slots = num_slots
+        self.slots = None
+        self._cond = threading.Condition()
+        self._seq = [0] * num_slots  # 0 = never committed
+        self._timestamps = [0.0] * num_slots
+        self._borrowed = [False] * num_slots
+        self._latest = -1
+        self._next_seq = 1
+        self._last_read_seq = 0
+        
+        # Counters
+        self.frames_written = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+    
+    def allocate(self, shape, dtype=np.uint8):
+        """Allocate (or reallocate after a resolution change) all slots."""
+        with self._cond:
+            self.slots = np.empty((self.num_slots,) + tuple(shape), dtype=dtype)
+    
+    def acquire_write(self):
+        """
+        Get the slot the next frame should be decoded into.
+        
+        Picks the oldest slot that is neither borrowed nor the latest frame.
+        
+        Returns:
+            tuple: (slot index, slot array)
+        """
+        with self._cond:
+            index = -1
+            for i in range(self.num_slots):
+                if self._borrowed[i] or i == self._latest:
+                    continue
+                if index < 0 or self._seq[i] < self._seq[index]:
+                    index = i
+            return index, self.slots[index]
+    
+    def commit_write(self, index, timestamp):
+        """
+        Publish a filled slot as the latest frame.
+        
+        Args:
+            index (int): Slot index from acquire_write()
+            timestamp (float): Capture time (time.monotonic())
+        """
+        with self._cond:
+            if self._latest >= 0 and self._seq[self._latest] > self._last_read_seq:
+                self.frames_dropped += 1  # Previous frame was never read
+            self._seq[index] = self._next_seq
+            self._timestamps[index] = timestamp
+            self._next_seq += 1
+            self._latest = index
+            self.frames_written += 1
+            self._cond.notify_all()
+    
+    def acquire_read(self, timeout=None):
+        """
+        Borrow the newest unread frame without copying.
+        
+        Args:
+            timeout (float): Seconds to wait for a new frame
+        
+        Returns:
+            BorrowedFrame or None on timeout. Must be passed to release().
+        """
+        with self._cond:
+            if not self._cond.wait_for(self._has_unread, timeout):
+                return None
+            index = self._latest
+            self._borrowed[index] = True
+            self._last_read_seq = self._seq[index]
+            self.frames_read += 1
+            return BorrowedFrame(index, self._seq[index], self._timestamps[index], self.slots[index])
+    
+    def release(self, borrowed):
+        """Return a borrowed slot to the ring."""
+        with self._cond:
+            self._borrowed[borrowed.index] = False
+    
+    def wait_for_frame(self, timeout=None):
+        """
+        Wait until an unread frame is available (without consuming it).
+        
+        Returns:
+            bool: True if a frame is available
+        """
+        with self._cond:
+            return self._cond.wait_for(self._has_unread, timeout)
+    
+    def _has_unread(self):
+        return self._latest >= 0 and self._seq[self._latest] > self._last_read_seq
+    
+    def get_stats(self):
+        """
+        Get buffer counters.
+        
+        Returns:
+            dict: written, read, dropped, occupancy (slots holding unread or borrowed frames), slots
+        """
+        with self._cond:
+            occupancy = sum(self._borrowed) + (1 if self._has_unread() else 0)
+            return {
+                'written': self.frames_written,
+                'read': self.frames_read,
+                'dropped': self.frames_dropped,
+                'occupancy': occupancy,
+                'slots': self.num_slots,
+            }
 
 
 # ============================================================================
@@ -489,62 +2897,87 @@ class TelemetryDB:
 class VideoCaptureThread(threading.Thread):
     """Dedicated thread for non-blocking video frame capture."""
     
-    def __init__(self, camera_index, frame_queue, frame_rate=30):
+    def __init__(self, camera_index, frame_buffer, frame_rate=30):
         """
         Initialize video capture thread.
         
         Args:
-            camera_index (int): OpenCV camera index
-            frame_queue (queue.Queue): Queue to push frames to
-            frame_rate (int): Target frame rate
+            camera_index (int or str): OpenCV camera index, video file or image directory
+            frame_buffer (FrameRingBuffer): Ring buffer the frames are decoded into
+            frame_rate (int): Target frame rate (0 = no pacing)
         """
-        super().__init__(daemon=False)  # Changed from daemon=True
+        super().__init__(daemon=False, name="VideoCapture")  # Changed from daemon=True
         self.camera_index = camera_index
-        self.frame_queue = frame_queue
+        self.frame_buffer = frame_buffer
         self.frame_rate = frame_rate
         self.running = True
+        self._stop_event = threading.Event()  # Wakes the pacing wait on stop()
         self.cap = None
         self.frame_count = 0
+        self.fps = 0.0  # Capture rate over the last second
     
     def run(self):
         """Main thread loop for continuous frame capture."""
         try:
             print(f"[VIDEO] Opening camera {self.camera_index}...", flush=True)
-            self.cap = cv2.VideoCapture(self.camera_index)
-            time.sleep(1)
+            self.cap = open_frame_source(self.camera_index)
             
             if not self.cap.isOpened():
                 print(f"[VIDEO ERROR] Failed to open camera {self.camera_index}", flush=True)
                 return
             
             print(f"[VIDEO] Camera port opened", flush=True)
-            time.sleep(2)
             
-            # Simple frame capture loop - no warming up
-            frame_interval = 1.0 / self.frame_rate
+            # Capture loop - no fixed warm-up; reads retry until the camera delivers
+            frame_interval = 1.0 / self.frame_rate if self.frame_rate > 0 else 0.0
             last_frame_time = time.time()
+            fps_start = time.monotonic()
+            fps_frames = 0
             
             while self.running:
-                ret, frame = self.cap.read()
+                if self.frame_buffer.slots is None:
+                    # First frame sizes the ring
+                    ret, frame = self.cap.read()
+                    if not ret or frame is None:
+                        time.sleep(0.01)  # Camera still starting up; retry quickly
+                        continue
+                    captured_at = time.monotonic()
+                    self.frame_buffer.allocate(frame.shape, frame.dtype)
+                    index, slot = self.frame_buffer.acquire_write()
+                    np.copyto(slot, frame)
+                else:
+                    # Decode straight into a preallocated slot
+                    index, slot = self.frame_buffer.acquire_write()
+                    ret, frame = self.cap.read(slot)
+                    
+                    if not ret or frame is None:
+                        time.sleep(0.1)
+                        continue
+                    captured_at = time.monotonic()
+                    
+                    if frame is not slot:
+                        # Backend ignored the destination (e.g. resolution change)
+                        if frame.shape != slot.shape:
+                            self.frame_buffer.allocate(frame.shape, frame.dtype)
+                            index, slot = self.frame_buffer.acquire_write()
+                        np.copyto(slot, frame)
                 
-                if not ret or frame is None:
-                    time.sleep(0.1)
-                    continue
+                # Publish frame at once, stamped with its read time (latest wins;
+                # unread frames are counted as drops)
+                self.frame_buffer.commit_write(index, captured_at)
+                self.frame_count += 1
+                fps_frames += 1
+                if captured_at - fps_start >= 1.0:
+                    self.fps = fps_frames / (captured_at - fps_start)
+                    fps_start = captured_at
+                    fps_frames = 0
                 
                 # Maintain target frame rate
                 elapsed = time.time() - last_frame_time
                 if elapsed < frame_interval:
-                    time.sleep(frame_interval - elapsed)
+                    self._stop_event.wait(frame_interval - elapsed)
                 
                 last_frame_time = time.time()
-                
-                # Put frame in queue
-                try:
-                    self.frame_queue.put_nowait((ret, frame))
-                except queue.Full:
-                    pass  # Drop frame if queue is full
-                
-                self.frame_count += 1
         
         except Exception as e:
             print(f"[VIDEO ERROR] Exception in capture thread: {e}", flush=True)
@@ -559,31 +2992,145 @@ class VideoCaptureThread(threading.Thread):
     def stop(self):
         """Stop the capture thread."""
         self.running = False
+        self._stop_event.set()
 
 
 # ============================================================================
 # ARDUINO SERIAL COMMUNICATION
 # ============================================================================
 
+THREAT_FRAME_SYNC = 0xA5
+THREAT_FRAME_LENGTH = 5
+THREAT_TYPE_CODES = {'UNKNOWN': 0, 'DROWSY': 1, 'YAWN': 2, 'ALCOHOL': 3, 'MULTI': 4, 'CRITICAL': 5}
+THREAT_TYPE_NAMES = {code: name for name, code in THREAT_TYPE_CODES.items()}
+
+
+def crc8(data):
+    """
+    CRC-8 (polynomial 0x07, init 0x00) as computed by the Arduino firmware.
+    
+    Args:
+        data (bytes): Bytes to checksum
+    
+    Returns:
+        int: Checksum 0-255
+    """
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def encode_threat_frame(seq, threat_score, trigger_type):
+    """
+    Encode a binary threat frame: [0xA5][seq][score][type][crc8(seq, score, type)].
+    
+    Args:
+        seq (int): Sequence number (wraps at 256)
+        threat_score (int): Threat score 0-100
+        trigger_type (str): DROWSY, YAWN, ALCOHOL, MULTI, CRITICAL (others -> UNKNOWN)
+    
+    Returns:
+        bytes: 5-byte frame
+    """
+    payload = bytes((seq & 0xFF, max(0, min(100, int(threat_score))),
+                     THREAT_TYPE_CODES.get(trigger_type, 0)))
+    return bytes((THREAT_FRAME_SYNC,)) + payload + bytes((crc8(payload),))
+
+
+def decode_threat_frame(frame):
+    """
+    Decode a binary threat frame.
+    
+    Returns:
+        tuple or None: (seq, threat_score, trigger_type), or None if the frame is invalid
+    """
+    if len(frame) != THREAT_FRAME_LENGTH or frame[0] != THREAT_FRAME_SYNC:
+        return None
+    if crc8(frame[1:4]) != frame[4]:
+        return None
+    return frame[1], frame[2], THREAT_TYPE_NAMES.get(frame[3], 'UNKNOWN')
+
+
 class ArduinoConnection:
-    """Manages robust serial communication with Arduino."""
+    """
+    Manages robust serial communication with Arduino.
+    
+    All serial traffic runs on a dedicated I/O thread (start()): outbound
+    commands go through a bounded queue, inbound lines are parsed into the
+    latest alcohol/relay/buzzer state plus a stream of messages, and a lost
+    or missing port is retried with exponential backoff. The frame loop only
+    reads plain attributes and enqueues commands, so it never waits on USB.
+    
+    Threat scores are not queued: send_threat_score() replaces a single
+    pending value, and the I/O thread sends at most one score per
+    SERIAL_TX_WINDOW_MS (the latest), except that a transition into CRITICAL
+    is sent immediately. Scores go out as ASCII lines or, with
+    SERIAL_PROTOCOL = 'binary', as 5-byte CRC-checked frames. A score stays
+    pending until it is written, and the alert in force (until
+    clear_threat()) is sent again after a reconnect.
+    """
     
-    def __init__(self, baud_rate=9600, timeout=1.0):
+    DEVICE_KEYWORDS = ('ARDUINO', 'CH340', 'USB-SERIAL', 'CP210', 'FTDI')
+    
+    PROTOCOLS = ('ascii', 'binary')
+    
+    def __init__(self, baud_rate=9600, timeout=1.0, protocol=None, tx_window=None, latency=None):
         """
         Initialize Arduino connection manager.
         
         Args:
             baud_rate (int): Serial baud rate
-            timeout (float): Serial read timeout
+            timeout (float): Serial write timeout (reads poll every SERIAL_POLL_INTERVAL)
+            protocol (str): 'ascii' or 'binary' threat messages (default: Config.SERIAL_PROTOCOL)
+            tx_window (float): Threat coalescing window in seconds (default: Config.SERIAL_TX_WINDOW_MS)
+            latency (LatencyMonitor): Records capture-to-write latency ('serial' and 'actuation' stages)
         """
         self.baud_rate = baud_rate
         self.timeout = timeout
+        self.protocol = protocol or Config.SERIAL_PROTOCOL
+        if self.protocol not in self.PROTOCOLS:
+            raise ValueError(f"Unknown serial protocol: {self.protocol!r}")
+        self.tx_window = Config.SERIAL_TX_WINDOW_MS / 1000.0 if tx_window is None else tx_window
+        self.latency = latency
         self.serial = None
         self.port = None
         self.connected = False
-        self.last_connect_attempt = 0
+        self.on_line = None  # Callable(timestamp, line) for every received line (incident recording)
+        
+        # Latest device state (written by the I/O thread only)
         self.alcohol_level = 0
+        self.relay_status = None
+        self.buzzer_status = None
         self.last_update = 0
+        self.alcohol_history = deque(maxlen=Config.SERIAL_ALCOHOL_HISTORY)  # (receive time, level)
+        
+        self.outbound = queue.Queue(maxsize=Config.SERIAL_TX_QUEUE_SIZE)
+        self.inbound = queue.Queue(maxsize=Config.SERIAL_RX_QUEUE_SIZE)
+        self._rx_buffer = bytearray()
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+        
+        # Coalesced threat score: latest (score, type, capture timestamp) not yet sent
+        self._threat_lock = threading.Lock()
+        self._pending_threat = None
+        self._active_threat = None  # (score, type) in force until clear_threat(); re-sent after a reconnect
+        self._sent_trigger = None
+        self._last_threat_tx = 0.0
+        self._tx_seq = 0
+        self._backoff = Config.SERIAL_RECONNECT_INITIAL
+        self._failed_attempts = 0
+        self._ever_connected = False
+        
+        # Counters
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.threats_coalesced = 0
+        self.lines_received = 0
+        self.reconnects = 0
     
     def find_port(self):
         """
@@ -595,16 +3142,29 @@ class ArduinoConnection:
         try:
             ports = serial.tools.list_ports.comports()
             for port in ports:
-                if any(kw in port.description.upper() 
-                       for kw in ['ARDUINO', 'CH340', 'USB-SERIAL', 'CP210', 'FTDI']):
+                if any(kw in port.description.upper() for kw in self.DEVICE_KEYWORDS):
                     return port.device
         except Exception as e:
             print(f"[SERIAL ERROR] Failed to list ports: {e}")
         return None
     
+    def start(self, port=None):
+        """
+        Start the serial I/O thread; it connects (and reconnects) in the background.
+        
+        Args:
+            port (str): Specific COM port, or auto-detect if None
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._io_loop, args=(port,), daemon=True,
+                                        name="ArduinoIO")
+        self._thread.start()
+    
     def connect(self, port=None):
         """
-        Establish serial connection to Arduino.
+        Establish serial connection to Arduino (blocking; called by the I/O thread).
         
         Args:
             port (str): Specific COM port, or auto-detect if None
@@ -613,239 +3173,726 @@ class ArduinoConnection:
             bool: True if connected, False otherwise
         """
         try:
-            # Prevent rapid reconnection attempts
-            if time.time() - self.last_connect_attempt < Config.SERIAL_RETRY_INTERVAL:
-                return False
-            
-            self.last_connect_attempt = time.time()
-            
             # Auto-detect port if not specified
             if port is None:
                 port = self.find_port()
             
             if port is None:
-                print("[SERIAL] Arduino port not found. Scanning...")
+                if self._failed_attempts == 0:
+                    print("[SERIAL] Arduino port not found. Scanning...")
                 return False
             
             # Attempt connection
-            self.serial = serial.Serial(port, self.baud_rate, timeout=self.timeout)
-            time.sleep(2)  # Wait for Arduino to initialize
-            
-            self.port = port
-            self.connected = True
-            print(f"[SERIAL] Connected to Arduino on {port}")
+            self.serial = serial.Serial(port, self.baud_rate, timeout=0, write_timeout=self.timeout)
+            # Wait for Arduino to initialize (the port open resets the board); the sketch
+            # prints its banner from setup(), so the first byte ends the wait early
+            deadline = time.monotonic() + Config.SERIAL_BOOT_DELAY
+            while not self.serial.in_waiting:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if self._stop_event.wait(min(remaining, Config.SERIAL_POLL_INTERVAL)):
+                    self.serial.close()
+                    return False
             
             # Flush buffers
             self.serial.reset_input_buffer()
             self.serial.reset_output_buffer()
+            self._rx_buffer.clear()
             
+            self._sent_trigger = None
+            with self._threat_lock:
+                # The board lost its state with the port; restore the alert still in force
+                if self._pending_threat is None and self._active_threat is not None:
+                    self._pending_threat = self._active_threat + (None,)
+            self.port = port
+            self.connected = True
+            print(f"[SERIAL] Connected to Arduino on {port} ({self.protocol} protocol)")
             return True
         
         except Exception as e:
-            print(f"[SERIAL ERROR] Connection failed to {port}: {e}")
-            self.connected = False
+            if self._failed_attempts == 0:
+                print(f"[SERIAL ERROR] Connection failed to {port}: {e}")
+            self._close_port()
+            return False
+    
+    def _io_loop(self, port):
+        """I/O thread: connect with backoff, then alternate writes and polled reads."""
+        while not self._stop_event.is_set():
+            if not self.connected:
+                if self.connect(port):
+                    if self._ever_connected:
+                        self.reconnects += 1
+                    self._ever_connected = True
+                    self._failed_attempts = 0
+                    self._backoff = Config.SERIAL_RECONNECT_INITIAL
+                else:
+                    self._failed_attempts += 1
+                    self._stop_event.wait(self._backoff)
+                    self._backoff = min(self._backoff * 2, Config.SERIAL_RETRY_INTERVAL)
+                continue
+            
+            try:
+                self._write_pending()
+                self._read_available()
+            except Exception as e:
+                print(f"[SERIAL ERROR] Connection lost on {self.port}: {e}")
+                self._close_port()
+                continue
+            
+            # Sleep until a send wakes us, the coalescing window opens, or the next read poll
+            self._wakeup.wait(self._idle_timeout())
+            self._wakeup.clear()
+        
+        if self.connected:
+            try:
+                self._write_pending()
+            except Exception:
+                pass
+        self._close_port()
+    
+    def _write_pending(self):
+        """Write the pending threat score (if due) and every queued outbound message."""
+        self._write_threat()
+        while True:
+            try:
+                message = self.outbound.get_nowait()
+            except queue.Empty:
+                return
+            self.serial.write(message)
+            self.messages_sent += 1
+    
+    def _write_threat(self):
+        """Send the latest threat score once its window is open (CRITICAL transitions at once)."""
+        now = time.monotonic()
+        with self._threat_lock:
+            pending = self._pending_threat
+            if pending is None:
+                return
+            threat_score, trigger_type, origin = pending
+            escalating = trigger_type == "CRITICAL" and self._sent_trigger != "CRITICAL"
+            if not escalating and now - self._last_threat_tx < self.tx_window:
+                return
+        
+        if self.protocol == 'binary':
+            message = encode_threat_frame(self._tx_seq, threat_score, trigger_type)
+            self._tx_seq = (self._tx_seq + 1) & 0xFF
+        else:
+            message = f"THREAT:{threat_score}:{trigger_type}\n".encode()
+        self.serial.write(message)  # On failure the score stays pending for the next connection
+        with self._threat_lock:
+            if self._pending_threat is pending:
+                self._pending_threat = None  # Not superseded while writing
+        self._last_threat_tx = now
+        self._sent_trigger = trigger_type
+        self.messages_sent += 1
+        if self.latency:
+            self.latency.since('serial', origin)
+            if threat_score >= Config.THREAT_SCORE_CRITICAL:
+                self.latency.since('actuation', origin)
+    
+    def _idle_timeout(self):
+        """Seconds the I/O thread may sleep before it has work to do."""
+        timeout = Config.SERIAL_POLL_INTERVAL
+        if self._pending_threat is not None:
+            timeout = min(timeout, max(0.0, self._last_threat_tx + self.tx_window - time.monotonic()))
+        return timeout
+    
+    def _read_available(self):
+        """Read whatever has arrived (never blocks) and parse full lines."""
+        waiting = self.serial.in_waiting
+        if not waiting:
+            return
+        chunk = self.serial.read(waiting)
+        if not chunk:
+            return
+        self._rx_buffer.extend(chunk)
+        while True:
+            end = self._rx_buffer.find(b'\n')
+            if end < 0:
+                break
+            line = self._rx_buffer[:end].decode('utf-8', errors='ignore').strip()
+            del self._rx_buffer[:end + 1]
+            if line:
+                self._handle_line(line)
+    
+    def _handle_line(self, line, timestamp=None):
+        """Update the latest device state from one line and publish it as a message."""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if self.on_line:
+            self.on_line(timestamp, line)
+        self.lines_received += 1
+        message = self._parse_line(line)
+        if message is None:
+            return
+        kind, value = message
+        
+        if kind == 'alcohol_level':
+            self.alcohol_history.append((timestamp, value))
+            self.alcohol_level = value
+            self.last_update = time.time()
+        elif kind == 'relay_status':
+            self.relay_status = value
+        elif kind == 'buzzer_status':
+            self.buzzer_status = value
+        else:
+            # Echo or status message
+            print(f"[ARDUINO] {line}")
+        
+        try:
+            self.inbound.put_nowait((time.time(), kind, value))
+        except queue.Full:
+            # Nobody is draining the stream; keep the newest messages
+            try:
+                self.inbound.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.inbound.put_nowait((time.time(), kind, value))
+            except queue.Full:
+                pass
+    
+    def replay_line(self, line, timestamp):
+        """Apply a recorded line as if it had been received at timestamp (replay, no port needed)."""
+        self._handle_line(line, timestamp)
+    
+    def alcohol_level_at(self, timestamp):
+        """
+        Alcohol reading as of a capture timestamp.
+        
+        The I/O thread may already have parsed readings that arrived after the
+        frame was captured; scoring the frame with the reading it was captured
+        under keeps live decisions identical to a replay of the recording.
+        
+        Args:
+            timestamp (float): Capture timestamp (time.monotonic())
+        
+        Returns:
+            int: Latest reading received at or before timestamp
+        """
+        history = tuple(self.alcohol_history)  # Snapshot; the I/O thread appends concurrently
+        for received, level in reversed(history):
+            if received <= timestamp:
+                return level
+        return history[0][1] if history else self.alcohol_level
+    
+    @staticmethod
+    def _parse_line(line):
+        """
+        Parse one line from the Arduino.
+        
+        Returns:
+            tuple or None: (kind, value) with kind 'alcohol_level', 'relay_status',
+            'buzzer_status' or 'status'; None for a malformed reading
+        """
+        if line.startswith("ALCOHOL:"):
+            try:
+                return 'alcohol_level', int(line.split(":")[1])
+            except (IndexError, ValueError):
+                return None
+        if line.startswith("RELAY:"):
+            return 'relay_status', line.split(":", 1)[1]
+        if line.startswith("BUZZER:"):
+            return 'buzzer_status', line.split(":", 1)[1]
+        return 'status', line
+    
+    def _enqueue(self, message):
+        """Queue an outbound message without blocking (drops the oldest when full)."""
+        if not self.connected:
+            return False
+        try:
+            self.outbound.put_nowait(message)
+            self._wakeup.set()
+            return True
+        except queue.Full:
+            pass
+        try:
+            self.outbound.get_nowait()
+            self.messages_dropped += 1
+        except queue.Empty:
+            pass
+        try:
+            self.outbound.put_nowait(message)
+            self._wakeup.set()
+            return True
+        except queue.Full:
+            self.messages_dropped += 1
             return False
     
-    def send_threat_score(self, threat_score, trigger_type):
+    def send_threat_score(self, threat_score, trigger_type, origin=None):
         """
-        Send threat score to Arduino.
+        Set the threat score to send to the Arduino (coalesced, never blocks).
         
-        Format: "THREAT:<score>:<trigger_type>\n"
+        ASCII format: "THREAT:<score>:<trigger_type>\n"
+        Binary format: [0xA5][seq][score][type code][crc8] (see encode_threat_frame)
         Trigger types: DROWSY, YAWN, ALCOHOL, MULTI, CRITICAL
         
         Args:
             threat_score (int): Threat score 0-100
             trigger_type (str): Type of threat
+            origin (float): Capture timestamp (time.monotonic()) of the frame that produced it
         
         Returns:
-            bool: True if sent successfully
+            bool: True if accepted for sending now (otherwise sent after the next reconnect)
         """
-        if not self.connected:
-            return False
-        
-        try:
-            # Clamp threat score
-            threat_score = max(0, min(100, int(threat_score)))
-            
-            message = f"THREAT:{threat_score}:{trigger_type}\n"
-            self.serial.write(message.encode())
-            self.serial.flush()
-            
-            return True
-        except Exception as e:
-            print(f"[SERIAL ERROR] Failed to send threat score: {e}")
-            self.connected = False
-            return False
+        # Clamp threat score
+        threat_score = max(0, min(100, int(threat_score)))
+        with self._threat_lock:
+            self._active_threat = (threat_score, trigger_type)
+            if not self.connected:
+                return False
+            if self._pending_threat is not None:
+                self.threats_coalesced += 1  # Superseded before it went out
+            self._pending_threat = (threat_score, trigger_type, origin)
+        self._wakeup.set()
+        return True
+    
+    def clear_threat(self):
+        """Mark the alert as over so it is not re-sent after a reconnect."""
+        if self._active_threat is None:
+            return  # Nothing in force (the common case, called on every non-alert frame)
+        with self._threat_lock:
+            self._active_threat = None
     
     def send_calibration_request(self):
-        """Request calibration from Arduino."""
-        if not self.connected:
-            return False
-        
-        try:
-            self.serial.write(b"CALIB_REQUEST\n")
-            self.serial.flush()
-            return True
-        except Exception as e:
-            print(f"[SERIAL ERROR] Failed to send calibration request: {e}")
-            self.connected = False
-            return False
+        """Queue a calibration request for the Arduino."""
+        return self._enqueue(b"CALIB_REQUEST\n")
     
     def read_data(self):
         """
-        Read and parse data from Arduino.
+        Drain the inbound message stream (non-blocking).
         
         Returns:
-            dict: Parsed data or empty dict if no data
+            dict: Latest value per message kind received since the last call
         """
-        if not self.connected:
-            return {}
-        
         data = {}
-        try:
-            while self.serial.in_waiting > 0:
-                line = self.serial.readline().decode('utf-8', errors='ignore').strip()
-                
-                if not line:
-                    continue
-                
-                # Parse different message types
-                if line.startswith("ALCOHOL:"):
-                    try:
-                        level = int(line.split(":")[1])
-                        self.alcohol_level = level
-                        self.last_update = time.time()
-                        data['alcohol_level'] = level
-                    except:
-                        pass
-                
-                elif line.startswith("RELAY:"):
-                    data['relay_status'] = line.split(":")[1]
-                
-                elif line.startswith("BUZZER:"):
-                    data['buzzer_status'] = line.split(":")[1]
-                
-                else:
-                    # Echo or status message
-                    print(f"[ARDUINO] {line}")
-        
-        except Exception as e:
-            print(f"[SERIAL ERROR] Failed to read data: {e}")
-            self.connected = False
+        while True:
+            try:
+                _, kind, value = self.inbound.get_nowait()
+            except queue.Empty:
+                return data
+            if kind != 'status':
+                data[kind] = value
+    
+    def get_stats(self):
+        """
+        Get serial I/O counters.
         
-        return data
+        Returns:
+            dict: sent, dropped, coalesced, received, reconnects, pending
+        """
+        return {
+            'sent': self.messages_sent,
+            'dropped': self.messages_dropped,
+            'coalesced': self.threats_coalesced,
+            'received': self.lines_received,
+            'reconnects': self.reconnects,
+            'pending': self.outbound.qsize(),
+        }
     
-    def close(self):
-        """Close serial connection."""
-        if self.serial and self.serial.is_open:
+    def _close_port(self):
+        """Close the port after an error or at shutdown (I/O thread only)."""
+        self.connected = False
+        if self.serial:
             try:
                 self.serial.close()
-                self.connected = False
-                print("[SERIAL] Connection closed")
-            except:
+            except Exception:
                 pass
+            self.serial = None
+    
+    def close(self):
+        """Stop the I/O thread (sending anything still queued) and close the port."""
+        if self._thread and self._thread.is_alive():
+            self._stop_event.set()
+            self._wakeup.set()
+            self._thread.join(timeout=Config.SERIAL_BOOT_DELAY + 1.0)
+            if self._ever_connected:
+                print("[SERIAL] Connection closed")
+        else:
+            self._close_port()
 
 
 # ============================================================================
 # THREAT SCORING ENGINE
 # ============================================================================
 
+ThreatBatch = namedtuple('ThreatBatch', ['scores', 'trigger_types', 'drowsy_seconds', 'yawn_seconds'])
+
+
 class ThreatScoringEngine:
-    """Calculates threat score based on multiple sensor inputs."""
+    """
+    Calculates threat score based on multiple sensor inputs.
     
-    def __init__(self):
-        """Initialize threat scoring system."""
-        self.drowsiness_score = 0
-        self.yawn_score = 0
-        self.alcohol_score = 0
-        self.last_trigger_type = None
+    One scheme serves both the live loop (update(), one frame at a time) and
+    offline re-scoring (score_batch(), whole numpy arrays at once); both use
+    the same weights and produce identical scores for the same signals.
+    
+    Eye-closure and yawn windows are measured in seconds of capture time, so
+    alerts fire after the same duration at 10, 15 or 30 FPS (or with skipped
+    frames). Each frame counts for the time since the previous frame, capped
+    at max_frame_gap (the nominal frame interval when no timestamp is given).
+    
+    Scheme per frame (face visible):
+    - EAR below ear_threshold / MAR above mar_threshold extend the eyes-closed /
+      mouth-open durations; any other frame (or no face) resets them
+    - eyes closed >= ear_seconds: +drowsy_points ("DROWSY"), >= half: +drowsy_partial_points
+    - mouth open >= mar_seconds: +yawn_points ("YAWN"/"MULTI"), >= half: +yawn_partial_points
+    - alcohol above alcohol_threshold: +alcohol_points then x alcohol_multiplier ("ALCOHOL"/"MULTI")
+    - score >= critical_score: "CRITICAL"; score capped at 100
+    """
+    
+    WEIGHTS = ('drowsy_points', 'drowsy_partial_points', 'yawn_points', 'yawn_partial_points',
+               'alcohol_points', 'alcohol_multiplier', 'critical_score',
+               'ear_threshold', 'mar_threshold', 'ear_seconds', 'mar_seconds', 'alcohol_threshold',
+               'max_frame_gap')
+    
+    # Trigger codes used by score_batch (0 = no trigger)
+    TRIGGER_TYPES = np.array([None, 'DROWSY', 'YAWN', 'ALCOHOL', 'MULTI', 'CRITICAL'], dtype=object)
+    _DROWSY, _YAWN, _ALCOHOL, _MULTI, _CRITICAL = 1, 2, 3, 4, 5
     
-    def calculate_threat_score(self, ear_normalized, mar_normalized, alcohol_level, 
-                               alcohol_baseline, drowsiness_frames, yawn_frames):
+    def __init__(self, **weights):
         """
-        Calculate composite threat score (0-100).
+        Initialize threat scoring system.
         
-        Formula:
-        - Base score: drowsiness_component + yawn_component + alcohol_component
-        - Alcohol acts as multiplier for drowsiness/yawn components
+        Args:
+            **weights: Overrides for any name in WEIGHTS (thresholds default to Config)
+        """
+        self.drowsy_points = 50
+        self.drowsy_partial_points = 25
+        self.yawn_points = 40
+        self.yawn_partial_points = 20
+        self.alcohol_points = 30
+        self.alcohol_multiplier = 1.2
+        self.critical_score = Config.THREAT_SCORE_CRITICAL
+        self.ear_threshold = Config.EAR_THRESHOLD
+        self.mar_threshold = Config.MAR_THRESHOLD
+        self.ear_seconds = Config.EAR_CLOSED_SECONDS
+        self.mar_seconds = Config.MAR_OPEN_SECONDS
+        self.alcohol_threshold = Config.ALCOHOL_THRESHOLD_BASELINE
+        self.max_frame_gap = Config.ALERT_MAX_FRAME_GAP
+        for name, value in weights.items():
+            if name not in self.WEIGHTS:
+                raise ValueError(f"Unknown threat weight: {name}")
+            setattr(self, name, value)
+        self.frame_interval = 1.0 / Config.TARGET_FPS  # Frame duration when timestamps are missing
+        
+        self.drowsy_seconds = 0.0
+        self.yawn_seconds = 0.0
+        self.last_timestamp = None
+        self.last_trigger_type = None
+    
+    def get_weights(self):
+        """Current weights as a dict (e.g. to store next to re-scored results)."""
+        return {name: getattr(self, name) for name in self.WEIGHTS}
+    
+    def reset(self):
+        """Clear the eyes-closed / mouth-open durations and the frame clock."""
+        self.drowsy_seconds = 0.0
+        self.yawn_seconds = 0.0
+        self.last_timestamp = None
+        self.last_trigger_type = None
+    
+    def frame_duration(self, timestamp):
+        """Time this frame accounts for: since the previous frame, capped at max_frame_gap."""
+        last, self.last_timestamp = self.last_timestamp, timestamp
+        if timestamp is None or last is None:
+            return self.frame_interval
+        return min(max(timestamp - last, 0.0), self.max_frame_gap)
+    
+    def update(self, face_detected, ear, mar, alcohol_level, timestamp=None):
+        """
+        Score one live frame, advancing the eyes-closed / mouth-open durations.
         
         Args:
-            ear_normalized (float): EAR deviation from baseline (0-1)
-            mar_normalized (float): MAR deviation from baseline (0-1)
+            face_detected (bool): Face found in this frame
+            ear (float): Average eye aspect ratio
+            mar (float): Mouth aspect ratio
             alcohol_level (int): Current alcohol sensor reading
-            alcohol_baseline (int): Baseline alcohol level
-            drowsiness_frames (int): Consecutive frames below EAR threshold
-            yawn_frames (int): Consecutive frames above MAR threshold
+            timestamp (float): Capture time in seconds (None = nominal frame interval)
         
         Returns:
             tuple: (threat_score, trigger_type)
         """
+        dt = self.frame_duration(timestamp)
+        if not face_detected:
+            self.drowsy_seconds = 0.0
+            self.yawn_seconds = 0.0
+            self.last_trigger_type = None
+            return 0, None
+        
+        # Check drowsiness (EAR below threshold) and yawning (MAR above threshold)
+        self.drowsy_seconds = self.drowsy_seconds + dt if ear < self.ear_threshold else 0.0
+        self.yawn_seconds = self.yawn_seconds + dt if mar > self.mar_threshold else 0.0
+        
         threat_score = 0
         trigger_type = None
         
-        # ===== DROWSINESS COMPONENT (0-40 points) =====
-        if drowsiness_frames > 0:
-            drowsiness_intensity = min(drowsiness_frames / Config.EAR_CONSECUTIVE_FRAMES, 1.0)
-            self.drowsiness_score = drowsiness_intensity * 40
-            threat_score += self.drowsiness_score
+        # Drowsiness component
+        if self.drowsy_seconds >= self.ear_seconds:
+            threat_score += self.drowsy_points
             trigger_type = "DROWSY"
-        else:
-            self.drowsiness_score = 0
-        
-        # ===== YAWN COMPONENT (0-30 points) =====
-        if yawn_frames > 0:
-            yawn_intensity = min(yawn_frames / Config.MAR_CONSECUTIVE_FRAMES, 1.0)
-            self.yawn_score = yawn_intensity * 30
-            threat_score += self.yawn_score
-            if trigger_type:
-                trigger_type = "MULTI"
-            else:
-                trigger_type = "YAWN"
-        else:
-            self.yawn_score = 0
-        
-        # ===== ALCOHOL COMPONENT (0-50 points) =====
-        # Alcohol acts as amplifier
-        if alcohol_level > alcohol_baseline:
-            alcohol_delta = alcohol_level - alcohol_baseline
-            alcohol_intensity = min(alcohol_delta / 200.0, 1.0)  # Normalize over 200 point range
-            self.alcohol_score = alcohol_intensity * 50
-            threat_score += self.alcohol_score
-            
-            # Amplify drowsiness/yawn scores if alcohol is present
-            if self.drowsiness_score > 0 or self.yawn_score > 0:
-                amplification_factor = 1.0 + (alcohol_intensity * 0.3)  # Up to 30% amplification
-                threat_score = min(threat_score * amplification_factor, 100)
-                
-                if trigger_type:
-                    trigger_type = "MULTI"
-                else:
-                    trigger_type = "ALCOHOL"
-        else:
-            self.alcohol_score = 0
+        elif self.drowsy_seconds >= self.ear_seconds / 2:
+            threat_score += self.drowsy_partial_points
         
-        # Critical threshold activation
-        if threat_score >= Config.THREAT_SCORE_CRITICAL:
+        # Yawning component
+        if self.yawn_seconds >= self.mar_seconds:
+            threat_score += self.yawn_points
+            trigger_type = "YAWN" if not trigger_type else "MULTI"
+        elif self.yawn_seconds >= self.mar_seconds / 2:
+            threat_score += self.yawn_partial_points
+        
+        # Alcohol component (if alcohol sensor connected)
+        if alcohol_level > self.alcohol_threshold:
+            threat_score += self.alcohol_points
+            threat_score *= self.alcohol_multiplier  # Amplify for alcohol
+            trigger_type = "MULTI" if trigger_type else "ALCOHOL"
+        
+        if threat_score >= self.critical_score:
             trigger_type = "CRITICAL"
         
         self.last_trigger_type = trigger_type
+        return min(100, threat_score), trigger_type
+    
+    def frame_durations(self, timestamps, size, resets=None):
+        """
+        Vectorised frame_duration() for a batch.
+        
+        Args:
+            timestamps: Capture times in seconds, or None for the nominal interval
+            size (int): Number of frames
+            resets: Optional boolean array; a reset frame gets the nominal interval
+        
+        Returns:
+            np.ndarray: float64 duration of each frame
+        """
+        durations = np.full(size, self.frame_interval)
+        if timestamps is not None:
+            timestamps = np.asarray(timestamps, dtype=np.float64)
+            np.clip(np.diff(timestamps), 0.0, self.max_frame_gap, out=durations[1:])
+            if resets is not None:
+                durations[np.asarray(resets, dtype=bool)] = self.frame_interval
+        return durations
+    
+    @staticmethod
+    def consecutive_durations(condition, durations, resets=None, initial=0.0):
+        """
+        Total duration of the run of True values ending at each element, vectorised.
+        
+        Args:
+            condition: Boolean array
+            durations: Duration of each element (a scalar 1 gives run lengths in frames)
+            resets: Optional boolean array; True restarts the run at that element
+            initial (float): Duration carried in from before the first element
+        
+        Returns:
+            np.ndarray: float64 run durations (0 where condition is False)
+        """
+        condition = np.asarray(condition, dtype=bool)
+        durations = np.broadcast_to(np.asarray(durations, dtype=np.float64), condition.shape)
+        # Running total over True elements; each run subtracts the total at its start
+        total = np.cumsum(np.where(condition, durations, 0.0))
+        run_start = np.where(condition, 0.0, total)
+        if resets is not None:
+            # A reset starts a new run at that element: take the total just before it
+            reset_at = np.asarray(resets, dtype=bool)
+            run_start = np.where(reset_at & condition, total - durations, run_start)
+        run_start = np.maximum.accumulate(run_start)
+        runs = np.where(condition, total - run_start, 0.0)
+        if initial:
+            # Runs that started before the batch (no break yet) continue the carried duration
+            carried = np.logical_and.accumulate(condition)
+            if resets is not None:
+                carried &= ~np.logical_or.accumulate(reset_at)
+            runs[carried] += initial
+        return runs
+    
+    def score_batch(self, ear, mar, alcohol, face_detected=None, resets=None, initial=(0.0, 0.0),
+                    timestamps=None):
+        """
+        Score whole signal arrays at once (same results as calling update() per frame).
+        
+        Args:
+            ear: Array of average EAR per frame
+            mar: Array of MAR per frame
+            alcohol: Array (or scalar) of alcohol readings per frame
+            face_detected: Optional boolean array (default: face in every frame)
+            resets: Optional boolean array restarting the durations (e.g. recording gaps)
+            initial: (drowsy_seconds, yawn_seconds) carried in from a previous batch
+            timestamps: Optional capture times in seconds (default: nominal frame interval)
         
-        return min(threat_score, 100), trigger_type
+        Returns:
+            ThreatBatch: scores (float64), trigger_types (object: None or type name),
+            drowsy_seconds and yawn_seconds after each frame
+        """
+        ear = np.asarray(ear, dtype=np.float64)
+        mar = np.asarray(mar, dtype=np.float64)
+        alcohol = np.broadcast_to(np.asarray(alcohol, dtype=np.float64), ear.shape)
+        face = (np.ones(ear.shape, dtype=bool) if face_detected is None
+                else np.asarray(face_detected, dtype=bool))
+        durations = self.frame_durations(timestamps, ear.size, resets)
+        
+        drowsy = self.consecutive_durations(face & (ear < self.ear_threshold), durations, resets, initial[0])
+        yawn = self.consecutive_durations(face & (mar > self.mar_threshold), durations, resets, initial[1])
+        
+        drowsy_full = drowsy >= self.ear_seconds
+        yawn_full = yawn >= self.mar_seconds
+        drunk = alcohol > self.alcohol_threshold
+        
+        scores = (np.where(drowsy_full, self.drowsy_points,
+                           np.where(drowsy >= self.ear_seconds / 2, self.drowsy_partial_points, 0))
+                  + np.where(yawn_full, self.yawn_points,
+                             np.where(yawn >= self.mar_seconds / 2, self.yawn_partial_points, 0)))
+        scores = np.where(drunk, (scores + self.alcohol_points) * self.alcohol_multiplier, scores)
+        scores = scores.astype(np.float64)
+        
+        codes = np.zeros(ear.shape, dtype=np.int8)
+        codes[drowsy_full] = self._DROWSY
+        codes[yawn_full] = np.where(drowsy_full[yawn_full], self._MULTI, self._YAWN)
+        codes[drunk] = np.where(codes[drunk] > 0, self._MULTI, self._ALCOHOL)
+        codes[scores >= self.critical_score] = self._CRITICAL
+        
+        # No face: durations already 0; score and trigger cleared
+        scores[~face] = 0.0
+        codes[~face] = 0
+        np.minimum(scores, 100, out=scores)
+        
+        return ThreatBatch(scores, self.TRIGGER_TYPES[codes], drowsy, yawn)
 
 
 # ============================================================================
 # CALIBRATION ENGINE
 # ============================================================================
 
+class P2Quantile:
+    """
+    Streaming quantile estimate in constant memory (Jain & Chlamtac P² algorithm).
+    
+    Keeps five markers whose heights track the minimum, q/2, q, (1+q)/2
+    quantiles and the maximum; each add() adjusts them with a piecewise-
+    parabolic step, so cost per sample is constant and nothing is stored.
+    """
+    
+    def __init__(self, q=0.5):
+        """
+        Args:
+            q (float): Quantile to estimate (0.5 = median)
+        """
+        self.q = q
+        self.reset()
+    
+    def reset(self):
+        """Forget all samples."""
+        q = self.q
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+    
+    def add(self, x):
+        """Add one sample."""
+        heights = self.heights
+        self.count += 1
+        if self.count <= 5:
+            bisect.insort(heights, x)
+            return
+        
+        positions = self.positions
+        # Find the cell containing x, stretching the extremes if needed
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        desired = self.desired
+        for i in range(5):
+            desired[i] += self.increments[i]
+        
+        # Move the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or \
+               (d <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if d > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+    
+    def _parabolic(self, i, step):
+        """Piecewise-parabolic prediction of marker i moved by step."""
+        h = self.heights
+        n = self.positions
+        return h[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+    
+    def value(self):
+        """
+        Current quantile estimate.
+        
+        Returns:
+            float or None: Estimate (exact for fewer than 6 samples), None if empty
+        """
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            return self.heights[int(round(self.q * (self.count - 1)))]
+        return self.heights[2]
+
+
 class CalibrationEngine:
-    """Handles dynamic baseline calibration."""
+    """
+    Handles dynamic baseline calibration.
+    
+    The initial baseline is the median of the first `calibration_frames`
+    face samples. In continuous mode the baseline keeps adapting afterwards:
+    frames classified as neutral (face visible, eyes open, mouth closed, no
+    active threat) feed constant-memory P² median estimators; every
+    `epoch_frames` neutral samples the epoch medians are blended into the
+    baselines, drift (baseline change per hour) and confidence are updated,
+    and the estimators restart so the baseline follows lighting changes.
+    Epoch timing, drift and checkpoints run on the frame capture timestamps
+    passed in, so a replay gives the same results at any speed.
+    threshold_scale() turns the baseline's drift since calibration into
+    factors for the scoring thresholds (CALIBRATION_ADAPT_THRESHOLDS).
     
-    def __init__(self, calibration_frames=50):
+    A baseline cached for the same profile, detector and lighting bucket can
+    replace the initial calibration (load_cached()); the first
+    `verify_frames` neutral frames then verify it in the background, refining
+    it when they agree and restarting the full calibration when they do not.
+    """
+    
+    MAR_FLOOR = 0.05  # Denominator floor for relative MAR disagreement (closed-mouth MAR is tiny)
+    
+    def __init__(self, calibration_frames=50, continuous=False, epoch_frames=900, blend=0.3,
+                 checkpoint_interval=300, on_checkpoint=None, profile=None, detector=None,
+                 lighting_edges=(), verify_frames=30, verify_tolerance=0.25):
         """
         Initialize calibration engine.
         
         Args:
             calibration_frames (int): Number of frames to calibrate
+            continuous (bool): Keep adapting the baseline after the initial calibration
+            epoch_frames (int): Neutral samples per baseline update in continuous mode
+            blend (float): Weight of a new epoch median in the baseline (0-1)
+            checkpoint_interval (float): Seconds between on_checkpoint calls (continuous mode)
+            on_checkpoint: Callable(baseline_ear, baseline_mar, samples, **cache_key) to persist baselines
+            profile (str): Driver/vehicle profile (cache key)
+            detector (str): Detector backend name (cache key; baselines differ per backend)
+            lighting_edges (tuple): Mean-intensity edges of the lighting buckets (cache key)
+            verify_frames (int): Neutral frames used to verify a cached baseline
+            verify_tolerance (float): Relative disagreement that rejects a cached baseline
         """
         self.calibration_frames = calibration_frames
         self.ear_buffer = deque(maxlen=calibration_frames)
@@ -853,37 +3900,458 @@ class CalibrationEngine:
         self.calibrated = False
         self.baseline_ear = 0.28
         self.baseline_mar = 0.05
+        self.reference_ear = self.baseline_ear  # Baseline when calibration completed
+        self.reference_mar = self.baseline_mar
         self.frame_count = 0
+        
+        # Continuous calibration
+        self.continuous = continuous
+        self.epoch_frames = epoch_frames
+        self.blend = blend
+        self.checkpoint_interval = checkpoint_interval
+        self.on_checkpoint = on_checkpoint
+        self.ear_quantile = P2Quantile(0.5)
+        self.mar_quantile = P2Quantile(0.5)
+        self.neutral_samples = 0
+        self.neutral_fraction = 0.0
+        self.ear_drift_per_hour = 0.0
+        self.mar_drift_per_hour = 0.0
+        self.stability = 1.0
+        self.epochs = 0
+        self._epoch_start = None  # Capture timestamps (time.monotonic() when none is given)
+        self._last_checkpoint = None
+        
+        # Calibration cache
+        self.profile = profile
+        self.detector = detector
+        self.lighting_edges = tuple(lighting_edges)
+        self.brightness = None
+        self.brightness_samples = 0
+        self.lighting_bucket = None
+        self.verify_frames = verify_frames
+        self.verify_tolerance = verify_tolerance
+        self.verifying = False
+        self.cached_from = None  # Timestamp of the cached baseline in use
+        self._verify_ear = []
+        self._verify_mar = []
+    
+    def observe_brightness(self, mean_intensity):
+        """
+        Track mean frame intensity and the lighting bucket it falls in.
+        
+        A running mean over the first 20 frames, then a slow EMA, so a single
+        outlier frame at start (headlights, a tunnel exit) cannot pick the bucket.
+        """
+        self.brightness_samples += 1
+        if self.brightness is None:
+            self.brightness = float(mean_intensity)
+        else:
+            self.brightness += max(0.05, 1.0 / self.brightness_samples) * (mean_intensity - self.brightness)
+        self.lighting_bucket = bisect.bisect(self.lighting_edges, self.brightness)
+    
+    def cache_key(self):
+        """Calibration cache key of the current profile, detector and lighting."""
+        return {'profile': self.profile, 'detector': self.detector, 'lighting_bucket': self.lighting_bucket}
+    
+    def load_cached(self, baseline_ear, baseline_mar, timestamp=None, now=None):
+        """
+        Start from a cached baseline instead of the initial calibration.
+        
+        Args:
+            baseline_ear (float): Cached EAR baseline
+            baseline_mar (float): Cached MAR baseline
+            timestamp (str): When the cached baseline was stored (for reporting)
+            now (float): Capture timestamp of the current frame (default: time.monotonic())
+        """
+        self.baseline_ear = self.reference_ear = float(baseline_ear)
+        self.baseline_mar = self.reference_mar = float(baseline_mar)
+        self.calibrated = True
+        self.cached_from = timestamp
+        self.verifying = self.verify_frames > 0
+        self._verify_ear = []
+        self._verify_mar = []
+        self._epoch_start = self._last_checkpoint = time.monotonic() if now is None else now
+        print(f"[CALIB] Using cached baseline for {self.profile!r} (lighting bucket {self.lighting_bucket}"
+              f", stored {timestamp}): EAR {self.baseline_ear:.4f} MAR {self.baseline_mar:.4f}")
     
-    def add_sample(self, ear, mar):
+    def _finish_verification(self, now):
+        """Refine the cached baseline with the verification medians, or restart calibration."""
+        self.verifying = False
+        verify_ear = float(np.median(self._verify_ear))
+        verify_mar = float(np.median(self._verify_mar))
+        disagreement = max(abs(verify_ear - self.baseline_ear) / max(self.baseline_ear, 1e-6),
+                           abs(verify_mar - self.baseline_mar) / max(self.baseline_mar, self.MAR_FLOOR))
+        samples = len(self._verify_ear)
+        self._verify_ear = []
+        self._verify_mar = []
+        
+        if disagreement > self.verify_tolerance:
+            print(f"[CALIB] Cached baseline rejected ({disagreement*100:.0f}% off: live EAR {verify_ear:.4f} "
+                  f"MAR {verify_mar:.4f}) - recalibrating")
+            self.calibrated = False
+            self.cached_from = None
+            self.ear_buffer.clear()
+            self.mar_buffer.clear()
+            return
+        
+        self.baseline_ear = (1 - self.blend) * self.baseline_ear + self.blend * verify_ear
+        self.baseline_mar = (1 - self.blend) * self.baseline_mar + self.blend * verify_mar
+        print(f"[CALIB] Cached baseline verified ({disagreement*100:.0f}% off), refined to "
+              f"EAR {self.baseline_ear:.4f} MAR {self.baseline_mar:.4f}")
+        self.checkpoint(samples, now)
+    
+    def add_sample(self, ear, mar, timestamp=None):
         """
         Add calibration sample.
         
         Args:
             ear (float): Eye Aspect Ratio sample
             mar (float): Mouth Aspect Ratio sample
+            timestamp (float): Capture timestamp of the frame (default: time.monotonic())
         """
         self.ear_buffer.append(ear)
         self.mar_buffer.append(mar)
         self.frame_count += 1
         
-        # Check if calibration complete
-        if len(self.ear_buffer) >= self.calibration_frames:
-            self.finalize()
+        # Check if calibration complete
+        if len(self.ear_buffer) >= self.calibration_frames:
+            self.finalize(timestamp)
+    
+    def finalize(self, timestamp=None):
+        """
+        Compute final baseline values.
+        
+        Args:
+            timestamp (float): Capture timestamp of the last sample (default: time.monotonic())
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if len(self.ear_buffer) > 0:
+            self.baseline_ear = self.reference_ear = float(np.median(self.ear_buffer))
+            self.baseline_mar = self.reference_mar = float(np.median(self.mar_buffer))
+            self.calibrated = True
+            print(f"[CALIB] Calibration complete!")
+            print(f"[CALIB]   Baseline EAR: {self.baseline_ear:.4f}")
+            print(f"[CALIB]   Baseline MAR: {self.baseline_mar:.4f}")
+            self.checkpoint(len(self.ear_buffer), timestamp)
+            self._epoch_start = timestamp
+    
+    def get_progress(self):
+        """Get calibration progress percentage."""
+        return int((len(self.ear_buffer) / self.calibration_frames) * 100)
+    
+    def update(self, ear, mar, neutral, timestamp=None):
+        """
+        Feed one post-calibration frame (continuous mode); constant cost per frame.
+        
+        Args:
+            ear (float): Eye Aspect Ratio
+            mar (float): Mouth Aspect Ratio
+            neutral (bool): Frame classified as alert/neutral (only these move the baseline)
+            timestamp (float): Capture timestamp of the frame (default: time.monotonic())
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if self._epoch_start is None:
+            self._epoch_start = self._last_checkpoint = timestamp
+        
+        if self.verifying and neutral:
+            self._verify_ear.append(ear)
+            self._verify_mar.append(mar)
+            if len(self._verify_ear) >= self.verify_frames:
+                self._finish_verification(timestamp)
+        
+        if not (self.continuous and self.calibrated):
+            return
+        
+        # Share of recent frames usable for calibration (EMA over about one epoch)
+        self.neutral_fraction += (float(neutral) - self.neutral_fraction) / self.epoch_frames
+        
+        if neutral:
+            self.ear_quantile.add(ear)
+            self.mar_quantile.add(mar)
+            self.neutral_samples += 1
+            if self.ear_quantile.count >= self.epoch_frames:
+                self._finish_epoch(timestamp)
+        
+        if timestamp - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint(self.neutral_samples, timestamp)
+    
+    def _finish_epoch(self, now):
+        """Blend the epoch medians into the baselines and restart the estimators."""
+        hours = max(now - self._epoch_start, 1e-6) / 3600.0
+        epoch_ear = self.ear_quantile.value()
+        epoch_mar = self.mar_quantile.value()
+        
+        new_ear = (1 - self.blend) * self.baseline_ear + self.blend * epoch_ear
+        new_mar = (1 - self.blend) * self.baseline_mar + self.blend * epoch_mar
+        self.ear_drift_per_hour = (new_ear - self.baseline_ear) / hours
+        self.mar_drift_per_hour = (new_mar - self.baseline_mar) / hours
+        
+        # Stability: 1 when the epoch agrees with the baseline, falling with relative disagreement
+        disagreement = abs(epoch_ear - self.baseline_ear) / max(self.baseline_ear, 1e-6)
+        self.stability = 1.0 / (1.0 + 10.0 * disagreement)
+        
+        self.baseline_ear = new_ear
+        self.baseline_mar = new_mar
+        self.epochs += 1
+        self.ear_quantile.reset()
+        self.mar_quantile.reset()
+        self._epoch_start = now
+    
+    def get_confidence(self):
+        """
+        Confidence in the current baseline (0-1).
+        
+        Product of the recent neutral-frame fraction (are we still seeing usable
+        frames?) and epoch stability (did the last epoch agree with the baseline?).
+        Before the first epoch only the initial calibration backs the baseline.
+        """
+        if not self.calibrated:
+            return 0.0
+        if not self.continuous or self.epochs == 0:
+            return self.stability
+        return self.neutral_fraction * self.stability
+    
+    def threshold_scale(self, limits=(0.7, 1.3)):
+        """
+        Drift of the baseline since calibration, as factors for the EAR/MAR thresholds.
+        
+        Lighting that shifts the neutral EAR/MAR shifts the closed-eye and
+        yawn values with it, so thresholds tuned at calibration are scaled by
+        the same ratio.
+        
+        Args:
+            limits (tuple): (lowest, highest) factor
+        
+        Returns:
+            tuple: (ear_scale, mar_scale)
+        """
+        low, high = limits
+        ear_scale = self.baseline_ear / max(self.reference_ear, 1e-6)
+        mar_scale = max(self.baseline_mar, self.MAR_FLOOR) / max(self.reference_mar, self.MAR_FLOOR)
+        return min(max(ear_scale, low), high), min(max(mar_scale, low), high)
+    
+    def checkpoint(self, samples, timestamp=None):
+        """Persist the current baselines through on_checkpoint (if set)."""
+        self._last_checkpoint = time.monotonic() if timestamp is None else timestamp
+        if self.on_checkpoint:
+            self.on_checkpoint(float(self.baseline_ear), float(self.baseline_mar), int(samples),
+                               **self.cache_key())
+    
+    def get_stats(self):
+        """
+        Get calibration state.
+        
+        Returns:
+            dict: baseline_ear, baseline_mar, ear/mar drift per hour, confidence, epochs, samples
+        """
+        return {
+            'baseline_ear': float(self.baseline_ear),
+            'baseline_mar': float(self.baseline_mar),
+            'ear_drift_per_hour': self.ear_drift_per_hour,
+            'mar_drift_per_hour': self.mar_drift_per_hour,
+            'confidence': self.get_confidence(),
+            'epochs': self.epochs,
+            'samples': self.neutral_samples,
+        }
+
+
+# ============================================================================
+# METRICS ENDPOINT
+# ============================================================================
+
+def _format_labels(labels):
+    """Prometheus label set ('' when there are no labels)."""
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def render_prometheus(families):
+    """
+    Format metric families in the Prometheus text exposition format (0.0.4).
+    
+    Args:
+        families (list): (name, type, help, samples); samples are (sample name, labels dict, value)
+    
+    Returns:
+        str: Exposition text
+    """
+    lines = []
+    for name, metric_type, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for sample_name, labels, value in samples:
+            if value is None:
+                continue
+            lines.append(f"{sample_name}{_format_labels(labels)} {float(value):.9g}")
+    return '\n'.join(lines) + '\n'
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP over a Unix stream socket (scraped with e.g. curl --unix-socket)."""
+    
+    daemon_threads = True
+
+
+class MetricsServer:
+    """
+    Serves /metrics in Prometheus text format on localhost or a Unix socket.
+    
+    Each scrape is rendered on the server's own request thread by calling
+    `collect`, which only reads counters the pipeline already keeps, so the
+    frame loop does no extra work however often the unit is scraped.
+    """
+    
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+    
+    def __init__(self, collect, host='127.0.0.1', port=9108, unix_socket=None):
+        """
+        Initialize metrics server.
+    
+        Args:
+            collect: Callable returning metric families for render_prometheus()
+            host (str): TCP bind address
+            port (int): TCP port
+            unix_socket (str): Serve on this Unix socket path instead of TCP
+        """
+        self.collect = collect
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.server = None
+        self._thread = None
+        self.scrapes = 0
+    
+    def _handler(self):
+        metrics = self
+    
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                try:
+                    body = render_prometheus(metrics.collect()).encode('utf-8')
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                metrics.scrapes += 1
+                self.send_response(200)
+                self.send_header('Content-Type', MetricsServer.CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+    
+            def log_message(self, format, *args):
+                pass  # No per-scrape console output
+    
+        return MetricsHandler
+    
+    def start(self):
+        """
+        Bind the socket and serve on a daemon thread.
+        
+        Returns:
+            str: Address being served
+        """
+        if self.unix_socket:
+            if os.path.exists(self.unix_socket):
+                os.unlink(self.unix_socket)  # Left over from a previous run
+            self.server = _UnixHTTPServer(self.unix_socket, self._handler())
+            address = self.unix_socket
+        else:
+            self.server = ThreadingHTTPServer((self.host, self.port), self._handler())
+            address = f"http://{self.host}:{self.server.server_address[1]}/metrics"
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="MetricsServer")
+        self._thread.start()
+        return address
+    
+    def close(self):
+        """Stop serving and release the socket."""
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        if self.unix_socket and os.path.exists(self.unix_socket):
+            os.unlink(self.unix_socket)
+        self.server = None
+
+
+# ============================================================================
+# STARTUP ORCHESTRATION
+# ============================================================================
+
+class StartupOrchestrator:
+    """
+    Runs independent initialisation steps concurrently and times each one.
+    
+    Every step is a callable returning True on success; it runs on its own
+    thread from launch() until wait() collects it. Milestones (e.g. the first
+    analysed frame) can be added to the same timeline with mark().
+    """
+    
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.steps = {}  # name -> {'start', 'duration', 'ok', 'error'} (seconds from origin)
+        self._threads = {}
+        self._lock = threading.Lock()
+    
+    def launch(self, name, func):
+        """Start a step on its own thread."""
+        thread = threading.Thread(target=self._run_step, args=(name, func), daemon=True,
+                                  name=f"Startup-{name}")
+        self._threads[name] = thread
+        thread.start()
+    
+    def _run_step(self, name, func):
+        start = time.perf_counter()
+        ok, error = False, None
+        try:
+            ok = bool(func())
+        except Exception as e:
+            error = str(e)
+        with self._lock:
+            self.steps[name] = {'start': start - self.origin, 'duration': time.perf_counter() - start,
+                                'ok': ok, 'error': error}
+    
+    def wait(self, *names):
+        """
+        Wait for launched steps (all of them if no names are given).
+        
+        Returns:
+            bool: True if every waited step succeeded
+        """
+        names = names or tuple(self._threads)
+        for name in names:
+            self._threads[name].join()
+        with self._lock:
+            return all(self.steps[name]['ok'] for name in names)
     
-    def finalize(self):
-        """Compute final baseline values."""
-        if len(self.ear_buffer) > 0:
-            self.baseline_ear = np.median(self.ear_buffer)
-            self.baseline_mar = np.median(self.mar_buffer)
-            self.calibrated = True
-            print(f"[CALIB] Calibration complete!")
-            print(f"[CALIB]   Baseline EAR: {self.baseline_ear:.4f}")
-            print(f"[CALIB]   Baseline MAR: {self.baseline_mar:.4f}")
+    def mark(self, name):
+        """Record a milestone at the current time."""
+        with self._lock:
+            self.steps[name] = {'start': time.perf_counter() - self.origin, 'duration': 0.0,
+                                'ok': True, 'error': None}
     
-    def get_progress(self):
-        """Get calibration progress percentage."""
-        return int((len(self.ear_buffer) / self.calibration_frames) * 100)
+    def elapsed(self):
+        """Seconds since the orchestrator was created."""
+        return time.perf_counter() - self.origin
+    
+    def report(self):
+        """Print the startup timeline."""
+        print(f"[STARTUP] {'component':<14}{'start':>9}{'duration':>10}  status")
+        with self._lock:
+            steps = sorted(self.steps.items(), key=lambda item: item[1]['start'] + item[1]['duration'])
+        for name, step in steps:
+            status = 'ok' if step['ok'] else f"FAILED{': ' + step['error'] if step['error'] else ''}"
+            print(f"[STARTUP] {name:<14}{step['start']*1000:>7.0f}ms{step['duration']*1000:>8.0f}ms  {status}")
 
 
 # ============================================================================
@@ -895,27 +4363,72 @@ class DrowsinessDetectionApp:
     
     def __init__(self):
         """Initialize application."""
-        self.frame_queue = queue.Queue(maxsize=2)
+        self.frame_buffer = FrameRingBuffer(Config.FRAME_BUFFER_SLOTS)
+        self._display_frame = None  # Reused mirror-flipped BGR frame
+        self._gray_frame = None  # Reused grayscale frame
         self.capture_thread = None
         self.arduino = None
         self.face_cascade = None  # OpenCV Haar Cascade
-        self.face_mesh = None  # MediaPipe (not used, but cleanup expects it)
+        self.face_tracker = None  # Detect-then-track wrapper around the cascade
+        self.face_mesh = None  # MediaPipe FaceMesh backend (Config.DETECTOR_BACKEND = 'facemesh')
         self.eye_detector = None  # Improved eye detector
+        self.detector_backend = None  # Face + EAR/MAR analysis used by process_frame
         self.audio_alerter = None  # Laptop speaker
         self.calibration = None
-        self.threat_engine = None
+        self.threat_engine = ThreatScoringEngine()  # Also used by benchmark.py without initialize()
+        self.signal_filters = SignalFilterBank(Config.SIGNAL_FILTERS)
         self.telemetry_db = None
+        self.signal_logger = None  # Opt-in per-frame signal log
         self.running = False
         self.fps_counter = 0
         self.fps_timer = time.time()
         self.fps = 0
+        self.drowsy_seconds = 0.0  # Current eyes-closed duration
+        self.yawn_seconds = 0.0  # Current mouth-open duration
+        self.stage_timer = StageTimer(enabled=False)  # Enabled by benchmark.py and profile mode
+        self.loop_profile = LatencyMonitor(  # run() loop stage durations (always on)
+            window_seconds=Config.LATENCY_WINDOW_SECONDS,
+            max_seconds=Config.LATENCY_MAX_SECONDS
+        )
+        self.loop_timer = StageTimer(enabled=True, monitor=self.loop_profile)
+        self.frame_profile = None  # process_frame() sub-stage durations (profile mode)
+        self.profiler = None  # Sampling profiler (profile mode)
+        self.recorder = None  # Incident recording (Config.RECORD_PATH)
+        self.latency = LatencyMonitor(  # Capture-to-output latency per stage (query with snapshot())
+            enabled=Config.LATENCY_TRACKING,
+            window_seconds=Config.LATENCY_WINDOW_SECONDS,
+            max_seconds=Config.LATENCY_MAX_SECONDS
+        )
+        self.scheduler = AdaptiveScheduler(
+            enabled=Config.ADAPTIVE_RATE,
+            idle_stride=Config.ADAPTIVE_IDLE_STRIDE,
+            idle_frames=Config.ADAPTIVE_IDLE_FRAMES,
+            ear_wake_ratio=Config.ADAPTIVE_EAR_WAKE_RATIO,
+            mar_wake_ratio=Config.ADAPTIVE_MAR_WAKE_RATIO,
+            alcohol_wake_delta=Config.ADAPTIVE_ALCOHOL_WAKE_DELTA
+        )
+        self._last_results = None  # Held for frames the scheduler skips
+        self.metrics_server = None  # Optional Prometheus endpoint (Config.METRICS_ENABLED)
+        self.face_frames = 0  # Analysed frames with / without a face
+        self.no_face_frames = 0
+        self.alert_counts = {}  # trigger_reason -> alerts raised
+        self._calibration_cache_checked = True  # Set per run by initialize()
+        self._calibration_cache_bucket = None  # Lighting bucket of the last cache lookup
+        self.startup = StartupOrchestrator()  # Startup timeline (created with the app)
     
-    def initialize(self):
-        """Initialize all system components."""
-        print("\n" + "="*70)
-        print("   PRODUCTION-GRADE DROWSINESS & ALCOHOL DETECTION SYSTEM v3.0")
-        print("   Multithreaded | Dynamic Calibration | Threat Scoring | SQLite Logging")
-        print("="*70 + "\n")
+    def initialize_detection(self):
+        """
+        Load the detector backend selected by Config.DETECTOR_BACKEND.
+        
+        Returns:
+            bool: True if the detection modules are ready
+        """
+        if Config.DETECTOR_BACKEND == 'facemesh':
+            return self._initialize_facemesh()
+        if Config.DETECTOR_BACKEND != 'haar':
+            print(f"[ERROR] Unknown detector backend {Config.DETECTOR_BACKEND!r}; "
+                  f"choose from: {', '.join(DETECTOR_BACKENDS)}")
+            return False
         
         # Initialize face detector (using OpenCV Haar Cascade as fallback)
         print("[INIT] Initializing face detection module...")
@@ -926,7 +4439,19 @@ class DrowsinessDetectionApp:
             if self.face_cascade.empty():
                 print("[ERROR] Failed to load Haar Cascade classifier")
                 return False
-            print("[INIT] ✓ Face detection initialized")
+            detection_scale = Config.FACE_DETECTION_SCALE
+            if detection_scale == 'auto':
+                detection_scale = self._select_detection_scale()
+            self.face_tracker = FaceTracker(
+                self.face_cascade,
+                redetect_interval=Config.FACE_REDETECT_INTERVAL if Config.FACE_TRACKING else 0,
+                search_margin=Config.FACE_SEARCH_MARGIN,
+                size_tolerance=Config.FACE_SIZE_TOLERANCE,
+                min_confidence=Config.FACE_TRACK_MIN_CONFIDENCE,
+                detection_scale=detection_scale
+            )
+            print("[INIT] ✓ Face detection initialized"
+                  f" (scale {detection_scale:g}, tracking {'on' if Config.FACE_TRACKING else 'off'})")
         except Exception as e:
             print(f"[ERROR] Face detection initialization failed: {e}")
             return False
@@ -940,66 +4465,121 @@ class DrowsinessDetectionApp:
             print(f"[ERROR] Eye detector initialization failed: {e}")
             return False
         
-        # Initialize audio alerter
-        print("[INIT] Initializing laptop speaker alerter...")
-        try:
-            self.audio_alerter = AudioAlerter()
-            print("[INIT] ✓ Audio alerter ready")
-        except Exception as e:
-            print(f"[ERROR] Audio alerter initialization failed: {e}")
-            return False
+        self.detector_backend = HaarDetectorBackend(self.face_tracker, self.eye_detector)
+        return True
+    
+    def _initialize_facemesh(self):
+        """
+        Load the MediaPipe FaceMesh backend and switch the scorer to its thresholds.
         
-        # Initialize SQLite database
-        print("[INIT] Initializing telemetry database...")
+        Returns:
+            bool: True if FaceMesh is ready
+        """
+        print("[INIT] Initializing MediaPipe FaceMesh backend...")
         try:
-            self.telemetry_db = TelemetryDB(Config.TELEMETRY_DB)
-            print(f"[INIT] ✓ Database ready: {Config.TELEMETRY_DB}")
+            self.detector_backend = FaceMeshDetectorBackend()
         except Exception as e:
-            print(f"[ERROR] Database initialization failed: {e}")
+            print(f"[ERROR] FaceMesh initialization failed: {e}")
             return False
+        self.face_mesh = self.detector_backend
+        self.threat_engine = ThreatScoringEngine(**self.detector_backend.thresholds)
+        print(f"[INIT] ✓ FaceMesh ready (EAR < {Config.FACEMESH_EAR_THRESHOLD}, "
+              f"MAR > {Config.FACEMESH_MAR_THRESHOLD})")
+        return True
+    
+    def _select_detection_scale(self):
+        """
+        Pick the detection scale from Config.FACE_SCALE_REFERENCE_CLIP.
         
-        # Initialize Arduino connection
-        print("[INIT] Connecting to Arduino...")
-        self.arduino = ArduinoConnection(Config.SERIAL_BAUD_RATE, Config.SERIAL_TIMEOUT)
-        if not self.arduino.connect():
-            print("[INIT] ⚠ Arduino connection deferred (will retry)")
-        else:
-            print("[INIT] ✓ Arduino connected")
+        Returns:
+            float: Selected scale (1.0 if no reference clip is usable)
+        """
+        if not Config.FACE_SCALE_REFERENCE_CLIP:
+            print("[INIT] ⚠ FACE_DETECTION_SCALE='auto' without a reference clip, using 1.0")
+            return 1.0
         
-        # Initialize calibration engine
-        self.calibration = CalibrationEngine(Config.CALIBRATION_FRAMES)
-        print(f"[INIT] ✓ Calibration engine ready ({Config.CALIBRATION_FRAMES} frames)")
+        source = open_frame_source(Config.FACE_SCALE_REFERENCE_CLIP)
+        gray_frames = []
+        while len(gray_frames) < Config.FACE_SCALE_REFERENCE_FRAMES:
+            ret, frame = source.read()
+            if not ret or frame is None:
+                break
+            gray_frames.append(cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2GRAY))
+        source.release()
         
-        # Initialize threat scoring engine
-        self.threat_engine = ThreatScoringEngine()
-        print("[INIT] ✓ Threat scoring engine ready")
+        if not gray_frames:
+            print(f"[INIT] ⚠ No frames in {Config.FACE_SCALE_REFERENCE_CLIP}, using scale 1.0")
+            return 1.0
         
-        # Start video capture thread
-        print("[INIT] Starting video capture thread...")
-        self.capture_thread = VideoCaptureThread(
-            Config.CAMERA_INDEX,
-            self.frame_queue,
-            Config.TARGET_FPS
+        scale, report = select_detection_scale(
+            self.face_cascade, gray_frames, recall_target=Config.FACE_SCALE_RECALL_TARGET
         )
-        self.capture_thread.start()
+        for entry in report:
+            print(f"[INIT]   scale {entry['scale']:g}: recall {entry['recall']*100:.1f}% "
+                  f"| {entry['detect_ms']:.2f} ms/frame")
+        return scale
+    
+    def initialize(self):
+        """
+        Initialize all system components.
         
-        # Wait for first frame (longer timeout)
-        print("[INIT] Waiting for camera frames...")
-        frame_ready = False
-        for attempt in range(30):  # Try for up to 15 seconds
-            time.sleep(0.5)
-            if not self.frame_queue.empty():
-                frame_ready = True
-                print(f"[INIT] ✓ First frame received after {(attempt+1)*0.5:.1f}s")
-                break
-            if attempt % 4 == 0:  # Print every 2 seconds
-                print(f"[INIT] Waiting... ({attempt+1}/30)")
+        Camera, detection, audio, database and serial start concurrently; a
+        per-component timing report is printed once all are up.
+        """
+        print("\n" + "="*70)
+        print("   PRODUCTION-GRADE DROWSINESS & ALCOHOL DETECTION SYSTEM v3.0")
+        print("   Multithreaded | Dynamic Calibration | Threat Scoring | SQLite Logging")
+        print("="*70 + "\n")
+        
+        startup = self.startup
+        # Camera first: opening the device and getting a frame is usually the slowest step
+        startup.launch('camera', self._start_camera)
+        startup.launch('detection', self.initialize_detection)
+        startup.launch('audio', self._initialize_audio)
+        startup.launch('database', self._initialize_database)
+        startup.launch('serial', self._initialize_serial)
+        if Config.METRICS_ENABLED:
+            startup.launch('metrics', self._start_metrics)
+        
+        if not startup.wait('detection', 'audio', 'database', 'serial'):
+            startup.report()
+            self._abort_startup()
+            return False
+        if Config.METRICS_ENABLED:
+            startup.wait('metrics')  # Optional: a failed endpoint does not stop detection
+        
+        # Initialize calibration engine (checkpoints go to the database)
+        self.calibration = CalibrationEngine(
+            Config.CALIBRATION_FRAMES,
+            continuous=Config.CALIBRATION_CONTINUOUS,
+            epoch_frames=Config.CALIBRATION_EPOCH_FRAMES,
+            blend=Config.CALIBRATION_BLEND,
+            checkpoint_interval=Config.CALIBRATION_CHECKPOINT_SECONDS,
+            on_checkpoint=self.telemetry_db.log_calibration if self.telemetry_db else None,
+            profile=Config.DRIVER_PROFILE,
+            detector=Config.DETECTOR_BACKEND,
+            lighting_edges=Config.CALIBRATION_LIGHTING_EDGES,
+            verify_frames=Config.CALIBRATION_VERIFY_FRAMES,
+            verify_tolerance=Config.CALIBRATION_VERIFY_TOLERANCE
+        )
+        self._calibration_cache_checked = not Config.CALIBRATION_CACHE
+        self._calibration_cache_bucket = None
+        print(f"[INIT] ✓ Calibration engine ready ({Config.CALIBRATION_FRAMES} frames"
+              f"{', continuous' if Config.CALIBRATION_CONTINUOUS else ''}"
+              f"{', cache for ' + repr(Config.DRIVER_PROFILE) if Config.CALIBRATION_CACHE else ''})")
+        
+        # Initialize threat scoring engine
+        self.threat_engine.reset()
+        print("[INIT] ✓ Threat scoring engine ready")
         
-        if not frame_ready:
+        if not startup.wait('camera'):
             print("[ERROR] No frames captured - camera initialization failed")
             print("[ERROR] Try running: python test_camera.py")
+            startup.report()
+            self._abort_startup()
             return False
         
+        startup.report()
         print("[INIT] ✓ Video capture thread active")
         print("\n" + "="*70)
         print("   SYSTEM READY - CALIBRATION PHASE STARTING")
@@ -1008,10 +4588,203 @@ class DrowsinessDetectionApp:
         
         return True
     
+    def _start_camera(self):
+        """
+        Start the capture thread and wait for its first frame.
+        
+        Returns:
+            bool: True once a frame is available
+        """
+        print("[INIT] Starting video capture thread...")
+        self.capture_thread = VideoCaptureThread(
+            Config.CAMERA_INDEX,
+            self.frame_buffer,
+            Config.TARGET_FPS
+        )
+        self.capture_thread.start()
+        
+        deadline = time.monotonic() + Config.CAMERA_STARTUP_TIMEOUT
+        while not self.frame_buffer.wait_for_frame(timeout=0.05):
+            if not self.capture_thread.is_alive() or time.monotonic() > deadline:
+                return False
+        print(f"[INIT] ✓ First frame received after {self.startup.elapsed():.2f}s")
+        return True
+    
+    def _initialize_audio(self):
+        """Start the audio worker (renders the alert tones)."""
+        print("[INIT] Initializing laptop speaker alerter...")
+        try:
+            self.audio_alerter = AudioAlerter(latency=self.latency)
+            self.audio_alerter.start()
+            print(f"[INIT] ✓ Audio alerter ready ({self.audio_alerter.backend.name})")
+        except Exception as e:
+            print(f"[ERROR] Audio alerter initialization failed: {e}")
+            return False
+        return True
+    
+    def _initialize_database(self):
+        """Open the telemetry database (and the optional signal log)."""
+        print("[INIT] Initializing telemetry database...")
+        try:
+            self.telemetry_db = TelemetryDB(Config.TELEMETRY_DB, latency=self.latency)
+            print(f"[INIT] ✓ Database ready: {Config.TELEMETRY_DB}")
+            if Config.SIGNAL_LOG_ENABLED:
+                self.signal_logger = SignalLogger(self.telemetry_db)
+                print("[INIT] ✓ Per-frame signal log enabled")
+        except Exception as e:
+            print(f"[ERROR] Database initialization failed: {e}")
+            return False
+        return True
+    
+    def _initialize_serial(self):
+        """Start the Arduino I/O thread (it connects in the background)."""
+        print("[INIT] Connecting to Arduino...")
+        self.arduino = ArduinoConnection(Config.SERIAL_BAUD_RATE, Config.SERIAL_TIMEOUT, latency=self.latency)
+        self.arduino.start()
+        print("[INIT] ✓ Arduino I/O thread started (connects in the background)")
+        return True
+    
+    def _start_metrics(self):
+        """Start the metrics endpoint (optional: a failure only disables metrics)."""
+        try:
+            self.metrics_server = MetricsServer(self.collect_metrics, Config.METRICS_HOST,
+                                                Config.METRICS_PORT, Config.METRICS_UNIX_SOCKET)
+            address = self.metrics_server.start()
+            print(f"[INIT] ✓ Metrics endpoint: {address}")
+        except Exception as e:
+            print(f"[WARN] Metrics endpoint disabled: {e}")
+            self.metrics_server = None
+            return False
+        return True
+    
+    def collect_metrics(self):
+        """
+        Metric families for the metrics endpoint.
+        
+        Runs on the server's request thread and only reads counters the
+        components already keep. Most are plain attributes; the stage
+        latencies are copied under each LatencyRecorder's lock, which the
+        frame loop also takes to record, so a scrape can delay a record() call
+        by the time it takes to merge one stage's window (microseconds).
+        
+        Returns:
+            list: (name, type, help, samples) families for render_prometheus()
+        """
+        families = []
+        
+        def add(name, metric_type, help_text, *samples):
+            # samples: (labels, value)
+            families.append((name, metric_type, help_text,
+                             [(name, labels, value) for labels, value in samples]))
+        
+        buffer = self.frame_buffer
+        capture = self.capture_thread
+        add('drowsiness_frames_captured_total', 'counter', 'Frames published by the capture thread',
+            ({}, buffer.frames_written))
+        add('drowsiness_frames_processed_total', 'counter', 'Frames taken by the frame loop',
+            ({}, buffer.frames_read))
+        add('drowsiness_frames_dropped_total', 'counter', 'Frames superseded before the frame loop read them',
+            ({}, buffer.frames_dropped))
+        add('drowsiness_capture_fps', 'gauge', 'Capture rate over the last second',
+            ({}, capture.fps if capture else 0.0))
+        add('drowsiness_processed_fps', 'gauge', 'Frame loop rate over the last second', ({}, self.fps))
+        add('drowsiness_analysis_fps', 'gauge', 'Frames analysed per second (adaptive rate)',
+            ({}, self.scheduler.analysis_fps))
+        
+        face, no_face = self.face_frames, self.no_face_frames
+        add('drowsiness_analysed_frames_total', 'counter', 'Analysed frames by face detection result',
+            ({'result': 'face'}, face), ({'result': 'no_face'}, no_face))
+        add('drowsiness_face_detected_ratio', 'gauge', 'Share of analysed frames with a face',
+            ({}, face / (face + no_face) if face + no_face else None))
+        
+        # Stage latencies: quantiles over the rolling window, _sum/_count over the whole run
+        samples = []
+        for stage, recorder in list(self.latency.recorders.items()):
+            window = recorder.window().summary()
+            total_us, count = recorder.totals()
+            for quantile, key in (('0.5', 'p50'), ('0.9', 'p90'), ('0.99', 'p99'), ('0.999', 'p999')):
+                samples.append(('drowsiness_stage_latency_seconds', {'stage': stage, 'quantile': quantile},
+                                window[key]))
+            samples.append(('drowsiness_stage_latency_seconds_sum', {'stage': stage}, total_us / 1e6))
+            samples.append(('drowsiness_stage_latency_seconds_count', {'stage': stage}, count))
+        families.append(('drowsiness_stage_latency_seconds', 'summary',
+                         'Pipeline stage latency (capture-relative stages from the capture timestamp)',
+                         samples))
+        
+        if self.arduino:
+            arduino = self.arduino
+            add('drowsiness_serial_connected', 'gauge', 'Arduino serial port connected',
+                ({}, int(arduino.connected)))
+            add('drowsiness_serial_reconnects_total', 'counter', 'Serial reconnections after a lost port',
+                ({}, arduino.reconnects))
+            add('drowsiness_serial_messages_sent_total', 'counter', 'Messages written to the Arduino',
+                ({}, arduino.messages_sent))
+            add('drowsiness_serial_messages_dropped_total', 'counter', 'Outbound messages dropped (queue full)',
+                ({}, arduino.messages_dropped))
+            add('drowsiness_alcohol_level', 'gauge', 'Latest alcohol sensor reading', ({}, arduino.alcohol_level))
+        
+        writer = self.telemetry_db.writer if self.telemetry_db else None
+        if writer:
+            add('drowsiness_telemetry_queue_depth', 'gauge', 'Rows waiting for the telemetry writer',
+                ({}, writer.queue.qsize()))
+            add('drowsiness_telemetry_rows_written_total', 'counter', 'Telemetry rows committed',
+                ({}, writer.rows_written))
+            add('drowsiness_telemetry_rows_dropped_total', 'counter', 'Telemetry rows dropped',
+                ({}, writer.rows_dropped))
+        
+        add('drowsiness_alerts_total', 'counter', 'Alerts raised (alert table rows) by trigger_reason',
+            *[({'trigger_reason': reason}, count) for reason, count in list(self.alert_counts.items())])
+        return families
+    
+    def _load_cached_calibration(self, frame_time=None):
+        """
+        Start from the stored baseline for the current profile, detector and lighting bucket.
+        
+        Args:
+            frame_time (float): Capture timestamp of the current frame
+        
+        Returns:
+            bool: True if a cached baseline was loaded
+        """
+        if not self.telemetry_db:
+            return False
+        key = self.calibration.cache_key()
+        cached = self.telemetry_db.load_calibration(max_age_days=Config.CALIBRATION_CACHE_MAX_AGE_DAYS, **key)
+        if cached is None:
+            print(f"[CALIB] No cached baseline for {key['profile']!r} "
+                  f"(lighting bucket {key['lighting_bucket']}) - running full calibration")
+            return False
+        self.calibration.load_cached(cached['baseline_ear'], cached['baseline_mar'], cached['timestamp'],
+                                     now=frame_time)
+        if self.recorder:
+            # replay() loads the same baseline at the same frame
+            self.recorder.update_metadata(cached_baseline={
+                'baseline_ear': float(cached['baseline_ear']),
+                'baseline_mar': float(cached['baseline_mar']),
+                'stored': cached['timestamp'],
+                'frame_timestamp': frame_time,
+            })
+        return True
+    
+    def _abort_startup(self):
+        """Stop threads started by a failed initialize() so the process can exit."""
+        if self.capture_thread:
+            self.capture_thread.stop()
+            self.capture_thread.join(timeout=2)
+        if self.audio_alerter:
+            self.audio_alerter.close()
+        if self.arduino:
+            self.arduino.close()
+        if self.telemetry_db:
+            self.telemetry_db.close()
+    
     def process_frame(self, frame):
         """
         Process single frame for face and eye detection using improved detector.
         
+        The input frame is only read. The returned (mirrored, annotated) frame is
+        a buffer owned by the app and is overwritten by the next call.
+        
         Args:
             frame: OpenCV frame (BGR)
         
@@ -1028,47 +4801,54 @@ class DrowsinessDetectionApp:
             'right_eye_landmarks': [],
             'mouth_landmarks': None,
             'face_landmarks': None,
+            'face_confidence': 0.0,
+            'face_roi': None,
+            'analysed': True,  # False on frames the adaptive scheduler skipped
             'debug_text': ""
         }
         
+        timer = self.stage_timer
+        timer.start()
+        
         try:
-            # Flip for mirror effect
-            frame = cv2.flip(frame, 1)
+            # Flip for mirror effect (into reused buffers, no per-frame allocation)
+            frame = self._mirror(frame)
             h, w = frame.shape[:2]
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray_frame)
+            timer.lap('preprocess')
             
-            # Detect faces
-            faces = self.face_cascade.detectMultiScale(
-                gray, 
-                scaleFactor=1.1,
-                minNeighbors=7,
-                minSize=(80, 80)
-            )
+            # Locate face and estimate EAR/MAR with the configured backend
+            detection = self.detector_backend.detect(frame, gray, timer)
             
-            if len(faces) > 0:
+            if detection is not None:
+                face_roi = detection.face_roi
                 results['face_detected'] = True
-                face_roi = faces[0]  # Use largest face
-                
-                # Detect eyes using darkness/intensity analysis (MUCH more reliable)
-                ear_left, ear_right, eyes_detected = self.eye_detector.detect_eye_closure_by_darkness(
-                    gray, face_roi
-                )
-                
-                results['ear_left'] = ear_left
-                results['ear_right'] = ear_right
-                results['ear_avg'] = (ear_left + ear_right) / 2.0
-                
-                # Estimate MAR
-                results['mar'] = self.eye_detector.estimate_mar(gray, face_roi)
+                results['face_roi'] = face_roi
+                results['face_confidence'] = detection.confidence
+                results['ear_left'] = detection.ear_left
+                results['ear_right'] = detection.ear_right
+                results['ear_avg'] = (detection.ear_left + detection.ear_right) / 2.0
+                results['mar'] = detection.mar
                 
                 # Draw face rectangle for visualization
                 x, y, fw, fh = face_roi
                 cv2.rectangle(frame, (x, y), (x+fw, y+fh), (0, 255, 0), 2)
                 
-                # Draw eye region boxes for debugging
-                eye_top = int(y + fh * 0.15)
-                eye_bottom = int(y + fh * 0.40)
-                cv2.rectangle(frame, (x, eye_top), (x+fw, eye_bottom), (255, 0, 0), 1)
+                landmarks = detection.landmarks
+                if landmarks is not None:
+                    backend = self.detector_backend
+                    results['face_landmarks'] = landmarks
+                    results['left_eye_landmarks'] = landmarks[list(backend.LEFT_EYE)]
+                    results['right_eye_landmarks'] = landmarks[list(backend.RIGHT_EYE)]
+                    results['mouth_landmarks'] = dict(zip(('top', 'bottom', 'left', 'right'),
+                                                          landmarks[backend.MOUTH]))
+                    for points in (results['left_eye_landmarks'], results['right_eye_landmarks']):
+                        cv2.polylines(frame, [points.astype(np.int32)], True, (255, 0, 0), 1)
+                else:
+                    # Draw eye region boxes for debugging
+                    eye_top = int(y + fh * 0.15)
+                    eye_bottom = int(y + fh * 0.40)
+                    cv2.rectangle(frame, (x, eye_top), (x+fw, eye_bottom), (255, 0, 0), 1)
                 
                 # Draw EAR and MAR on frame
                 cv2.putText(frame, f"EAR-L: {results['ear_left']:.3f}", (x, y-40),
@@ -1080,45 +4860,348 @@ class DrowsinessDetectionApp:
                 
                 # Store debug text
                 results['debug_text'] = f"EAR-Avg: {results['ear_avg']:.3f} | MAR: {results['mar']:.3f}"
+                timer.lap('annotate')
         
         except Exception as e:
             print(f"[PROCESS ERROR] {e}", flush=True)
         
         return results, frame
     
+    def _mirror(self, frame):
+        """Flip a frame into the reused display buffer."""
+        if self._display_frame is None or self._display_frame.shape != frame.shape:
+            self._display_frame = np.empty_like(frame)
+            self._gray_frame = np.empty(frame.shape[:2], dtype=frame.dtype)
+        return cv2.flip(frame, 1, dst=self._display_frame)
+    
+    def analyse_frame(self, frame, timestamp=None):
+        """
+        process_frame() on the frames the adaptive scheduler selects.
+        
+        Skipped frames are only mirrored; their results are the last analysed
+        results with 'analysed' set to False.
+        
+        Args:
+            frame: OpenCV frame (BGR)
+            timestamp (float): Capture time in seconds
+        
+        Returns:
+            tuple: (results dict, frame)
+        """
+        if self.scheduler.should_analyse(timestamp) or self._last_results is None:
+            results, frame = self.process_frame(frame)
+            self._last_results = results
+            return results, frame
+        
+        results = dict(self._last_results, analysed=False)
+        frame = self._mirror(frame)
+        if results['face_roi'] is not None:
+            x, y, fw, fh = results['face_roi']
+            cv2.rectangle(frame, (x, y), (x+fw, y+fh), (0, 255, 0), 2)
+        return results, frame
+    
+    def smooth_signals(self, results, alcohol_level, timestamp=None):
+        """
+        Run the configured streaming filters over this frame's signals.
+        
+        EAR/MAR filters only take frames with a face; alcohol is filtered every frame.
+        Calibration, scoring and alert logging all use the smoothed values.
+        
+        Args:
+            results (dict): Output of process_frame()
+            alcohol_level (int): Current alcohol sensor reading
+            timestamp (float): Capture time in seconds (used by time-aware filters)
+        
+        Returns:
+            dict: Smoothed 'ear', 'mar' and 'alcohol' (raw values until a filter has data)
+        """
+        filters = self.signal_filters
+        if results['face_detected']:
+            filters.update('ear', results['ear_avg'], timestamp)
+            filters.update('mar', results['mar'], timestamp)
+        return {
+            'ear': filters.value('ear', results['ear_avg']),
+            'mar': filters.value('mar', results['mar']),
+            'alcohol': filters.update('alcohol', alcohol_level, timestamp),
+        }
+    
+    def score_frame(self, results, alcohol_level, timestamp=None, signals=None):
+        """
+        Update the eyes-closed / mouth-open durations, compute the live threat
+        score and feed the adaptive scheduler.
+        
+        Args:
+            results (dict): Output of process_frame()
+            alcohol_level (int): Current alcohol sensor reading
+            timestamp (float): Capture time in seconds (None = nominal frame interval)
+            signals (dict): smooth_signals() output to score instead of the raw EAR/MAR/alcohol
+        
+        Returns:
+            tuple: (threat_score, trigger_type)
+        """
+        started = time.monotonic()
+        engine = self.threat_engine
+        calibration = self.calibration
+        if Config.CALIBRATION_ADAPT_THRESHOLDS and calibration and calibration.calibrated:
+            # Follow the continuously adapted baseline (e.g. after a lighting change)
+            ear_scale, mar_scale = calibration.threshold_scale(Config.CALIBRATION_THRESHOLD_SCALE_LIMITS)
+            thresholds = self.detector_backend.thresholds
+            engine.ear_threshold = thresholds.get('ear_threshold', Config.EAR_THRESHOLD) * ear_scale
+            engine.mar_threshold = thresholds.get('mar_threshold', Config.MAR_THRESHOLD) * mar_scale
+        if signals is None:
+            ear, mar = results['ear_avg'], results['mar']
+        else:
+            ear, mar, alcohol_level = signals['ear'], signals['mar'], signals['alcohol']
+        threat_score, trigger_type = engine.update(
+            results['face_detected'], ear, mar, alcohol_level, timestamp
+        )
+        self.drowsy_seconds = engine.drowsy_seconds
+        self.yawn_seconds = engine.yawn_seconds
+        
+        # Skipped frames hold the last analysed results, so only analysed frames steer the rate
+        if results.get('analysed', True):
+            self.scheduler.observe(results, threat_score, engine)
+        self.scheduler.observe_alcohol(alcohol_level)
+        self.latency.record('score', time.monotonic() - started)
+        return threat_score, trigger_type
+    
+    def _start_profiling(self):
+        """Profile mode: time the process_frame() sub-stages and sample every thread."""
+        self.frame_profile = LatencyMonitor(window_seconds=Config.LATENCY_WINDOW_SECONDS,
+                                            max_seconds=Config.LATENCY_MAX_SECONDS)
+        self.stage_timer = StageTimer(enabled=True, monitor=self.frame_profile)
+        if Config.PROFILE_SAMPLING:
+            self.profiler = SamplingProfiler(Config.PROFILE_SAMPLE_INTERVAL_MS / 1000.0)
+            self.profiler.start()
+        print(f"[PROFILE] Profiling enabled (stage timers"
+              f"{f', stack sampling every {Config.PROFILE_SAMPLE_INTERVAL_MS} ms' if self.profiler else ''})")
+    
+    def _finish_profiling(self):
+        """Stop the sampler, print the summary tables and write the collapsed stacks."""
+        if self.profiler:
+            self.profiler.stop()
+        report_stage_profile(self.loop_profile, self.frame_profile, prefix="[SHUTDOWN]")
+        outputs = [(Config.PROFILE_STAGES_OUTPUT,
+                    lambda path: write_stage_collapsed(path, self.loop_profile, self.frame_profile))]
+        if self.profiler:
+            self.profiler.report(Config.PROFILE_TOP_FRAMES, prefix="[SHUTDOWN]")
+            outputs.append((Config.PROFILE_OUTPUT, self.profiler.write_collapsed))
+        for path, write in outputs:
+            if not path:
+                continue
+            try:
+                write(path)
+                print(f"[SHUTDOWN] ✓ Collapsed stacks written to {path}")
+            except Exception as e:
+                print(f"[SHUTDOWN] Failed to write {path}: {e}")
+    
+    def _start_recording(self):
+        """Open the incident recording (frame size taken from the capture ring)."""
+        color = Config.RECORD_COLOR
+        if color == 'auto':
+            # The Haar heuristics only read gray, so gray replays are exact; FaceMesh needs colour
+            color = 'bgr' if Config.DETECTOR_BACKEND == 'facemesh' else 'gray'
+        shape = self.frame_buffer.slots.shape[1:]
+        try:
+            self.recorder = RecordingWriter(
+                Config.RECORD_PATH,
+                shape if color == 'bgr' else shape[:2],
+                chunk_frames=Config.RECORD_CHUNK_FRAMES,
+                metadata={'color': color, 'detector': Config.DETECTOR_BACKEND,
+                          'target_fps': Config.TARGET_FPS, 'driver_profile': Config.DRIVER_PROFILE,
+                          'started': datetime.now().isoformat()}
+            )
+        except Exception as e:
+            print(f"[WARN] Recording disabled: {e}")
+            return
+        if self.arduino:
+            self.arduino.on_line = self.recorder.write_message
+        print(f"[INIT] ✓ Recording {color} frames + serial lines to {Config.RECORD_PATH}")
+    
+    def _record_frame(self, frame, timestamp):
+        """Convert/copy a borrowed camera frame straight into the recording."""
+        recorder = self.recorder
+        if frame.shape[:2] != recorder.frame_shape[:2]:
+            return  # Resolution changed mid-run; the recording keeps its frame size
+        slot = recorder.frame_slot()
+        if slot.ndim == 2:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=slot)
+        else:
+            np.copyto(slot, frame)
+        recorder.commit_frame(timestamp)
+    
+    def replay(self, path, realtime=True):
+        """
+        Feed a recording through process_frame() and the scoring logic (headless).
+        
+        Recorded serial lines are applied to a detached ArduinoConnection before
+        the first frame captured after them, and every time-dependent step
+        (alert windows, filters, scheduler) runs on the recorded capture
+        timestamps, so replays of a recording are bit-for-bit identical: the
+        printed digest over the per-frame results only changes when the
+        pipeline does. When the live run started from a cached baseline, the
+        recording's metadata holds it and the replay loads it at the same frame.
+        
+        Args:
+            path (str): Recording directory (python eye_detection.py --record DIR)
+            realtime (bool): Pace frames at the recorded speed (False = as fast as possible)
+        
+        Returns:
+            str: SHA-256 hex digest of the per-frame results (None if detection failed to load)
+        """
+        recording = Recording(path)
+        print(f"[REPLAY] {path}: {len(recording)} frames, {len(recording.lines)} serial lines, "
+              f"{recording.duration:.1f}s ({recording.meta['metadata'].get('color', '?')} frames, "
+              f"{'recorded speed' if realtime else 'as fast as possible'})")
+        if len(recording) == 0 or not self.initialize_detection():
+            return None
+        
+        self.arduino = ArduinoConnection(Config.SERIAL_BAUD_RATE, Config.SERIAL_TIMEOUT)  # Never started
+        self.calibration = CalibrationEngine(
+            Config.CALIBRATION_FRAMES,
+            continuous=Config.CALIBRATION_CONTINUOUS,
+            epoch_frames=Config.CALIBRATION_EPOCH_FRAMES,
+            blend=Config.CALIBRATION_BLEND,
+            checkpoint_interval=Config.CALIBRATION_CHECKPOINT_SECONDS,
+            profile=Config.DRIVER_PROFILE,
+            detector=Config.DETECTOR_BACKEND,
+            lighting_edges=Config.CALIBRATION_LIGHTING_EDGES,
+            verify_frames=Config.CALIBRATION_VERIFY_FRAMES,
+            verify_tolerance=Config.CALIBRATION_VERIFY_TOLERANCE
+        )
+        self.threat_engine.reset()
+        self.signal_filters.reset()
+        cached = recording.meta['metadata'].get('cached_baseline')
+        
+        digest = hashlib.sha256()
+        bgr = None
+        last_threat_score = 0
+        alerting = False
+        max_threat = 0.0
+        first_timestamp = float(recording.timestamps[0])
+        wall_start = time.perf_counter()
+        
+        for index, timestamp, frame, lines in recording.replay():
+            for line in lines:
+                self.arduino.replay_line(line, timestamp)
+            if realtime:
+                delay = wall_start + (timestamp - first_timestamp) - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if frame.ndim == 2:
+                bgr = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR, dst=bgr)  # Back to gray exactly
+                frame = bgr
+            
+            results, _ = self.analyse_frame(frame, timestamp)
+            alcohol_level = self.arduino.alcohol_level_at(timestamp)
+            if results['analysed']:
+                if results['face_detected']:
+                    self.face_frames += 1
+                else:
+                    self.no_face_frames += 1
+                self.calibration.observe_brightness(cv2.mean(self._gray_frame)[0])
+            if cached and timestamp >= cached['frame_timestamp']:
+                self.calibration.load_cached(cached['baseline_ear'], cached['baseline_mar'],
+                                             cached['stored'], now=timestamp)
+                cached = None
+            
+            # Same decisions as run(): smooth, then calibrate first, score and adapt
+            smoothed = self.smooth_signals(results, alcohol_level, timestamp)
+            threat_score, trigger_type = 0.0, None
+            if not self.calibration.calibrated:
+                if results['face_detected']:
+                    self.calibration.add_sample(smoothed['ear'], smoothed['mar'], timestamp)
+            else:
+                threat_score, trigger_type = self.score_frame(results, alcohol_level, timestamp, smoothed)
+                if results['face_detected']:
+                    neutral = (self.drowsy_seconds == 0 and self.yawn_seconds == 0
+                               and threat_score < Config.THREAT_SCORE_WARNING)
+                    if results['analysed']:
+                        self.calibration.update(smoothed['ear'], smoothed['mar'], neutral, timestamp)
+                    if threat_score >= Config.THREAT_SCORE_WARNING:
+                        if not alerting:
+                            alerting = True
+                            print(f"[REPLAY] {timestamp - first_timestamp:8.2f}s frame {index}: "
+                                  f"ALERT {threat_score:.1f}/100 ({trigger_type})")
+                        if threat_score != last_threat_score:
+                            reason = trigger_type or "UNKNOWN"
+                            self.alert_counts[reason] = self.alert_counts.get(reason, 0) + 1
+                    last_threat_score = threat_score
+                if alerting and (threat_score < Config.THREAT_SCORE_WARNING or not results['face_detected']):
+                    alerting = False
+                max_threat = max(max_threat, threat_score)
+            
+            digest.update(struct.pack('<I??dddddd', index, results['face_detected'], results['analysed'],
+                                      results['ear_left'], results['ear_right'], results['mar'],
+                                      float(alcohol_level), float(threat_score),
+                                      float(self.calibration.baseline_ear)))
+            digest.update((trigger_type or '').encode() + b'\n')
+        
+        elapsed = time.perf_counter() - wall_start
+        self.detector_backend.close()
+        analysed = self.face_frames + self.no_face_frames
+        print(f"[REPLAY] {len(recording)} frames in {elapsed:.2f}s ({len(recording) / max(elapsed, 1e-9):.1f} FPS), "
+              f"{analysed} analysed, face in {self.face_frames / max(analysed, 1) * 100:.0f}%")
+        print(f"[REPLAY] Max threat {max_threat:.1f}; alerts by trigger: "
+              f"{', '.join(f'{k} {v}' for k, v in sorted(self.alert_counts.items())) or 'none'}")
+        print(f"[REPLAY] Result digest: {digest.hexdigest()}")
+        recording.close()
+        return digest.hexdigest()
+    
     def run(self):
         """Main application loop."""
+        if Config.PROFILE_ENABLED:
+            self._start_profiling()
+        
         if not self.initialize():
             print("[ERROR] Initialization failed")
             return
+        if Config.RECORD_PATH:
+            self._start_recording()
         
         self.running = True
         
         # State management
-        drowsiness_frame_counter = 0
-        yawn_frame_counter = 0
         last_threat_score = 0
         last_trigger_type = None
         alert_start_time = None
-        ear_smoother = deque(maxlen=Config.EAR_BUFFER_SIZE)
         
+        loop = self.loop_timer
+        wall_offset = time.time() - time.monotonic()  # Capture timestamps -> epoch for the signal log
         try:
             while self.running:
-                # Get frame from queue
-                try:
-                    ret, frame = self.frame_queue.get(timeout=1.0)
-                except queue.Empty:
-                    print("[WARN] Frame queue empty - camera may have disconnected")
-                    continue
+                loop.start()
                 
-                if not ret:
-                    print("[ERROR] Failed to get valid frame")
+                # Borrow latest frame from the ring buffer (no copy)
+                borrowed = self.frame_buffer.acquire_read(timeout=1.0)
+                loop.lap('wait_frame')
+                if borrowed is None:
+                    print("[WARN] Frame buffer empty - camera may have disconnected")
                     continue
                 
-                # Process frame
-                results, frame = self.process_frame(frame)
-                frame_copy = frame.copy()
+                frame_time = borrowed.timestamp
+                latency = self.latency
+                latency.since('queue', frame_time)
+                if self.recorder:
+                    self._record_frame(borrowed.frame, frame_time)
+                    loop.lap('record')
+                
+                # Process frame; the slot goes back once it has been flipped into our own buffer
+                analysis_start = time.monotonic()
+                try:
+                    results, frame = self.analyse_frame(borrowed.frame, frame_time)
+                finally:
+                    self.frame_buffer.release(borrowed)
+                if results['analysed']:
+                    latency.record('process', time.monotonic() - analysis_start)
+                    if results['face_detected']:
+                        self.face_frames += 1
+                    else:
+                        self.no_face_frames += 1
                 h, w = frame.shape[:2]
+                if 'first_frame' not in self.startup.steps:
+                    self.startup.mark('first_frame')
+                    print(f"[STARTUP] First frame analysed {self.startup.elapsed()*1000:.0f} ms after start")
                 
                 # Update FPS
                 self.fps_counter += 1
@@ -1128,123 +5211,115 @@ class DrowsinessDetectionApp:
                     self.fps_counter = 0
                     self.fps_timer = time.time()
                 
+                alcohol_level = self.arduino.alcohol_level_at(frame_time) if self.arduino else 0
+                if results['analysed']:
+                    self.calibration.observe_brightness(cv2.mean(self._gray_frame)[0])
+                
+                # Cached baseline for this driver and lighting: skip the calibration phase.
+                # Looked up once the brightness average has settled, and again whenever the
+                # lighting bucket changes until a baseline is loaded or calibration completes
+                calibration = self.calibration
+                if (not self._calibration_cache_checked and not calibration.calibrated
+                        and results['face_detected']
+                        and calibration.brightness_samples >= Config.CALIBRATION_CACHE_SETTLE_FRAMES
+                        and calibration.lighting_bucket != self._calibration_cache_bucket):
+                    self._calibration_cache_bucket = calibration.lighting_bucket
+                    self._calibration_cache_checked = self._load_cached_calibration(frame_time)
+                smoothed = self.smooth_signals(results, alcohol_level, frame_time)
+                loop.lap('analyse')
+                
                 # ===== CALIBRATION PHASE =====
                 if not self.calibration.calibrated:
+                    if self.signal_logger:
+                        self.signal_logger.log(results, alcohol_level, 0, frame_time + wall_offset)
+                    
                     if results['face_detected']:
-                        self.calibration.add_sample(results['ear_avg'], results['mar'])
+                        self.calibration.add_sample(smoothed['ear'], smoothed['mar'], frame_time)
                         
                         # Draw calibration UI
-                        cv2.rectangle(frame_copy, (0, 0), (w, 120), (40, 40, 40), -1)
+                        cv2.rectangle(frame, (0, 0), (w, 120), (40, 40, 40), -1)
                         progress = self.calibration.get_progress()
-                        cv2.putText(frame_copy, "CALIBRATION PHASE", (20, 40),
+                        cv2.putText(frame, "CALIBRATION PHASE", (20, 40),
                                   cv2.FONT_HERSHEY_SIMPLEX, 1, (100, 255, 100), 2)
-                        cv2.putText(frame_copy, f"Progress: {progress}%", (20, 80),
+                        cv2.putText(frame, f"Progress: {progress}%", (20, 80),
                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (100, 255, 100), 2)
                         
                         # Draw progress bar
                         bar_width = int((progress / 100) * (w - 40))
-                        cv2.rectangle(frame_copy, (20, 100), (20 + bar_width, 115),
+                        cv2.rectangle(frame, (20, 100), (20 + bar_width, 115),
                                     (100, 255, 100), -1)
-                        cv2.rectangle(frame_copy, (20, 100), (w - 20, 115),
+                        cv2.rectangle(frame, (20, 100), (w - 20, 115),
                                     (255, 255, 255), 2)
+                    loop.lap('calibration')
                     
-                    cv2.imshow("Drowsiness Detection System", frame_copy)
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                    cv2.imshow("Drowsiness Detection System", frame)
+                    loop.lap('imshow')
+                    key = cv2.waitKey(1) & 0xFF
+                    loop.lap('waitkey')
+                    if key == ord('q'):
                         break
                     
                     continue
                 
                 # ===== DETECTION PHASE =====
                 if results['face_detected']:
-                    # Smooth EAR
-                    ear_smoother.append(results['ear_avg'])
-                    ear_smoothed = np.mean(ear_smoother) if len(ear_smoother) > 0 else results['ear_avg']
-                    
-                    # Calculate thresholds - use fixed thresholds
-                    alcohol_level = self.arduino.alcohol_level if self.arduino else 0
-                    
-                    # Check drowsiness (EAR below threshold)
-                    if results['ear_avg'] < Config.EAR_THRESHOLD:
-                        drowsiness_frame_counter += 1
-                    else:
-                        drowsiness_frame_counter = 0
-                    
-                    # Check yawning (MAR above threshold)
-                    if results['mar'] > Config.MAR_THRESHOLD:
-                        yawn_frame_counter += 1
-                    else:
-                        yawn_frame_counter = 0
+                    ear_smoothed = smoothed['ear']
                     
                     # Calculate threat score based on frame counters
-                    threat_score = 0
-                    trigger_type = None
-                    
-                    # Drowsiness component
-                    if drowsiness_frame_counter >= Config.EAR_CONSECUTIVE_FRAMES:
-                        threat_score += 50
-                        trigger_type = "DROWSY"
-                    elif drowsiness_frame_counter >= Config.EAR_CONSECUTIVE_FRAMES / 2:
-                        threat_score += 25
-                    
-                    # Yawning component
-                    if yawn_frame_counter >= Config.MAR_CONSECUTIVE_FRAMES:
-                        threat_score += 40
-                        trigger_type = "YAWN" if not trigger_type else "MULTI"
-                    elif yawn_frame_counter >= Config.MAR_CONSECUTIVE_FRAMES / 2:
-                        threat_score += 20
-                    
-                    # Alcohol component (if alcohol sensor connected)
-                    if alcohol_level > Config.ALCOHOL_THRESHOLD_BASELINE:
-                        threat_score += 30
-                        threat_score *= 1.2  # Amplify for alcohol
-                        if trigger_type:
-                            trigger_type = "MULTI"
-                        else:
-                            trigger_type = "ALCOHOL"
-                    
-                    # Cap threat score
-                    if threat_score >= 75:
-                        trigger_type = "CRITICAL"
+                    threat_score, trigger_type = self.score_frame(results, alcohol_level, frame_time, smoothed)
+                    loop.lap('scoring')
                     
-                    threat_score = min(100, threat_score)
-                    ear_threshold = Config.EAR_THRESHOLD
+                    # Adapt the baseline from neutral frames (eyes open, mouth closed, no threat)
+                    neutral = (self.drowsy_seconds == 0 and self.yawn_seconds == 0
+                               and threat_score < Config.THREAT_SCORE_WARNING)
+                    if results['analysed']:
+                        self.calibration.update(smoothed['ear'], smoothed['mar'], neutral, frame_time)
                     
                     # Alert triggering - trigger Audio as soon as threat detected (not just on crossing)
                     if threat_score >= Config.THREAT_SCORE_WARNING:
                         if not alert_start_time:
                             alert_start_time = time.time()
                             print(f"\n[🔴 ALERT] Threat Score: {threat_score:.1f}/100 | Type: {trigger_type}")
-                            print(f"[🔴 ALERT] EAR: {ear_smoothed:.4f} | MAR: {results['mar']:.4f}")
-                            print(f"[🔴 ALERT] Drowsy frames: {drowsiness_frame_counter}/{Config.EAR_CONSECUTIVE_FRAMES}\n")
+                            print(f"[🔴 ALERT] EAR: {ear_smoothed:.4f} | MAR: {smoothed['mar']:.4f}")
+                            print(f"[🔴 ALERT] Eyes closed: {self.drowsy_seconds:.2f}/{Config.EAR_CLOSED_SECONDS}s\n")
                         
                         # Play audio alert on EVERY frame while threat persists
                         if self.audio_alerter:
-                            self.audio_alerter.trigger_alert(trigger_type or "UNKNOWN")
+                            self.audio_alerter.trigger_alert(trigger_type or "UNKNOWN", origin=frame_time)
                         
                         # Send to Arduino
-                        if self.arduino and self.arduino.connected and threat_score != last_threat_score:
-                            self.arduino.send_threat_score(threat_score, trigger_type or "UNKNOWN")
+                        if self.arduino and threat_score != last_threat_score:
+                            self.arduino.send_threat_score(threat_score, trigger_type or "UNKNOWN",
+                                                           origin=frame_time)
                         
-                        # Log to database
+                        # Count and log the alert
+                        if threat_score != last_threat_score:
+                            reason = trigger_type or "UNKNOWN"
+                            self.alert_counts[reason] = self.alert_counts.get(reason, 0) + 1
                         if self.telemetry_db and threat_score != last_threat_score:
                             alert_duration = time.time() - alert_start_time if alert_start_time else 0
                             self.telemetry_db.log_alert(
                                 threat_score=threat_score,
                                 trigger_reason=trigger_type or "UNKNOWN",
                                 ear=ear_smoothed,
-                                mar=results['mar'],
-                                alcohol_level=alcohol_level,
-                                duration=alert_duration
+                                mar=smoothed['mar'],
+                                alcohol_level=round(smoothed['alcohol']),  # Values the score used
+                                duration=alert_duration,
+                                origin=frame_time
                             )
                     
                     # Clear alert if score drops
-                    if threat_score < Config.THREAT_SCORE_WARNING and alert_start_time:
-                        alert_duration = time.time() - alert_start_time
-                        print(f"[CLEAR] Alert cleared after {alert_duration:.1f}s")
-                        alert_start_time = None
+                    if threat_score < Config.THREAT_SCORE_WARNING:
+                        if alert_start_time:
+                            alert_duration = time.time() - alert_start_time
+                            print(f"[CLEAR] Alert cleared after {alert_duration:.1f}s")
+                            alert_start_time = None
+                        if self.arduino:
+                            self.arduino.clear_threat()
                     
                     last_threat_score = threat_score
                     last_trigger_type = trigger_type
+                    loop.lap('alerts')
                     
                     # Add threat info to frame
                     threat_color = (0, 255, 0)  # Green = safe
@@ -1255,48 +5330,60 @@ class DrowsinessDetectionApp:
                     elif threat_score >= Config.THREAT_SCORE_WARNING:
                         threat_color = (0, 255, 255)  # Yellow = alert
                     
-                    cv2.rectangle(frame_copy, (0, 0), (w, 100), (40, 40, 40), -1)
-                    cv2.putText(frame_copy, f"Threat: {threat_score:.1f}/100", (20, 50),
+                    cv2.rectangle(frame, (0, 0), (w, 100), (40, 40, 40), -1)
+                    cv2.putText(frame, f"Threat: {threat_score:.1f}/100", (20, 50),
                                cv2.FONT_HERSHEY_SIMPLEX, 1.2, threat_color, 2)
-                    cv2.putText(frame_copy, f"Type: {trigger_type or 'NORMAL'}", (20, 85),
+                    cv2.putText(frame, f"Type: {trigger_type or 'NORMAL'}", (20, 85),
                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, threat_color, 2)
                     
                     # Add FPS
-                    cv2.putText(frame_copy, f"FPS: {self.fps:.1f}", (w-150, 30),
+                    cv2.putText(frame, f"FPS: {self.fps:.1f}", (w-150, 30),
                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                    cv2.putText(frame, f"Analysis: {self.scheduler.analysis_fps:.1f}/s", (w-150, 55),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
                     
                     # Add eye/mouth info
-                    cv2.putText(frame_copy, f"Drowsy: {drowsiness_frame_counter}/{Config.EAR_CONSECUTIVE_FRAMES}", 
+                    cv2.putText(frame, f"Drowsy: {self.drowsy_seconds:.2f}/{Config.EAR_CLOSED_SECONDS}s", 
                                (w-300, 85), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 1)
+                    cv2.putText(frame, f"Baseline EAR {self.calibration.baseline_ear:.3f} "
+                               f"MAR {self.calibration.baseline_mar:.3f} "
+                               f"({self.calibration.get_confidence()*100:.0f}%)",
+                               (10, h - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+                    loop.lap('overlay')
 
                 
                 else:
-                    drowsiness_frame_counter = 0
-                    yawn_frame_counter = 0
+                    threat_score, trigger_type = self.score_frame(results, alcohol_level, frame_time, smoothed)
+                    loop.lap('scoring')
                     if alert_start_time:
                         alert_duration = time.time() - alert_start_time
                         print(f"[CLEAR] Alert cleared (face lost) after {alert_duration:.1f}s")
                         alert_start_time = None
+                    if self.arduino:
+                        self.arduino.clear_threat()
                     
-                    cv2.putText(frame_copy, "NO FACE DETECTED", (w//2 - 150, h//2),
+                    cv2.putText(frame, "NO FACE DETECTED", (w//2 - 150, h//2),
                               cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 3)
+                    loop.lap('overlay')
                 
-                # Read Arduino data
-                if self.arduino and self.arduino.connected:
-                    self.arduino.read_data()
-                else:
-                    # Attempt reconnect
-                    if time.time() % 10 < 0.1:  # Every ~10 seconds
-                        self.arduino.connect()
+                latency.since('dispatch', frame_time)
+                
+                if self.signal_logger:
+                    self.signal_logger.log(results, alcohol_level, threat_score, frame_time + wall_offset)
+                    loop.lap('signal_log')
                 
                 # Display frame
-                cv2.imshow("Drowsiness Detection System", frame_copy)
+                cv2.imshow("Drowsiness Detection System", frame)
+                loop.lap('imshow')
                 
                 # Keyboard controls
                 key = cv2.waitKey(1) & 0xFF
+                loop.lap('waitkey')
                 if key == ord('q') or key == ord('Q'):
                     print("\n[INFO] Quit command received")
                     break
+                elif key == ord('l') or key == ord('L'):
+                    self.latency.report()
         
         except KeyboardInterrupt:
             print("\n[INFO] Keyboard interrupt received")
@@ -1386,27 +5473,88 @@ class DrowsinessDetectionApp:
         
         self.running = False
         
+        # Stop serving metrics
+        if self.metrics_server:
+            self.metrics_server.close()
+            print(f"[SHUTDOWN] ✓ Metrics endpoint closed ({self.metrics_server.scrapes} scrapes)")
+        
         # Stop video capture thread
         if self.capture_thread:
             self.capture_thread.stop()
             self.capture_thread.join(timeout=2)
-            print("[SHUTDOWN] ✓ Video capture stopped")
+            stats = self.frame_buffer.get_stats()
+            print(f"[SHUTDOWN] ✓ Video capture stopped ({stats['written']} captured, "
+                  f"{stats['read']} processed, {stats['dropped']} dropped)")
+        
+        # Report face localisation savings
+        if self.face_tracker:
+            stats = self.face_tracker.get_stats()
+            print(f"[SHUTDOWN] Face localisation: {stats['detect_frames']} detect / "
+                  f"{stats['track_frames']} track frames ({stats['track_ratio']*100:.0f}% tracked)")
+        
+        # Report the adaptive processing rate
+        stats = self.scheduler.get_stats()
+        if stats['frames']:
+            print(f"[SHUTDOWN] Adaptive rate: {stats['analysed']}/{stats['frames']} frames analysed "
+                  f"({stats['analysis_ratio']*100:.0f}%), {stats['wakeups']} wake-ups")
+        
+        # Stop audio worker
+        if self.audio_alerter:
+            self.audio_alerter.close()
+            print(f"[SHUTDOWN] ✓ Audio stopped ({self.audio_alerter.alerts_played} alerts played, "
+                  f"{self.audio_alerter.alerts_preempted} preempted)")
         
         # Close Arduino connection
         if self.arduino:
             self.arduino.close()
-            print("[SHUTDOWN] ✓ Arduino disconnected")
+            stats = self.arduino.get_stats()
+            print(f"[SHUTDOWN] ✓ Arduino disconnected ({stats['sent']} sent, {stats['coalesced']} coalesced, "
+                  f"{stats['dropped']} dropped, "
+                  f"{stats['received']} received, {stats['reconnects']} reconnects)")
+        
+        # Close the recording (after the serial thread has stopped adding lines)
+        if self.recorder:
+            self.recorder.close()
+            print(f"[SHUTDOWN] ✓ Recording closed ({self.recorder.frames} frames, "
+                  f"{self.recorder.messages} serial lines): {self.recorder.path}")
         
         # Close MediaPipe
         if self.face_mesh:
             self.face_mesh.close()
             print("[SHUTDOWN] ✓ MediaPipe closed")
         
-        # Close database
+        # Checkpoint the adapted baseline before the database closes
+        if self.calibration and self.calibration.continuous and self.calibration.calibrated:
+            self.calibration.checkpoint(self.calibration.neutral_samples)
+            stats = self.calibration.get_stats()
+            print(f"[SHUTDOWN] ✓ Baseline EAR {stats['baseline_ear']:.4f} MAR {stats['baseline_mar']:.4f} "
+                  f"after {stats['epochs']} epochs (drift {stats['ear_drift_per_hour']:+.4f} EAR/h)")
+        
+        # Close database (flushes the telemetry writer)
+        if self.signal_logger:
+            self.signal_logger.close()
+        
         if self.telemetry_db:
             self.telemetry_db.close()
+            stats = self.telemetry_db.get_stats()
+            if stats:
+                print(f"[SHUTDOWN] Telemetry: {stats['written']}/{stats['queued']} rows written, "
+                      f"{stats['dropped']} dropped")
             print("[SHUTDOWN] ✓ Database closed")
         
+        # Profile summary (after the worker threads have finished)
+        if Config.PROFILE_ENABLED:
+            self._finish_profiling()
+        
+        # Latency per stage (after audio, serial and database have flushed)
+        self.latency.report(whole_run=True, prefix="[SHUTDOWN]")
+        if Config.LATENCY_DUMP_PATH and self.latency.recorders:
+            try:
+                self.latency.dump(Config.LATENCY_DUMP_PATH)
+                print(f"[SHUTDOWN] ✓ Latency histograms written to {Config.LATENCY_DUMP_PATH}")
+            except Exception as e:
+                print(f"[SHUTDOWN] Failed to write latency histograms: {e}")
+        
         # Close OpenCV
         cv2.destroyAllWindows()
         print("[SHUTDOWN] ✓ OpenCV resources released")
@@ -1419,5 +5567,50 @@ class DrowsinessDetectionApp:
 # ============================================================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drowsiness & alcohol detection system")
+    parser.add_argument('--driver', default=Config.DRIVER_PROFILE,
+                        help="Driver/vehicle profile for the calibration cache (default: %(default)s)")
+    parser.add_argument('--recalibrate', action='store_true',
+                        help="Ignore the cached baseline and run the full calibration")
+    parser.add_argument('--metrics-port', type=int,
+                        help=f"Serve Prometheus metrics on {Config.METRICS_HOST}:PORT")
+    parser.add_argument('--metrics-socket',
+                        help="Serve Prometheus metrics on this Unix socket instead")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile mode: stage times, all-thread stack sampling and collapsed "
+                             "stacks for flame graphs, summarised at shutdown")
+    parser.add_argument('--profile-interval', type=float, default=Config.PROFILE_SAMPLE_INTERVAL_MS,
+                        help="Stack sampling period in ms (default: %(default)s)")
+    parser.add_argument('--profile-output', default=Config.PROFILE_OUTPUT,
+                        help="Collapsed-stack output file (default: %(default)s)")
+    parser.add_argument('--no-sampling', action='store_true',
+                        help="Profile mode without the stack sampler (stage timers only)")
+    parser.add_argument('--record', metavar='DIR',
+                        help="Record the analysed frames and serial lines into a new directory")
+    parser.add_argument('--record-color', choices=('auto', 'gray', 'bgr'), default=Config.RECORD_COLOR,
+                        help="Recorded frame format (default: %(default)s)")
+    parser.add_argument('--replay', metavar='DIR',
+                        help="Replay a recording through detection and scoring (no camera or Arduino)")
+    parser.add_argument('--replay-fast', action='store_true',
+                        help="Replay as fast as possible instead of at the recorded speed")
+    args = parser.parse_args()
+    Config.DRIVER_PROFILE = args.driver
+    if args.recalibrate:
+        Config.CALIBRATION_CACHE = False
+    if args.metrics_port is not None or args.metrics_socket:
+        Config.METRICS_ENABLED = True
+        Config.METRICS_PORT = Config.METRICS_PORT if args.metrics_port is None else args.metrics_port
+        Config.METRICS_UNIX_SOCKET = args.metrics_socket
+    if args.profile:
+        Config.PROFILE_ENABLED = True
+        Config.PROFILE_SAMPLING = not args.no_sampling
+        Config.PROFILE_SAMPLE_INTERVAL_MS = args.profile_interval
+        Config.PROFILE_OUTPUT = args.profile_output
+    Config.RECORD_PATH = args.record
+    Config.RECORD_COLOR = args.record_color
+    
     app = DrowsinessDetectionApp()
-    app.run()
+    if args.replay:
+        app.replay(args.replay, realtime=not args.replay_fast)
+    else:
+        app.run()
@@ -0,0 +1,299 @@
+"""
+Frame + Serial Recordings
+=========================
+On-disk container for reproducing field incidents: the frames the detection
+loop analysed (gray or BGR) and every line the Arduino sent, stamped with
+the capture clock (time.monotonic()) so both streams stay time-aligned.
+
+A recording is a directory of append-only files:
+    meta.json              format version, frame shape/dtype, frames per chunk
+    frames-000000.bin ...  raw frames, `chunk_frames` per file; memory-mapped as (n, h, w[, c])
+    frames.idx             one FRAME_INDEX_DTYPE record (timestamp, chunk, slot) per frame
+    serial.log             MESSAGE_HEADER (timestamp, length) + UTF-8 line, per serial line
+
+Frames are decoded straight into the memory-mapped chunk and index records
+are appended only after their frame is complete, so a recording cut short
+by a crash or power loss stays readable up to its last indexed frame.
+
+Usage:
+    with RecordingWriter('incident.rec', (480, 640)) as writer:
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=writer.frame_slot())
+        writer.commit_frame(timestamp)
+        writer.write_message(timestamp, 'ALCOHOL:312')
+
+    recording = Recording('incident.rec')
+    for index, timestamp, frame, lines in recording.replay():
+        ...
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+INDEX_FILE = 'frames.idx'
+SERIAL_FILE = 'serial.log'
+CHUNK_PATTERN = 'frames-{:06d}.bin'
+
+FRAME_INDEX_DTYPE = np.dtype([('timestamp', '<f8'), ('chunk', '<u4'), ('slot', '<u4')])
+MESSAGE_HEADER = struct.Struct('<dH')  # timestamp, line length in bytes
+
+
+class RecordingWriter:
+    """Writes frames and serial lines into a new recording directory."""
+
+    def __init__(self, path, frame_shape, dtype=np.uint8, chunk_frames=300, metadata=None):
+        """
+        Create a recording.
+
+        Args:
+            path (str): Directory to create (must not exist or be empty)
+            frame_shape (tuple): (height, width) for gray or (height, width, 3) for BGR frames
+            dtype: Frame pixel type
+            chunk_frames (int): Frames per chunk file
+            metadata (dict): Extra information stored in meta.json (e.g. configuration)
+        """
+        if chunk_frames < 1:
+            raise ValueError("chunk_frames must be >= 1")
+        if os.path.isdir(path) and os.listdir(path):
+            raise FileExistsError(f"Recording directory is not empty: {path}")
+        os.makedirs(path, exist_ok=True)
+
+        self.path = path
+        self.frame_shape = tuple(int(n) for n in frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.chunk_frames = chunk_frames
+        self.frames = 0
+        self.messages = 0
+        self._chunk = None
+        self._chunk_index = -1
+        self._slot = 0
+        self._lock = threading.Lock()  # write_message() is called from the serial thread
+
+        self.meta = {
+            'version': FORMAT_VERSION,
+            'frame_shape': list(self.frame_shape),
+            'dtype': self.dtype.str,
+            'chunk_frames': chunk_frames,
+            'metadata': metadata or {},
+        }
+        self._write_meta()
+        self._index_file = open(os.path.join(path, INDEX_FILE), 'ab')
+        self._serial_file = open(os.path.join(path, SERIAL_FILE), 'ab')
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(self.meta, f, indent=2)
+
+    def _open_chunk(self):
+        """Flush the full chunk and map a new one."""
+        self._close_chunk()
+        self._chunk_index += 1
+        chunk_path = os.path.join(self.path, CHUNK_PATTERN.format(self._chunk_index))
+        self._chunk = np.memmap(chunk_path, dtype=self.dtype, mode='w+',
+                                shape=(self.chunk_frames,) + self.frame_shape)
+        self._slot = 0
+        self._index_file.flush()
+
+    def _close_chunk(self, used=None):
+        """Flush the mapped chunk (and trim unused slots from it)."""
+        if self._chunk is None:
+            return
+        self._chunk.flush()
+        chunk_path = self._chunk.filename
+        del self._chunk
+        self._chunk = None
+        if used is not None and used < self.chunk_frames:
+            with open(chunk_path, 'r+b') as f:
+                f.truncate(used * self.dtype.itemsize * int(np.prod(self.frame_shape)))
+
+    def frame_slot(self):
+        """
+        Writable buffer for the next frame (decode or convert straight into it).
+
+        Returns:
+            numpy.ndarray: View into the memory-mapped chunk; call commit_frame() when filled
+        """
+        if self._chunk is None or self._slot >= self.chunk_frames:
+            self._open_chunk()
+        return self._chunk[self._slot]
+
+    def commit_frame(self, timestamp):
+        """Index the frame written into frame_slot() under its capture timestamp."""
+        record = np.array([(timestamp, self._chunk_index, self._slot)], dtype=FRAME_INDEX_DTYPE)
+        self._index_file.write(record.tobytes())
+        self._slot += 1
+        self.frames += 1
+
+    def write_frame(self, frame, timestamp):
+        """Copy one frame into the recording."""
+        np.copyto(self.frame_slot(), frame)
+        self.commit_frame(timestamp)
+
+    def update_metadata(self, **values):
+        """Add or replace entries of the meta.json metadata (e.g. state established mid-recording)."""
+        self.meta['metadata'].update(values)
+        self._write_meta()
+    
+    def write_message(self, timestamp, line):
+        """Append one serial line (safe to call from any thread)."""
+        data = line.encode('utf-8')[:0xFFFF]
+        with self._lock:
+            self._serial_file.write(MESSAGE_HEADER.pack(timestamp, len(data)) + data)
+            self.messages += 1
+
+    def close(self):
+        """Flush everything and record the final counts in meta.json."""
+        if self._index_file.closed:
+            return
+        self._close_chunk(used=self._slot)
+        self._index_file.close()
+        with self._lock:
+            self._serial_file.close()
+        self.meta['frames'] = self.frames
+        self.meta['messages'] = self.messages
+        self._write_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    """Read-only access to a recording; frames are memory-mapped, not loaded."""
+
+    def __init__(self, path):
+        """
+        Open a recording.
+
+        Args:
+            path (str): Recording directory
+        """
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version: {self.meta.get('version')}")
+        self.frame_shape = tuple(self.meta['frame_shape'])
+        self.dtype = np.dtype(self.meta['dtype'])
+        self.frame_bytes = self.dtype.itemsize * int(np.prod(self.frame_shape))
+
+        # Index: drop a partial record left by an interrupted write
+        with open(os.path.join(path, INDEX_FILE), 'rb') as f:
+            data = f.read()
+        usable = len(data) - len(data) % FRAME_INDEX_DTYPE.itemsize
+        self.index = np.frombuffer(data[:usable], dtype=FRAME_INDEX_DTYPE)
+        self._chunks = {}
+        # Frames whose chunk data did not reach the disk are not playable
+        while len(self.index) and not self._has_frame(len(self.index) - 1):
+            self.index = self.index[:-1]
+        self.timestamps = self.index['timestamp']
+
+        self.message_timestamps, self.lines = self._read_messages()
+
+    def _read_messages(self):
+        """Parse serial.log (a truncated last message is ignored)."""
+        timestamps, lines = [], []
+        path = os.path.join(self.path, SERIAL_FILE)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            offset = 0
+            while offset + MESSAGE_HEADER.size <= len(data):
+                timestamp, length = MESSAGE_HEADER.unpack_from(data, offset)
+                start = offset + MESSAGE_HEADER.size
+                if start + length > len(data):
+                    break
+                timestamps.append(timestamp)
+                lines.append(data[start:start + length].decode('utf-8', errors='replace'))
+                offset = start + length
+        return np.array(timestamps, dtype=np.float64), lines
+
+    def _chunk(self, chunk_index):
+        """Memory-map a chunk file (cached; None if it is missing or empty)."""
+        if chunk_index not in self._chunks:
+            chunk_path = os.path.join(self.path, CHUNK_PATTERN.format(chunk_index))
+            size = os.path.getsize(chunk_path) if os.path.exists(chunk_path) else 0
+            frames = size // self.frame_bytes
+            self._chunks[chunk_index] = None if frames == 0 else np.memmap(
+                chunk_path, dtype=self.dtype, mode='r', shape=(frames,) + self.frame_shape)
+        return self._chunks[chunk_index]
+
+    def _has_frame(self, index):
+        record = self.index[index]
+        chunk = self._chunk(int(record['chunk']))
+        return chunk is not None and int(record['slot']) < len(chunk)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def duration(self):
+        """Seconds between the first and last frame."""
+        return float(self.timestamps[-1] - self.timestamps[0]) if len(self) > 1 else 0.0
+
+    def frame(self, index):
+        """Read-only (memory-mapped) frame."""
+        record = self.index[index]
+        return self._chunk(int(record['chunk']))[int(record['slot'])]
+
+    def frame_at(self, timestamp):
+        """
+        Index of the last frame captured at or before a timestamp.
+
+        Returns:
+            int: Frame index (-1 if the timestamp precedes the recording)
+        """
+        return int(np.searchsorted(self.timestamps, timestamp, side='right')) - 1
+
+    def messages_between(self, start, end):
+        """Serial lines with start < timestamp <= end, as (timestamp, line) pairs."""
+        first = int(np.searchsorted(self.message_timestamps, start, side='right'))
+        last = int(np.searchsorted(self.message_timestamps, end, side='right'))
+        return [(float(self.message_timestamps[i]), self.lines[i]) for i in range(first, last)]
+
+    def replay(self, start=0, stop=None):
+        """
+        Iterate frames in capture order with the serial lines that arrived before each.
+
+        Lines up to and including a frame's timestamp are delivered with that
+        frame, so a replay sees the device state as of the frame's capture
+        (the live loop reads sensor values as of capture time too). The first
+        frame yielded also gets every earlier line.
+
+        Args:
+            start (int): First frame
+            stop (int): Frame to stop before (None = end of the recording)
+
+        Yields:
+            tuple: (index, timestamp, frame, lines)
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        previous = -np.inf
+        for index in range(start, stop):
+            timestamp = float(self.timestamps[index])
+            lines = [line for _, line in self.messages_between(previous, timestamp)]
+            previous = timestamp
+            yield index, timestamp, self.frame(index), lines
+
+    def digest(self):
+        """SHA-256 over the frames, timestamps and serial lines (identifies the recording's content)."""
+        digest = hashlib.sha256()
+        digest.update(self.timestamps.tobytes())
+        for index in range(len(self)):
+            digest.update(self.frame(index).tobytes())
+        digest.update(self.message_timestamps.tobytes())
+        for line in self.lines:
+            digest.update(line.encode('utf-8') + b'\n')
+        return digest.hexdigest()
+
+    def close(self):
+        """Release the memory maps."""
+        self._chunks.clear()
@@ -0,0 +1,349 @@
+"""
+Streaming Signal Filters
+========================
+Constant-state smoothing filters for the per-frame EAR, MAR and alcohol
+signals. Every filter preallocates its state when constructed and updates
+in O(1) per sample (the running median is O(log N) in its window via an
+indexable skip list), so smoothing never rebuilds arrays in the frame loop.
+
+Filters share one interface:
+    value = f.update(x, timestamp=None)   # returns the filtered value
+    f.value                               # last output (None before the first sample)
+    f.reset()
+
+Usage:
+    bank = SignalFilterBank({'ear': ('mean', {'window': 7}), 'mar': ('median', {'window': 5})})
+    ear = bank.update('ear', 0.21, timestamp)
+"""
+
+import math
+import random
+
+
+class PassThrough:
+    """No smoothing (the configured 'none' filter)."""
+
+    def __init__(self):
+        self.value = None
+
+    def update(self, x, timestamp=None):
+        """Add one sample and return the filtered value."""
+        self.value = x
+        return x
+
+    def reset(self):
+        """Forget all samples."""
+        self.value = None
+
+
+class MovingAverage:
+    """Mean of the last `window` samples, kept as a running sum over a ring buffer."""
+
+    RESUM_INTERVAL = 4096  # Recompute the sum now and then to shed float round-off
+
+    def __init__(self, window=7):
+        """
+        Args:
+            window (int): Number of samples averaged
+        """
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = window
+        self.buffer = [0.0] * window
+        self.reset()
+
+    def update(self, x, timestamp=None):
+        """Add one sample and return the mean of the window."""
+        index = self.index
+        if self.count < self.window:
+            self.count += 1
+        else:
+            self.total -= self.buffer[index]
+        self.buffer[index] = x
+        self.total += x
+        self.index = index + 1 if index + 1 < self.window else 0
+
+        self.updates += 1
+        if self.updates % self.RESUM_INTERVAL == 0:
+            self.total = math.fsum(self.buffer[:self.count] if self.count < self.window else self.buffer)
+
+        self.value = self.total / self.count
+        return self.value
+
+    def reset(self):
+        """Forget all samples."""
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+        self.updates = 0
+        self.value = None
+
+
+class ExponentialMovingAverage:
+    """Exponentially weighted moving average."""
+
+    def __init__(self, alpha=0.3):
+        """
+        Args:
+            alpha (float): Weight of each new sample (0-1]; higher follows faster
+        """
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, x, timestamp=None):
+        """Add one sample and return the smoothed value."""
+        if self.value is None:
+            self.value = float(x)
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+    def reset(self):
+        """Forget all samples."""
+        self.value = None
+
+
+class IndexableSkiplist:
+    """
+    Sorted multiset with O(log n) insert, remove and rank lookup.
+
+    Each node stores, per level, the number of bottom-level nodes its link
+    skips, so the k-th smallest value is found by walking the widths.
+    """
+
+    _END = float('inf')
+
+    def __init__(self, expected_size=100):
+        """
+        Args:
+            expected_size (int): Typical number of values (sets the number of levels)
+        """
+        self.size = 0
+        self.max_levels = max(1, int(1 + math.log(max(expected_size, 2), 2)))
+        self.head = [None, [None] * self.max_levels, [1] * self.max_levels]  # value, links, widths
+        self._nil = [self._END, [], []]
+        self.head[1] = [self._nil] * self.max_levels
+        self._chain = [None] * self.max_levels
+        self._steps = [0] * self.max_levels
+        self._levels_down = list(reversed(range(self.max_levels)))
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, rank):
+        """Value at sorted position rank (0-based)."""
+        if not 0 <= rank < self.size:
+            raise IndexError("skiplist index out of range")
+        node = self.head
+        rank += 1
+        for level in self._levels_down:
+            width = node[2][level]
+            while width <= rank:
+                rank -= width
+                node = node[1][level]
+                width = node[2][level]
+        return node[0]
+
+    def insert(self, value):
+        """Insert a value."""
+        chain = self._chain
+        steps = self._steps
+        node = self.head
+        for level in self._levels_down:
+            step = 0
+            following = node[1][level]
+            while following[0] <= value:
+                step += node[2][level]
+                node = following
+                following = node[1][level]
+            steps[level] = step
+            chain[level] = node
+
+        # Random height with p = 1/2 per extra level (position of the lowest set random bit)
+        bits = random.getrandbits(self.max_levels) | (1 << (self.max_levels - 1))
+        height = (bits & -bits).bit_length()
+        new_node = [value, [None] * height, [None] * height]
+        skipped = 0
+        for level in range(height):
+            previous = chain[level]
+            new_node[1][level] = previous[1][level]
+            previous[1][level] = new_node
+            new_node[2][level] = previous[2][level] - skipped
+            previous[2][level] = skipped + 1
+            skipped += steps[level]
+        for level in range(height, self.max_levels):
+            chain[level][2][level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        """Remove one occurrence of a value (which must be present)."""
+        chain = self._chain
+        node = self.head
+        for level in self._levels_down:
+            following = node[1][level]
+            while following[0] < value:
+                node = following
+                following = node[1][level]
+            chain[level] = node
+        target = chain[0][1][0]
+        if target[0] != value:
+            raise KeyError(f"{value!r} not in skiplist")
+
+        for level in range(len(target[1])):
+            previous = chain[level]
+            previous[2][level] += target[2][level] - 1
+            previous[1][level] = target[1][level]
+        for level in range(len(target[1]), self.max_levels):
+            chain[level][2][level] -= 1
+        self.size -= 1
+
+
+class RunningMedian:
+    """Median of the last `window` samples (ring buffer + indexable skip list)."""
+
+    def __init__(self, window=5):
+        """
+        Args:
+            window (int): Number of samples in the median
+        """
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = window
+        self.buffer = [0.0] * window
+        self.reset()
+
+    def update(self, x, timestamp=None):
+        """Add one sample and return the median of the window."""
+        index = self.index
+        if self.count < self.window:
+            self.count += 1
+        else:
+            self.sorted.remove(self.buffer[index])
+        self.buffer[index] = x
+        self.sorted.insert(x)
+        self.index = index + 1 if index + 1 < self.window else 0
+
+        middle = self.count // 2
+        if self.count % 2:
+            self.value = self.sorted[middle]
+        else:
+            self.value = (self.sorted[middle - 1] + self.sorted[middle]) / 2.0
+        return self.value
+
+    def reset(self):
+        """Forget all samples."""
+        self.sorted = IndexableSkiplist(self.window)
+        self.index = 0
+        self.count = 0
+        self.value = None
+
+
+class OneEuroFilter:
+    """
+    One-euro filter (Casiez et al.): adaptive low-pass that smooths hard while
+    the signal is steady and follows quickly when it moves.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0, rate=30.0):
+        """
+        Args:
+            min_cutoff (float): Cutoff (Hz) when the signal is steady; lower = smoother
+            beta (float): Cutoff increase per unit of speed; higher = less lag on fast moves
+            d_cutoff (float): Cutoff (Hz) for the derivative estimate
+            rate (float): Sample rate (Hz) assumed when no timestamps are given
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.rate = rate
+        self.reset()
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2.0 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def update(self, x, timestamp=None):
+        """Add one sample (timestamp in seconds, optional) and return the filtered value."""
+        if self.value is None:
+            self.value = float(x)
+            self.derivative = 0.0
+            self.last_time = timestamp
+            return self.value
+
+        dt = 1.0 / self.rate
+        if timestamp is not None and self.last_time is not None and timestamp > self.last_time:
+            dt = timestamp - self.last_time
+        self.last_time = timestamp
+
+        derivative = (x - self.value) / dt
+        self.derivative += self._alpha(self.d_cutoff, dt) * (derivative - self.derivative)
+        cutoff = self.min_cutoff + self.beta * abs(self.derivative)
+        self.value += self._alpha(cutoff, dt) * (x - self.value)
+        return self.value
+
+    def reset(self):
+        """Forget all samples."""
+        self.value = None
+        self.derivative = 0.0
+        self.last_time = None
+
+
+FILTERS = {
+    'none': PassThrough,
+    'mean': MovingAverage,
+    'ema': ExponentialMovingAverage,
+    'median': RunningMedian,
+    'one_euro': OneEuroFilter,
+}
+
+
+def create_filter(spec):
+    """
+    Build a filter from a configuration entry.
+
+    Args:
+        spec: 'name' or ('name', {keyword arguments}), name from FILTERS
+
+    Returns:
+        Filter instance
+    """
+    if isinstance(spec, str):
+        name, options = spec, {}
+    else:
+        name, options = spec
+    if name not in FILTERS:
+        raise ValueError(f"Unknown filter {name!r}; choose from: {', '.join(FILTERS)}")
+    return FILTERS[name](**(options or {}))
+
+
+class SignalFilterBank:
+    """One configured filter per named signal."""
+
+    def __init__(self, specs):
+        """
+        Args:
+            specs (dict): Signal name -> filter spec (see create_filter)
+        """
+        self.specs = dict(specs)
+        self.filters = {name: create_filter(spec) for name, spec in self.specs.items()}
+
+    def update(self, name, x, timestamp=None):
+        """Filter one sample of a signal; unconfigured signals pass through."""
+        signal_filter = self.filters.get(name)
+        return x if signal_filter is None else signal_filter.update(x, timestamp)
+
+    def value(self, name, default=None):
+        """Last filtered value of a signal (default before its first sample)."""
+        signal_filter = self.filters.get(name)
+        if signal_filter is None or signal_filter.value is None:
+            return default
+        return signal_filter.value
+
+    def reset(self, name=None):
+        """Reset one signal's filter, or all of them."""
+        for key, signal_filter in self.filters.items():
+            if name is None or key == name:
+                signal_filter.reset()
@@ -0,0 +1,479 @@
+"""
+Telemetry Query API & Reporting CLI
+===================================
+Indexed, streaming queries over telemetry.db (alerts, calibration and the
+optional signal rollups) for post-incident analysis and fleet reporting.
+
+Every query is a generator over an SQLite cursor, so reports over millions
+of rows never materialise whole tables in memory.
+
+Usage:
+    python telemetry_report.py hourly --since 2024-05-01
+    python telemetry_report.py longest --limit 20 --reason CRITICAL
+    python telemetry_report.py distribution --bin 10 --format csv > scores.csv
+    python telemetry_report.py drift
+    python telemetry_report.py signals --resolution 1m --since 2024-05-01T08:00
+    python telemetry_report.py rescore --since 2024-05-01 --set drowsy_points=60 ear_seconds=0.5
+"""
+
+import argparse
+import csv
+import sqlite3
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from eye_detection import Config, TelemetryDB, ThreatScoringEngine
+from signal_filters import SignalFilterBank
+
+
+def normalize_time(value):
+    """
+    Normalise a user-supplied date/time to the ISO format stored in alerts.timestamp.
+
+    Args:
+        value (str): '2024-05-01', '2024-05-01 08:00', '2024-05-01T08:00:00', ...
+
+    Returns:
+        str or None: ISO timestamp comparable with the stored strings
+    """
+    if value is None:
+        return None
+    return datetime.fromisoformat(value).isoformat()
+
+
+def to_epoch(value):
+    """Convert a user-supplied local date/time to epoch seconds (None passes through)."""
+    if value is None:
+        return None
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+class TelemetryQuery:
+    """Streaming query API over a telemetry database."""
+
+    def __init__(self, db_path=Config.TELEMETRY_DB, create_indexes=True):
+        """
+        Open a telemetry database for reporting.
+
+        Args:
+            db_path (str): SQLite database path
+            create_indexes (bool): Create the report indexes if they are missing
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        if create_indexes:
+            self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Create the time/trigger_reason indexes used by the reports."""
+        for statement in TelemetryDB.INDEX_STATEMENTS:
+            try:
+                self.connection.execute(statement)
+            except sqlite3.OperationalError as e:
+                # e.g. the calibration-cache index on a database the detector has not migrated yet
+                print(f"[REPORT] ⚠ Could not create an index ({e}); queries may scan", file=sys.stderr)
+        self.connection.commit()
+
+    def _stream(self, sql, params=()):
+        """Yield rows one at a time from a query."""
+        cursor = self.connection.execute(sql, params)
+        try:
+            for row in cursor:
+                yield row
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _time_filter(column, since, until, reason=None):
+        """Build a WHERE clause for an ISO-timestamp range and optional reason."""
+        clauses = []
+        params = []
+        if since:
+            clauses.append(f"{column} >= ?")
+            params.append(normalize_time(since))
+        if until:
+            clauses.append(f"{column} < ?")
+            params.append(normalize_time(until))
+        if reason:
+            clauses.append("trigger_reason = ?")
+            params.append(reason)
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        return where, params
+
+    def alerts_per_hour(self, since=None, until=None, reason=None):
+        """
+        Alert rows per hour and trigger type.
+
+        Yields:
+            tuple: (hour 'YYYY-MM-DDTHH', trigger_reason, alerts, max threat score)
+        """
+        where, params = self._time_filter('timestamp', since, until, reason)
+        return self._stream(f'''
+            SELECT substr(timestamp, 1, 13) AS hour, trigger_reason,
+                   COUNT(*), MAX(threat_score)
+            FROM alerts
+            {where}
+            GROUP BY hour, trigger_reason
+            ORDER BY hour, trigger_reason
+        ''', params)
+
+    def alert_episodes(self, since=None, until=None, reason=None):
+        """
+        Alert episodes reconstructed from the per-score-change alert rows.
+
+        The main loop logs a row each time the score changes during an alert,
+        with a growing duration_seconds; a duration that drops starts a new episode.
+
+        Yields:
+            tuple: (start timestamp, end timestamp, duration s, peak threat, rows, trigger reasons)
+        """
+        where, params = self._time_filter('timestamp', since, until, reason)
+        return self._stream(self._EPISODES_SQL.format(where=where) + '''
+            ORDER BY start_time
+        ''', params)
+
+    def longest_alerts(self, limit=10, since=None, until=None, reason=None):
+        """
+        Longest alert episodes.
+
+        Yields:
+            tuple: same columns as alert_episodes(), longest first
+        """
+        where, params = self._time_filter('timestamp', since, until, reason)
+        return self._stream(self._EPISODES_SQL.format(where=where) + '''
+            ORDER BY duration DESC
+            LIMIT ?
+        ''', params + [limit])
+
+    _EPISODES_SQL = '''
+        WITH marked AS (
+            SELECT id, timestamp, trigger_reason, threat_score, duration_seconds,
+                   CASE WHEN LAG(duration_seconds) OVER (ORDER BY id) IS NULL
+                          OR duration_seconds < LAG(duration_seconds) OVER (ORDER BY id)
+                        THEN 1 ELSE 0 END AS new_episode
+            FROM alerts
+            {where}
+        ),
+        numbered AS (
+            SELECT *, SUM(new_episode) OVER (ORDER BY id) AS episode FROM marked
+        )
+        SELECT MIN(timestamp) AS start_time, MAX(timestamp) AS end_time,
+               MAX(duration_seconds) AS duration, MAX(threat_score) AS peak_threat,
+               COUNT(*) AS alert_rows, group_concat(DISTINCT trigger_reason) AS reasons
+        FROM numbered
+        GROUP BY episode
+    '''
+
+    def threat_distribution(self, bin_width=10, since=None, until=None, reason=None):
+        """
+        Histogram of logged threat scores.
+
+        Yields:
+            tuple: (bin start, trigger_reason, alerts)
+        """
+        where, params = self._time_filter('timestamp', since, until, reason)
+        return self._stream(f'''
+            SELECT CAST(threat_score / ? AS INTEGER) * ? AS bin, trigger_reason, COUNT(*)
+            FROM alerts
+            {where}
+            GROUP BY bin, trigger_reason
+            ORDER BY bin, trigger_reason
+        ''', [bin_width, bin_width] + params)
+
+    def calibration_drift(self, since=None, until=None, profile=None):
+        """
+        Calibration baselines over time with change vs. the previous and first entry.
+
+        Args:
+            profile (str): Only baselines of this driver/vehicle profile (calibration cache key)
+
+        Yields:
+            tuple: (timestamp, baseline_ear, baseline_mar, samples,
+                    ear delta prev, mar delta prev, ear delta first, mar delta first)
+        """
+        where, params = self._time_filter('timestamp', since, until)
+        if profile is not None:
+            columns = {row[1] for row in self.connection.execute('PRAGMA table_info(calibration)')}
+            if 'profile' not in columns:
+                return iter(())  # Database predates the calibration cache: no profiles stored
+            where = f"{where} AND profile = ?" if where else "WHERE profile = ?"
+            params.append(profile)
+        return self._stream(f'''
+            SELECT timestamp, baseline_ear, baseline_mar, samples_collected,
+                   baseline_ear - LAG(baseline_ear) OVER w,
+                   baseline_mar - LAG(baseline_mar) OVER w,
+                   baseline_ear - FIRST_VALUE(baseline_ear) OVER w,
+                   baseline_mar - FIRST_VALUE(baseline_mar) OVER w
+            FROM calibration
+            {where}
+            WINDOW w AS (ORDER BY timestamp)
+            ORDER BY timestamp
+        ''', params)
+
+    def signal_rollups(self, resolution='1m', since=None, until=None):
+        """
+        Min/mean/max signal rollups from the per-frame signal log.
+
+        Yields:
+            tuple: (bucket ISO time, samples, face frames, ear min/mean/max,
+                    mar min/mean/max, alcohol min/mean/max, threat min/mean/max)
+        """
+        view = {'1s': 'signal_rollup_1s_stats', '1m': 'signal_rollup_1m_stats'}[resolution]
+        clauses = []
+        params = []
+        if since:
+            clauses.append("bucket >= ?")
+            params.append(to_epoch(since))
+        if until:
+            clauses.append("bucket < ?")
+            params.append(to_epoch(until))
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        return self._stream(f'''
+            SELECT datetime(bucket, 'unixepoch', 'localtime'), samples, face_frames,
+                   ear_min, ear_mean, ear_max, mar_min, mar_mean, mar_max,
+                   alcohol_min, alcohol_mean, alcohol_max, threat_min, threat_mean, threat_max
+            FROM {view}
+            {where}
+            ORDER BY bucket
+        ''', params)
+
+    SIGNAL_DTYPE = np.dtype([('ts_ms', np.int64), ('ear', np.float64), ('mar', np.float64),
+                             ('alcohol', np.float64), ('threat', np.float64), ('face', np.bool_)])
+
+    def signal_arrays(self, since=None, until=None):
+        """
+        Load the raw per-frame signal log as column arrays (for vectorised re-scoring).
+
+        Returns:
+            np.ndarray: Structured array with fields ts_ms, ear, mar, alcohol, threat, face
+        """
+        clauses = []
+        params = []
+        if since:
+            clauses.append("ts_ms >= ?")
+            params.append(to_epoch(since) * 1000)
+        if until:
+            clauses.append("ts_ms < ?")
+            params.append(to_epoch(until) * 1000)
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        rows = self._stream(f'''
+            SELECT ts_ms, coalesce(ear_avg, 0.25), coalesce(mar, 0.08), coalesce(alcohol_level, 0),
+                   coalesce(threat_score, 0), face_detected
+            FROM signal_log
+            {where}
+            ORDER BY ts_ms, rowid
+        ''', params)
+        return np.fromiter(rows, dtype=self.SIGNAL_DTYPE)
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+
+# ============================================================================
+# RE-SCORING
+# ============================================================================
+
+def parse_weights(assignments):
+    """Parse ['name=value', ...] into ThreatScoringEngine weights."""
+    weights = {}
+    for assignment in assignments or ():
+        name, _, value = assignment.partition('=')
+        if name not in ThreatScoringEngine.WEIGHTS or not value:
+            raise SystemExit(f"Bad weight {assignment!r}; choose from: {', '.join(ThreatScoringEngine.WEIGHTS)}")
+        weights[name] = float(value)
+    return weights
+
+
+def smooth_signals(signals, resets, specs=None):
+    """
+    Run the live loop's streaming filters over logged raw signals.
+
+    Mirrors DrowsinessDetectionApp.smooth_signals(): EAR/MAR filters only take
+    face frames, alcohol is filtered every frame, and the filters restart at
+    every session boundary.
+
+    Args:
+        signals (np.ndarray): Output of TelemetryQuery.signal_arrays()
+        resets (np.ndarray): True where a new session starts
+        specs (dict): Filter per signal (default: Config.SIGNAL_FILTERS)
+
+    Returns:
+        tuple: Smoothed (ear, mar, alcohol) arrays
+    """
+    bank = SignalFilterBank(Config.SIGNAL_FILTERS if specs is None else specs)
+    ear = signals['ear'].copy()
+    mar = signals['mar'].copy()
+    alcohol = signals['alcohol'].copy()
+    timestamps = signals['ts_ms'] / 1000.0
+    for i in range(len(signals)):
+        if resets[i]:
+            bank.reset()
+        if signals['face'][i]:
+            bank.update('ear', ear[i], timestamps[i])
+            bank.update('mar', mar[i], timestamps[i])
+        ear[i] = bank.value('ear', ear[i])
+        mar[i] = bank.value('mar', mar[i])
+        alcohol[i] = bank.update('alcohol', alcohol[i], timestamps[i])
+    return ear, mar, alcohol
+
+
+def rescore(query, since=None, until=None, weights=None, gap_seconds=1.0):
+    """
+    Re-score the raw signal log with (possibly different) threat weights.
+
+    Eyes-closed / mouth-open durations follow the logged timestamps and
+    restart wherever consecutive log rows are more than gap_seconds apart
+    (app restarts, pauses). Signals go through the same streaming filters
+    as in the live loop. The live loop does not score during calibration,
+    so the first frames of each session can differ from the log.
+
+    Yields:
+        tuple: (metric, logged value, re-scored value)
+    """
+    signals = query.signal_arrays(since, until)
+    if signals.size == 0:
+        return
+    resets = np.concatenate([[True], np.diff(signals['ts_ms']) > gap_seconds * 1000])
+    engine = ThreatScoringEngine(**(weights or {}))
+    ear, mar, alcohol = smooth_signals(signals, resets)
+    batch = engine.score_batch(ear, mar, alcohol, signals['face'], resets,
+                               timestamps=signals['ts_ms'] / 1000.0)
+
+    logged = signals['threat']
+    scored = batch.scores
+    yield 'frames', int(signals.size), int(signals.size)
+    yield 'sessions', int(resets.sum()), int(resets.sum())
+    yield 'mean_score', float(logged.mean()), float(scored.mean())
+    yield 'max_score', float(logged.max()), float(scored.max())
+    yield 'frames_warning', int((logged >= Config.THREAT_SCORE_WARNING).sum()), \
+        int((scored >= Config.THREAT_SCORE_WARNING).sum())
+    yield 'frames_critical', int((logged >= engine.critical_score).sum()), \
+        int((scored >= engine.critical_score).sum())
+    yield 'frames_changed', None, int((np.abs(logged - scored) > 1e-6).sum())
+    types, counts = np.unique(batch.trigger_types[batch.trigger_types != None].astype(str),  # noqa: E711
+                              return_counts=True)
+    for trigger_type, count in zip(types, counts):
+        yield f'frames_{trigger_type}', None, int(count)
+
+
+# ============================================================================
+# COMMAND-LINE INTERFACE
+# ============================================================================
+
+REPORTS = {
+    'hourly': (
+        ('hour', 'reason', 'alerts', 'max_threat'),
+        lambda q, a: q.alerts_per_hour(a.since, a.until, a.reason),
+    ),
+    'longest': (
+        ('start', 'end', 'duration_s', 'peak_threat', 'rows', 'reasons'),
+        lambda q, a: q.longest_alerts(a.limit, a.since, a.until, a.reason),
+    ),
+    'episodes': (
+        ('start', 'end', 'duration_s', 'peak_threat', 'rows', 'reasons'),
+        lambda q, a: q.alert_episodes(a.since, a.until, a.reason),
+    ),
+    'distribution': (
+        ('bin', 'reason', 'alerts'),
+        lambda q, a: q.threat_distribution(a.bin, a.since, a.until, a.reason),
+    ),
+    'drift': (
+        ('timestamp', 'ear', 'mar', 'samples', 'd_ear_prev', 'd_mar_prev', 'd_ear_first', 'd_mar_first'),
+        lambda q, a: q.calibration_drift(a.since, a.until, a.driver),
+    ),
+    'signals': (
+        ('bucket', 'samples', 'face', 'ear_min', 'ear_mean', 'ear_max', 'mar_min', 'mar_mean',
+         'mar_max', 'alc_min', 'alc_mean', 'alc_max', 'thr_min', 'thr_mean', 'thr_max'),
+        lambda q, a: q.signal_rollups(a.resolution, a.since, a.until),
+    ),
+    'rescore': (
+        ('metric', 'logged', 'rescored'),
+        lambda q, a: rescore(q, a.since, a.until, parse_weights(a.set), a.gap),
+    ),
+}
+
+
+TIME_COLUMNS = ('hour', 'start', 'end', 'timestamp', 'bucket')
+LABEL_COLUMNS = ('metric',)
+
+
+def format_cell(value):
+    """Format one value for table output."""
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:.4f}" if abs(value) < 10 else f"{value:.1f}"
+    return str(value)
+
+
+def write_report(columns, rows, output_format, out=sys.stdout):
+    """Stream rows to stdout as an aligned table or CSV."""
+    if output_format == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        writer.writerows(rows)
+        return
+
+    widths = [28 if c in TIME_COLUMNS else 24 if c in LABEL_COLUMNS else max(12, len(c) + 2)
+              for c in columns]
+    out.write("".join(c.ljust(w) for c, w in zip(columns, widths)).rstrip() + "\n")
+    out.write("-" * sum(widths) + "\n")
+    count = 0
+    for row in rows:
+        out.write("".join(format_cell(v).ljust(w) for v, w in zip(row, widths)).rstrip() + "\n")
+        count += 1
+    out.write(f"({count} rows)\n")
+
+
+def build_parser():
+    """Build the command-line parser."""
+    parser = argparse.ArgumentParser(description="Reports over the drowsiness telemetry database")
+    parser.add_argument('--db', default=Config.TELEMETRY_DB, help="Database path (default: %(default)s)")
+    parser.add_argument('--format', choices=('table', 'csv'), default='table', help="Output format")
+    parser.add_argument('--no-index', action='store_true', help="Do not create missing indexes")
+    commands = parser.add_subparsers(dest='report', required=True)
+
+    for name, help_text in (
+        ('hourly', "Alerts per hour by trigger type"),
+        ('longest', "Longest alert episodes"),
+        ('episodes', "All alert episodes in time order"),
+        ('distribution', "Threat score distribution"),
+        ('drift', "Calibration baseline drift over time"),
+        ('signals', "Per-frame signal rollups (requires SIGNAL_LOG_ENABLED)"),
+        ('rescore', "Re-score the raw signal log with new threat weights"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--since', help="Start time (ISO, local), e.g. 2024-05-01T08:00")
+        command.add_argument('--until', help="End time (ISO, local, exclusive)")
+        if name in ('hourly', 'longest', 'episodes', 'distribution'):
+            command.add_argument('--reason', help="Only this trigger_reason (e.g. CRITICAL)")
+        if name == 'longest':
+            command.add_argument('--limit', type=int, default=10, help="Episodes to show")
+        if name == 'distribution':
+            command.add_argument('--bin', type=float, default=10, help="Bin width in score points")
+        if name == 'drift':
+            command.add_argument('--driver', help="Only this driver/vehicle profile")
+        if name == 'signals':
+            command.add_argument('--resolution', choices=('1s', '1m'), default='1m')
+        if name == 'rescore':
+            command.add_argument('--set', nargs='+', metavar='NAME=VALUE',
+                                 help="Weight overrides, e.g. drowsy_points=60 ear_seconds=0.5")
+            command.add_argument('--gap', type=float, default=1.0,
+                                 help="Restart counters after a log gap of this many seconds")
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    query = TelemetryQuery(args.db, create_indexes=not args.no_index)
+    columns, run_query = REPORTS[args.report]
+    try:
+        write_report(columns, run_query(query, args), args.format)
+    except BrokenPipeError:
+        pass  # e.g. piped into `head`
+    finally:
+        query.close()